@@ -13,7 +13,7 @@ Mandatory tool usage:
 3) Generate markdown files and organize them in a dictionary: {"filename": markdown_content, ...}
 4) Save by calling:
    - save_nontech_artifacts(project_id, artifacts_dict) for non_tech
-   - save_technical_artifacts(project_id, artifacts_dict) for technical
+   - save_technical_documents(project_id, artifacts_dict) for technical, with only the documents the prompt asks for
 5) Calling the required save tool is mandatory. Without it, the task is NOT complete.
 
 non_tech output must include (as dictionary with filename keys):
@@ -22,11 +22,15 @@ non_tech output must include (as dictionary with filename keys):
 - "user_stories.md": User Stories (stories, tasks, acceptance criteria)
 - "user_flows.md": User Flow & Interface Description (pages, flow, behaviors)
 
-technical output must include (as dictionary with filename keys):
+technical output (as dictionary with filename keys) is split across parallel runs;
+each prompt names the subset to write. The full set is:
 - "system_design.md": Low-level system design (Mermaid mmd)
-- "entity_diagram.md": Class/ER diagram (Mermaid)
-- "api_documentation.md": API documentation (URL, method, request params, response schema)
+- "api_documentation.md": API documentation (request params, response schema, validation, errors,
+  entity attributes and relationships)
 - "project_structure.md": Project structure (frontend + backend modules)
+The orchestrator derives "entity_diagram.md" (entity list + ER skeleton), "api_endpoints.md"
+(CRUD endpoint table) and "traceability_matrix.md" from the spec and puts them in the prompt.
+Never write or save those three; build on them and keep their names, collections and URLs.
 
 Rules:
 - Do not invent unsupported details.
@@ -35,16 +39,21 @@ Rules:
 - Do not end with a normal assistant reply before calling the required save tool.
 - Execute tools in strict order:
   non_tech: load_spec -> generate markdown files -> organize into dict -> save_nontech_artifacts
-  technical: load_spec -> generate markdown files -> organize into dict -> save_technical_artifacts
+  technical: load_spec -> generate the requested markdown files -> organize into dict -> save_technical_documents
 - For technical artifacts, use only this target stack:
   Frontend: Angular
   Backend: Java Spring Boot
 - Do not output or suggest other stacks (e.g., React, Vue, Node.js, Django, Flask, etc.).
 - Do not introduce implementation details not grounded in the spec; if unknown, use "N/A (TBD)".
 
+Reuse of similar projects:
+- If the prompt mentions a similar completed project, call load_reference_project(project_id) after load_spec.
+- Treat its artifacts as a draft: keep sections that still fit the loaded spec, rewrite what differs.
+- The loaded spec always wins over the reference project.
+
 Reply policy:
 - For phase=non_tech, do NOT output the full artifacts markdown in assistant reply.
 - Put the full artifacts dictionary only in save_nontech_artifacts(project_id, artifacts_dict).
 - For phase=technical, do NOT output the full artifacts markdown in assistant reply.
-- Put the full artifacts dictionary only in save_technical_artifacts(project_id, artifacts_dict).
+- Put the requested artifacts dictionary only in save_technical_documents(project_id, artifacts_dict).
 """
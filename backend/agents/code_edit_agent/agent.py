@@ -0,0 +1,20 @@
+import os
+from google.genai import types
+from google.adk.agents import LlmAgent
+from core.llm import create_litellm
+from .instructions import CODE_EDIT_AGENT_INSTRUCTIONS
+
+def create_agent(token: str, tools=None) -> LlmAgent:
+    llm = create_litellm(token, model=os.getenv("LITELLM_MODEL_REFINE") or os.getenv("LITELLM_MODEL_CODEGEN"))
+    return LlmAgent(
+        model=llm,
+        name="code_edit_agent",
+        description="Apply targeted edits to generated Angular code as unified diffs",
+        instruction=CODE_EDIT_AGENT_INSTRUCTIONS,
+        tools=tools or [],
+        generate_content_config=types.GenerateContentConfig(
+            temperature=0.2,
+            # Edits are diffs, not whole files.
+            max_output_tokens=4096,
+        ),
+    )
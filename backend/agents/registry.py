@@ -1,12 +1,22 @@
+import importlib
 from typing import Callable, Any
-from agents.requirements_gathering_agent.agent import create_agent as create_req_agent
-from agents.artefacts_generation_agent.agent import create_agent as create_art_agent
-from agents.code_generation_agent.agent import create_agent as create_code_agent
 
 AgentFactory = Callable[..., Any]  # llm + optional kwargs -> LlmAgent
 
+
+def _lazy_factory(module_path: str) -> AgentFactory:
+    # Agent modules pull in google.adk / google.genai / litellm; import them on
+    # first use so API start-up does not pay for it.
+    def factory(*args, **kwargs):
+        return importlib.import_module(module_path).create_agent(*args, **kwargs)
+
+    factory.__qualname__ = f"lazy[{module_path}]"
+    return factory
+
+
 AGENT_FACTORIES: dict[str, AgentFactory] = {
-    "requirements": create_req_agent,
-    "artifacts": create_art_agent,
-    "code_generation": create_code_agent,
+    "requirements": _lazy_factory("agents.requirements_gathering_agent.agent"),
+    "artifacts": _lazy_factory("agents.artefacts_generation_agent.agent"),
+    "code_generation": _lazy_factory("agents.code_generation_agent.agent"),
+    "code_edit": _lazy_factory("agents.code_edit_agent.agent"),
 }
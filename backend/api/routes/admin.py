@@ -0,0 +1,70 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from core.deadlines import model_time
+from core.profiling import SamplingProfiler, loop_monitor, profile_store
+from orchestration.resources import resource_manager
+from orchestration.tool_runtime import tool_metrics
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/memory")
+async def memory():
+    return resource_manager.report()
+
+
+@router.post("/memory/sweep")
+async def sweep():
+    evicted = await resource_manager.sweep()
+    return {"evicted": evicted, "total_bytes": resource_manager.report()["total_bytes"]}
+
+
+@router.get("/model-time")
+async def model_time_report():
+    """Model time per pipeline step: completed runs, and wasted/saved time of cancelled runs."""
+    return model_time.report()
+
+
+@router.get("/tools")
+async def tool_report():
+    """Per tool: calls, time held on the event loop vs. time on tool workers."""
+    return tool_metrics.report()
+
+
+@router.get("/loop")
+async def loop_lag():
+    """Event-loop stalls over LOOP_LAG_THRESHOLD_MS, with the loop thread's stack at the time."""
+    return loop_monitor.report()
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_process(seconds: float = 5.0):
+    """Sample the whole process for `seconds`; returns collapsed stacks (flamegraph input)."""
+    profiler = SamplingProfiler(label=f"process {seconds}s").start()
+    try:
+        await asyncio.sleep(min(max(seconds, 0.1), 60.0))
+    finally:
+        profile = profiler.stop()
+        profile_store.add(profile)
+    return PlainTextResponse(profile.collapsed(), headers={"X-Profile-Id": profile.id})
+
+
+@router.post("/profile/requests")
+async def profile_next_requests(count: int = 1):
+    """Profile the next `count` /chat requests without the X-Profile header."""
+    profile_store.profile_next_requests(count)
+    return {"pending": profile_store.pending_requests}
+
+
+@router.get("/profiles")
+async def profiles():
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def profile_stacks(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile {profile_id}")
+    return PlainTextResponse(profile.collapsed())
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+from typing import Any
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from orchestration.batch import BatchItem, new_batch_id, run_batch, write_results
+from orchestration.orchestrator import Orchestrator
+
+router = APIRouter()
+orch = Orchestrator()
+
+# Upper bounds on what one request can fan out to (model calls, output on disk).
+MAX_BATCH_ITEMS = 100
+MAX_BATCH_CONCURRENCY = 8
+MAX_BATCH_TURNS = 30
+
+class BatchRequest(BaseModel):
+    items: list[dict[str, Any] | str] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+    concurrency: int = Field(default=4, ge=1, le=MAX_BATCH_CONCURRENCY)
+    max_turns: int = Field(default=12, ge=1, le=MAX_BATCH_TURNS)
+    write_output: bool = True
+
+@router.post("/batch")
+async def batch(req: BatchRequest):
+    """
+    Stream newline-delimited JSON progress events while the batch runs.
+    The last line is `batch_finished` (with the output directory) or `batch_failed`.
+    """
+    try:
+        items = [BatchItem.from_raw(raw, index) for index, raw in enumerate(req.items, start=1)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    batch_id = new_batch_id()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _run() -> None:
+        try:
+            _, results = await run_batch(
+                items, req.concurrency, queue.put, orch=orch, batch_id=batch_id, max_turns=req.max_turns
+            )
+            output_dir = None
+            if req.write_output:
+                out_dir = os.getenv("BATCH_OUTPUT_DIR", "batch_runs")
+                output_dir = str(await asyncio.to_thread(write_results, batch_id, results, out_dir))
+            await queue.put(
+                {
+                    "event": "batch_finished",
+                    "batch_id": batch_id,
+                    "completed": sum(1 for r in results if r.status == "completed"),
+                    "total": len(results),
+                    "output_dir": output_dir,
+                }
+            )
+        except Exception as e:
+            await queue.put({"event": "batch_failed", "batch_id": batch_id, "error": str(e)})
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(_run())
+
+    async def _stream():
+        try:
+            yield json.dumps({"event": "batch_started", "batch_id": batch_id, "total": len(items)}) + "\n"
+            while (event := await queue.get()) is not None:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            # Client went away: stop spending model time on the remaining projects.
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
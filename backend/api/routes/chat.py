@@ -1,6 +1,11 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Request, Response
 from pydantic import BaseModel
+from core.coordination import LockLost
+from core.deadlines import DeadlineExceeded
+from core.profiling import phase
 from orchestration.orchestrator import Orchestrator
+from orchestration.snapshot import ProjectResponse
 import json
 
 router = APIRouter()
@@ -10,20 +15,63 @@ class ChatRequest(BaseModel):
     project_id: str
     session_id: str
     message: str
+    # Opt this project in/out of starting from a similar prior project's artifacts.
+    reuse_prior_projects: bool | None = None
+
+async def _cancel_on_disconnect(request: Request, task: asyncio.Task, poll_s: float = 0.5):
+    """Await `task`, cancelling it if the client goes away first. Returns None then."""
+    try:
+        while not task.done():
+            done, _ = await asyncio.wait({task}, timeout=poll_s)
+            if not done and await request.is_disconnected():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                return None
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    return task.result()
 
 @router.post("/chat")
-async def chat(req: ChatRequest):
+async def chat(
+    req: ChatRequest,
+    request: Request,
+    x_request_timeout: float | None = Header(default=None, description="Seconds the client will wait for this turn."),
+):
+    result = {}
     try:
-        result = await orch.handle(req.project_id, req.session_id, req.message)
+        task = asyncio.create_task(
+            orch.handle(
+                req.project_id,
+                req.session_id,
+                req.message,
+                timeout_s=x_request_timeout,
+                reuse_prior_projects=req.reuse_prior_projects,
+            )
+        )
+        result = await _cancel_on_disconnect(request, task)
+        if result is None:
+            # Nobody is reading; the turn was cancelled.
+            return Response(status_code=499)
 
         if result.get("stage") == "REQ" and result["reply"]:
             result["reply"] = json.loads(result["reply"])
 
-        return {
-            "project_id": req.project_id,
-            "session_id": req.session_id,
-            **result,
-        }
+        ids = {"project_id": req.project_id, "session_id": req.session_id}
+        if isinstance(result, ProjectResponse):
+            # Unchanged spec/artifacts/code are spliced in as cached JSON bytes.
+            with phase("render"):
+                body = result.render(ids)
+            return Response(content=body, media_type="application/json")
+        return {**ids, **result}
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except LockLost as e:
+        # Another worker may own the project now; the client can retry the turn.
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print("#########", e)
         print("#########", result.get("reply"))
@@ -0,0 +1,32 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from orchestration.events import event_bus
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 25.0
+
+@router.websocket("/ws/projects/{project_id}")
+async def project_events(ws: WebSocket, project_id: str, since: Optional[int] = None):
+    """
+    Push project change events. Reconnect with ?since=<last seq> to resume;
+    a `resync` event means the client must re-fetch full project state.
+    """
+    await ws.accept()
+    sub = event_bus.subscribe(project_id, since)
+    try:
+        await ws.send_text(json.dumps({"type": "hello", "project_id": project_id, "seq": event_bus.latest_seq(project_id)}))
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Idle heartbeat; also how a silently dropped client is noticed.
+                await ws.send_text('{"type":"ping"}')
+                continue
+            await ws.send_text(json.dumps(event.to_dict(), ensure_ascii=False, separators=(",", ":")))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_bus.unsubscribe(sub)
@@ -0,0 +1,51 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from orchestration.orchestrator import Orchestrator
+from orchestration.pipeline import last_run
+from orchestration.store import get_project
+from orchestration.tool_runtime import run_blocking
+from orchestration.versions import VersionKind, checkout_version, diff_versions, list_versions
+
+router = APIRouter(prefix="/projects")
+orch = Orchestrator()
+
+
+@router.get("/{project_id}/pipeline")
+async def get_pipeline(project_id: str):
+    """Step graph with per-step status, plus timings and critical path of the last run."""
+    pipeline = orch.pipeline()
+    proj = await asyncio.to_thread(get_project, project_id)
+    if proj is None:
+        raise HTTPException(status_code=404, detail=f"Unknown project {project_id}")
+    done = pipeline.done_steps(proj)
+    return {
+        "project_id": project_id,
+        "stage": proj.stage.value,
+        "steps": [{**step, "done": step["name"] in done} for step in pipeline.describe()],
+        "last_run": last_run(project_id),
+        "codegen": proj.codegen_progress,
+    }
+
+
+@router.get("/{project_id}/versions/{kind}")
+async def get_versions(project_id: str, kind: VersionKind):
+    versions = await asyncio.to_thread(list_versions, project_id, kind)
+    return {"project_id": project_id, "kind": kind, "versions": versions}
+
+
+@router.get("/{project_id}/versions/{kind}/diff")
+async def get_version_diff(project_id: str, kind: VersionKind, base: int, head: int):
+    try:
+        diff = await run_blocking(diff_versions, project_id, kind, base, head)
+        return {"project_id": project_id, "kind": kind, **diff}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.get("/{project_id}/versions/{kind}/{number}")
+async def get_version(project_id: str, kind: VersionKind, number: int):
+    try:
+        documents = await asyncio.to_thread(checkout_version, project_id, kind, number)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"project_id": project_id, "kind": kind, "version": number, "documents": documents}
@@ -1,21 +1,56 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from api.routes.admin import router as admin_router
+from api.routes.batch import router as batch_router
 from api.routes.chat import router as chat_router
+from api.routes.events import router as events_router
+from api.routes.projects import router as projects_router
 from fastapi.middleware.cors import CORSMiddleware
+from core.profiling import DiagnosticsMiddleware, loop_monitor, loop_monitor_enabled
+from core.warmup import readiness, warm_up, warmup_enabled
+from orchestration.resources import resource_manager
+from orchestration.tool_runtime import shutdown_executor
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
 
-app = FastAPI(title="ProtoPilot API")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    sweeper = asyncio.create_task(resource_manager.run_forever())
+    # Warm-up runs in the background so /health answers immediately.
+    warmer = asyncio.create_task(warm_up()) if warmup_enabled() else None
+    monitor = asyncio.create_task(loop_monitor.run()) if loop_monitor_enabled() else None
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        if warmer:
+            warmer.cancel()
+        if monitor:
+            monitor.cancel()
+        shutdown_executor()
+
+
+app = FastAPI(title="ProtoPilot API", lifespan=lifespan)
 app.include_router(chat_router)
+app.include_router(projects_router)
+app.include_router(admin_router)
+app.include_router(batch_router)
+app.include_router(events_router)
 
+app.add_middleware(DiagnosticsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
 @app.get("/")
@@ -24,4 +59,9 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@app.get("/ready")
+def ready():
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
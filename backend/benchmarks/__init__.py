@@ -0,0 +1 @@
+"""Offline benchmarks for the orchestration hot paths; run with `python -m benchmarks`."""
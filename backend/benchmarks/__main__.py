@@ -0,0 +1,86 @@
+"""
+Run the offline benchmark suite and compare it with the committed baseline.
+
+CLI (from backend/):
+    python -m benchmarks                       # compare with benchmarks/baseline.json
+    python -m benchmarks --only render --repeats 3
+    python -m benchmarks --update-baseline     # re-record (median of 3 runs) after an intended change
+
+Exits 1 when any metric regressed beyond the tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+async def _run_all(only: Optional[list[str]], repeats: Optional[int]) -> dict[str, dict[str, Any]]:
+    from benchmarks.harness import run_benchmark
+    from benchmarks.offline import offline_agents
+    from benchmarks.suite import benchmarks, select
+
+    results: dict[str, dict[str, Any]] = {}
+    with offline_agents():
+        for benchmark in select(benchmarks(), only):
+            print(f"[BENCH] {benchmark.name}", file=sys.stderr, flush=True)
+            # Tools print a [TOOL_CALL] line each; keep them out of the timings and the report.
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results.update(await run_benchmark(benchmark, repeats))
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--only", action="append", help="run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--repeats", type=int, default=None, help="timed samples per benchmark")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--out", default=None, help="also write this run's results here")
+    parser.add_argument("--update-baseline", action="store_true", help="merge this run into the baseline file")
+    parser.add_argument("--baseline-runs", type=int, default=3, help="suite runs a baseline update takes the median of")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCH_TOLERANCE", "0.25")))
+    parser.add_argument("--min-delta-ms", type=float, default=float(os.getenv("BENCH_MIN_DELTA_MS", "1.0")))
+    args = parser.parse_args(argv)
+
+    # Always in-process: the suite must not need the SQLite shared backend, nor write to its database.
+    os.environ["STATE_BACKEND"] = "memory"
+
+    from benchmarks.harness import compare, load_results, median_results, print_report, results_document, write_results
+
+    runs = max(1, args.baseline_runs) if args.update_baseline else 1
+    results = median_results([asyncio.run(_run_all(args.only, args.repeats)) for _ in range(runs)])
+    if args.out:
+        write_results(Path(args.out), results_document(results))
+
+    baseline_path = Path(args.baseline)
+    baseline = load_results(baseline_path)
+    if args.update_baseline:
+        merged = {**(baseline or {}).get("results", {}), **results}
+        write_results(baseline_path, results_document(merged))
+        print(f"[BENCH] baseline updated: {baseline_path} ({len(results)} metrics)", file=sys.stderr)
+        return 0
+    if baseline is None:
+        print(f"[BENCH] no baseline at {baseline_path}; run with --update-baseline to record one", file=sys.stderr)
+        print_report(compare(results, {}, args.tolerance, args.min_delta_ms))
+        return 0
+
+    baseline_results = baseline["results"]
+    if args.only:
+        baseline_results = {metric: value for metric, value in baseline_results.items() if metric in results}
+    rows = compare(results, baseline_results, args.tolerance, args.min_delta_ms)
+    print_report(rows)
+    regressed = [row.metric for row in rows if row.status == "regressed"]
+    if regressed:
+        print(f"[BENCH] {len(regressed)} regressed: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
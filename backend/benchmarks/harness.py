@@ -0,0 +1,176 @@
+"""
+Timing, result files and baseline comparison for the benchmark suite.
+
+A benchmark's sample() runs the measured work once and returns seconds per
+operation for one or more named metrics (one pipeline run times every turn).
+Each benchmark gets an untimed warm-up sample, then `repeats` timed ones;
+the median is what is stored.
+
+Shared machines change speed from one moment to the next, so every sample is
+preceded by a fixed CPU workload (calibrate()) and also stored relative to it.
+compare() uses that same-run ratio when both sides have it, which keeps the
+tolerance tight without failing on a busy host.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+RESULTS_FORMAT = 1
+CALIBRATION_ROUNDS = 3
+
+Sample = Callable[[], Awaitable[dict[str, float]]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    sample: Sample
+    repeats: int = 7
+    setup: Optional[Callable[[], Awaitable[None]]] = None
+    teardown: Optional[Callable[[], Awaitable[None]]] = None
+
+
+@dataclass
+class Comparison:
+    metric: str
+    baseline_ms: Optional[float]
+    current_ms: Optional[float]
+    status: str  # ok / regressed / improved / new / missing
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if not self.baseline_ms or self.current_ms is None:
+            return None
+        return self.current_ms / self.baseline_ms
+
+
+def _calibration_work() -> None:
+    # JSON round trips plus dict and string work, like the hot paths.
+    doc = {f"src/app/file{i}.ts": f"export const value{i} = '{i}';\n" * 20 for i in range(100)}
+    decoded = json.loads(json.dumps(doc))
+    sorted(decoded.items(), key=lambda item: len(item[1]))
+    "\n".join(decoded.values()).splitlines()
+
+
+def calibrate() -> float:
+    """Fastest of a few runs of a fixed CPU workload, in milliseconds."""
+    samples = []
+    for _ in range(CALIBRATION_ROUNDS):
+        started = time.perf_counter()
+        _calibration_work()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples)
+
+
+async def run_benchmark(benchmark: Benchmark, repeats: Optional[int] = None) -> dict[str, dict[str, Any]]:
+    if benchmark.setup is not None:
+        await benchmark.setup()
+    try:
+        await benchmark.sample()  # Warm-up: imports, caches, thread pool start.
+        samples: dict[str, list[float]] = {}
+        relative: dict[str, list[float]] = {}
+        for _ in range(repeats or benchmark.repeats):
+            calibration_ms = calibrate()
+            for metric, seconds in (await benchmark.sample()).items():
+                samples.setdefault(metric, []).append(seconds * 1000)
+                relative.setdefault(metric, []).append(seconds * 1000 / calibration_ms)
+    finally:
+        if benchmark.teardown is not None:
+            await benchmark.teardown()
+    return {
+        metric: {
+            "median_ms": round(statistics.median(values), 4),
+            "min_ms": round(min(values), 4),
+            "max_ms": round(max(values), 4),
+            "calibrated": round(statistics.median(relative[metric]), 6),
+            "samples": len(values),
+        }
+        for metric, values in samples.items()
+    }
+
+
+def median_results(runs: list[dict[str, dict[str, Any]]]) -> dict[str, dict[str, Any]]:
+    """Per metric, the run with the median calibrated value; a baseline should not be one lucky run."""
+    merged: dict[str, dict[str, Any]] = {}
+    for metric in {metric for run in runs for metric in run}:
+        values = sorted((run[metric] for run in runs if metric in run), key=lambda stats: stats["calibrated"])
+        merged[metric] = values[(len(values) - 1) // 2]
+    return merged
+
+
+def results_document(results: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "format": RESULTS_FORMAT,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": dict(sorted(results.items())),
+    }
+
+
+def load_results(path: Path) -> Optional[dict[str, Any]]:
+    if not path.exists():
+        return None
+    document = json.loads(path.read_text(encoding="utf-8"))
+    if document.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path}: unsupported results format {document.get('format')!r}")
+    return document
+
+
+def write_results(path: Path, document: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    tolerance: float,
+    min_delta_ms: float,
+) -> list[Comparison]:
+    """
+    A metric regresses when its median is more than `tolerance` (a fraction)
+    above the baseline median and slower by at least `min_delta_ms`, which
+    keeps the slow, noisier metrics from failing on a few ms of jitter. The
+    floor is capped at the tolerance's own margin (`base * tolerance`), so it
+    never hides a sub-millisecond metric's slowdown; those go by the ratio.
+    With calibrated values on both sides, the current median is the baseline
+    median times the ratio of the calibrated values.
+    """
+    rows: list[Comparison] = []
+    for metric in sorted(set(results) | set(baseline)):
+        current = results.get(metric, {}).get("median_ms")
+        base = baseline.get(metric, {}).get("median_ms")
+        calibrated = (results.get(metric, {}).get("calibrated"), baseline.get(metric, {}).get("calibrated"))
+        if current is not None and base is not None and all(calibrated):
+            current = round(base * calibrated[0] / calibrated[1], 4)
+        floor = min(min_delta_ms, base * tolerance) if base is not None else min_delta_ms
+        if base is None:
+            status = "new"
+        elif current is None:
+            status = "missing"
+        elif current > base * (1 + tolerance) and current - base >= floor:
+            status = "regressed"
+        elif current < base / (1 + tolerance) and base - current >= floor:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append(Comparison(metric, base, current, status))
+    return rows
+
+
+def print_report(rows: list[Comparison], file=sys.stderr) -> None:
+    width = max((len(row.metric) for row in rows), default=10)
+    print(f"{'metric':<{width}}  {'baseline ms':>12}  {'current ms':>12}  {'ratio':>6}  status", file=file)
+    for row in rows:
+        base = f"{row.baseline_ms:.3f}" if row.baseline_ms is not None else "-"
+        current = f"{row.current_ms:.3f}" if row.current_ms is not None else "-"
+        ratio = f"{row.ratio:.2f}" if row.ratio is not None else "-"
+        print(f"{row.metric:<{width}}  {base:>12}  {current:>12}  {ratio:>6}  {row.status}", file=file)
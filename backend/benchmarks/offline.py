@@ -0,0 +1,178 @@
+"""
+Offline stand-ins for the model-backed agents.
+
+ScriptedAgent is an ADK BaseAgent, so the real core.runner.run_turn, Runner
+and in-memory session service are exercised; only the model is replaced.
+Each agent key of AGENT_FACTORIES gets a script that calls the tools it was
+given (the agent_tools wrappers the orchestrator hands over) the way the real
+agent is instructed to, and yields the function call / response / text events
+a model turn would produce.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Callable, Iterator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types
+from pydantic import ConfigDict, Field
+
+from agents.registry import AGENT_FACTORIES
+from core import auth
+
+Script = Callable[["ScriptedAgent", str], AsyncGenerator[tuple[str, Any], None]]
+
+ENTITIES = ["Task", "Project", "User", "Comment", "Label", "Attachment"]
+
+
+def bench_spec(entities: int = 4, requirements: int = 12) -> dict[str, Any]:
+    names = (ENTITIES * (entities // len(ENTITIES) + 1))[:entities]
+    names = [f"{name}{i // len(ENTITIES) or ''}" for i, name in enumerate(names)]
+    return {
+        "project_name": "Benchmark Tracker",
+        "problem_statement": "Teams lose track of work spread across chats and spreadsheets.",
+        "target_users": ["team lead", "team member"],
+        "goals": ["One place for tasks", "Visible progress"],
+        "functional_requirements": [
+            f"Users can create, edit and archive {names[i % len(names)].lower()}s (case {i})" for i in range(requirements)
+        ],
+        "core_entities": names,
+        "assumptions": [],
+        "constraints": [],
+        "open_questions": [],
+    }
+
+
+def code_file(index: int, lines: int = 40) -> str:
+    """A plausible Angular component body of roughly `lines` lines."""
+    body = "\n".join(
+        f"  field{j}: string = 'value {index}-{j}'; // keeps the template bound to field{j}" for j in range(lines - 8)
+    )
+    return (
+        "import { Component, inject } from '@angular/core';\n"
+        "import { ApiService } from '../../core/services/api.service';\n\n"
+        f"@Component({{ selector: 'app-item-{index}', standalone: true, template: '<p>{{{{ field0 }}}}</p>' }})\n"
+        f"export class Item{index}Component {{\n"
+        "  private readonly api = inject(ApiService);\n"
+        f"{body}\n"
+        "}\n"
+    )
+
+
+def code_files(count: int, lines: int = 40) -> dict[str, str]:
+    return {f"src/app/features/item/item-{i}.component.ts": code_file(i, lines) for i in range(count)}
+
+
+class ScriptedAgent(BaseAgent):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    script: Any = None
+    tools: list[Any] = Field(default_factory=list)
+
+    async def call(self, name: str, *args: Any) -> Any:
+        fn = next(tool for tool in self.tools if tool.__name__ == name)
+        result = fn(*args)
+        return await result if asyncio.iscoroutine(result) else result
+
+    def _event(self, ctx: InvocationContext, role: str, part: types.Part) -> Event:
+        return Event(invocation_id=ctx.invocation_id, author=self.name, content=types.Content(role=role, parts=[part]))
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        message = ctx.user_content.parts[0].text if ctx.user_content and ctx.user_content.parts else ""
+        async for kind, payload in self.script(self, message):
+            if kind == "text":
+                yield self._event(ctx, "model", types.Part(text=payload))
+                continue
+            name, args = payload
+            yield self._event(ctx, "model", types.Part(function_call=types.FunctionCall(name=name, args={"args": list(args)})))
+            response = await self.call(name, *args)
+            yield self._event(
+                ctx, "user", types.Part(function_response=types.FunctionResponse(name=name, response={"result": response}))
+            )
+
+
+def _project_id(message: str) -> str:
+    return re.search(r"project_id=(\S+)", message).group(1)
+
+
+def _scripts(spec: dict[str, Any], files: dict[str, str]) -> dict[str, Script]:
+    async def requirements(agent: ScriptedAgent, message: str):
+        yield "call", ("submit_spec", (_project_id(message), spec))
+        yield "text", "Requirements are submitted."
+
+    async def artifacts(agent: ScriptedAgent, message: str):
+        pid = _project_id(message)
+        yield "call", ("load_spec", (pid,))
+        if "phase=non_tech" in message:
+            docs = {name: f"# {name}\n\n" + "Narrative paragraph. " * 200 for name in ("PRD.md", "user_stories.md", "user_flows.md")}
+            yield "call", ("save_nontech_artifacts", (pid, docs))
+        else:
+            names = re.search(r"Generate only these technical artifacts now: (.*?)\. ", message).group(1).split(", ")
+            yield "call", ("save_technical_documents", (pid, {name: f"# {name}\n\n" + "Design note. " * 300 for name in names}))
+        yield "text", "Artifacts saved."
+
+    async def code_generation(agent: ScriptedAgent, message: str):
+        pid = _project_id(message)
+        yield "call", ("load_spec", (pid,))
+        yield "call", ("load_artifacts", (pid,))
+        yield "call", ("begin_codegen", (pid, list(files)))
+        for path, content in files.items():
+            yield "call", ("save_generated_file", (pid, path, content))
+        yield "call", ("finish_codegen", (pid,))
+        yield "text", f"Generated {len(files)} files."
+
+    async def code_edit(agent: ScriptedAgent, message: str):
+        pid = _project_id(message)
+        path = next(iter(files))
+        yield "call", ("search_code", (pid, "field1"))
+        yield "call", ("read_code_file", (pid, path, 1, 10))
+        stamp = time.perf_counter_ns()
+        diff = f"--- a/{path}\n+++ b/{path}\n@@ -1,1 +1,2 @@\n import {{ Component, inject }} from '@angular/core';\n+// edited {stamp}\n"
+        yield "call", ("apply_code_patch", (pid, path, diff))
+        yield "text", '{"message": "Edited one file."}'
+
+    return {
+        "requirements": requirements,
+        "artifacts": artifacts,
+        "code_generation": code_generation,
+        "code_edit": code_edit,
+    }
+
+
+@contextmanager
+def offline_agents(spec: dict[str, Any] | None = None, files: dict[str, str] | None = None) -> Iterator[None]:
+    """Swap every AGENT_FACTORIES entry for a scripted agent and seed a fake OAuth token."""
+    scripts = _scripts(spec or bench_spec(), files if files is not None else code_files(20))
+    saved_factories = dict(AGENT_FACTORIES)
+    saved_token = dict(auth._cache)
+    for key, script in scripts.items():
+        AGENT_FACTORIES[key] = (
+            lambda key, script: lambda token, tools=None, **kwargs: ScriptedAgent(name=f"{key}_agent", script=script, tools=tools or [])
+        )(key, script)
+    auth._cache.update(token="offline-benchmark", expires_at=time.time() + 24 * 3600)
+    try:
+        yield
+    finally:
+        AGENT_FACTORIES.clear()
+        AGENT_FACTORIES.update(saved_factories)
+        auth._cache.clear()
+        auth._cache.update(saved_token)
+
+
+def chatter_script(events: int, text_bytes: int = 120) -> Script:
+    """A turn of `events` events alternating text chunks and a cheap tool round trip."""
+
+    async def script(agent: ScriptedAgent, message: str):
+        chunk = "x" * text_bytes
+        for i in range(events):
+            if i % 3 == 2:
+                yield "call", ("load_spec", (_project_id(message),))
+            else:
+                yield "text", chunk
+
+    return script
@@ -0,0 +1,229 @@
+"""
+Benchmarks for the orchestration hot paths.
+
+- handle.*: one Orchestrator.handle turn per stage, scripted agents, fresh project
+- store.* / tools.*: get_or_create_project from threads, agent tools called concurrently
+- response.*: _build_response + render() as generated_code_files grows (cold = re-encode)
+- parse_spec.*: extract_questions on long replies
+- runner.*: run_turn over a scripted turn of many events
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import Benchmark
+from benchmarks.offline import ScriptedAgent, bench_spec, chatter_script, code_files
+from core.parse_spec import extract_questions
+from core.runner import run_turn
+from core.sessions import delete_session
+from orchestration.orchestrator import Orchestrator
+from orchestration.resources import resource_manager
+from orchestration.store import Stage, bump_field_version, get_or_create_project
+from orchestration.tool_runtime import agent_tools
+from orchestration.tools import (
+    begin_codegen,
+    load_spec,
+    save_generated_file,
+    save_technical_documents,
+    search_code,
+    seed_generated_code,
+    submit_spec,
+)
+
+_ids = itertools.count()
+
+# (metric, message, stage after the turn). The stage check keeps a broken
+# pipeline from passing as a fast one.
+HANDLE_TURNS = (
+    ("requirements", "Build a tracker for team tasks.", Stage.WAIT_APPROVAL),
+    ("approval_gate", "Looks good?", Stage.WAIT_APPROVAL),
+    ("technical", "approve", Stage.CODEGEN),
+    ("codegen", "continue", Stage.QA),
+    ("refine", "Add a comment to the first component.", Stage.QA),
+    ("qa_idle", "", Stage.QA),
+)
+RENDER_SIZES = (10, 100, 500, 2000)
+RUN_TURN_EVENTS = (30, 300)
+
+
+def _fresh_id(prefix: str) -> str:
+    return f"bench-{prefix}-{next(_ids)}"
+
+
+async def _evict(*project_ids: str) -> None:
+    for project_id in project_ids:
+        await resource_manager.evict(project_id)
+
+
+async def _handle_turns() -> dict[str, float]:
+    orch = Orchestrator()
+    project_id = _fresh_id("handle")
+    timings: dict[str, float] = {}
+    try:
+        for metric, message, expected in HANDLE_TURNS:
+            started = time.perf_counter()
+            await orch.handle(project_id, project_id, message)
+            timings[f"handle.{metric}"] = time.perf_counter() - started
+            stage = get_or_create_project(project_id, project_id).stage
+            if stage != expected:
+                raise RuntimeError(f"handle.{metric}: stage {stage.value}, expected {expected.value}")
+    finally:
+        await _evict(project_id)
+    return timings
+
+
+async def _get_or_create_threads(threads: int = 8, calls: int = 2000, projects: int = 16) -> dict[str, float]:
+    ids = [_fresh_id("store") for _ in range(projects)]
+
+    def worker(offset: int) -> None:
+        for i in range(calls):
+            project_id = ids[(offset + i) % projects]
+            get_or_create_project(project_id, project_id)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+    await _evict(*ids)
+    return {"store.get_or_create_project.threads": elapsed / (threads * calls)}
+
+
+async def _concurrent_tools(projects: int = 4, files: int = 25) -> dict[str, float]:
+    ids = [_fresh_id("tools") for _ in range(projects)]
+    bodies = code_files(files)
+    for project_id in ids:
+        get_or_create_project(project_id, project_id)
+        submit_spec(project_id, bench_spec())
+        begin_codegen(project_id, list(bodies))
+    tools = {fn.__name__: fn for fn in agent_tools(save_generated_file, save_technical_documents, search_code, load_spec)}
+
+    async def timed(metric: str, calls: list) -> tuple[str, float]:
+        started = time.perf_counter()
+        await asyncio.gather(*calls)
+        return metric, (time.perf_counter() - started) / len(calls)
+
+    timings = dict(
+        [
+            await timed(
+                "tools.save_generated_file.concurrent",
+                [tools["save_generated_file"](pid, path, body) for pid in ids for path, body in bodies.items()],
+            ),
+            await timed(
+                "tools.save_technical_documents.concurrent",
+                [
+                    tools["save_technical_documents"](pid, {f"doc{i}.md": "Design note. " * 300})
+                    for pid in ids
+                    for i in range(4)
+                ],
+            ),
+            await timed(
+                "tools.search_code.concurrent",
+                [tools["search_code"](pid, "field3") for pid in ids for _ in range(4)],
+            ),
+            await timed("tools.load_spec.concurrent", [asyncio.to_thread(tools["load_spec"], pid) for pid in ids * 4]),
+        ]
+    )
+    await _evict(*ids)
+    return timings
+
+
+def _render_benchmark(files: int) -> Benchmark:
+    project_id = _fresh_id(f"render{files}")
+    orch = Orchestrator()
+
+    async def setup() -> None:
+        get_or_create_project(project_id, project_id)
+        submit_spec(project_id, bench_spec())
+        seed_generated_code(project_id, code_files(files))
+
+    async def sample() -> dict[str, float]:
+        proj = get_or_create_project(project_id, project_id)
+        bump_field_version(proj, "generated_code_files")  # Invalidates the cached fragment.
+        started = time.perf_counter()
+        body = orch._build_response(proj, '{"message": "ok"}').render()
+        cold = time.perf_counter() - started
+        rounds = 20
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = orch._build_response(proj, '{"message": "ok"}').render()
+        warm = (time.perf_counter() - started) / rounds
+        if not body:
+            raise RuntimeError("empty response body")
+        return {f"response.render.cold.{files}": cold, f"response.render.warm.{files}": warm}
+
+    async def teardown() -> None:
+        await _evict(project_id)
+
+    return Benchmark(f"response.render.{files}", sample, repeats=5, setup=setup, teardown=teardown)
+
+
+def _long_replies() -> dict[str, str]:
+    numbered = "\n".join(
+        f"{i}. **Question {i}:** How should the app handle case {i}? " + "Some context for the question. " * 20
+        for i in range(1, 61)
+    )
+    bullets = "\n".join(
+        f"- Point {i} about the scope of the release?" if i % 2 else f"- Statement {i} about the scope." for i in range(2000)
+    )
+    prose = "The requirements look clear overall and the team agrees on the scope. " * 1500
+    return {"numbered": numbered, "bullets": bullets, "prose": prose}
+
+
+def _extract_questions_benchmark() -> Benchmark:
+    replies = _long_replies()
+
+    async def sample() -> dict[str, float]:
+        timings: dict[str, float] = {}
+        for name, text in replies.items():
+            rounds = 5
+            started = time.perf_counter()
+            for _ in range(rounds):
+                extract_questions(text)
+            timings[f"parse_spec.extract_questions.{name}"] = (time.perf_counter() - started) / rounds
+        return timings
+
+    return Benchmark("parse_spec.extract_questions", sample)
+
+
+def _run_turn_benchmark(events: int) -> Benchmark:
+    project_id = _fresh_id("runner")
+    agent = ScriptedAgent(name="chatter_agent", script=chatter_script(events), tools=agent_tools(load_spec))
+
+    async def setup() -> None:
+        get_or_create_project(project_id, project_id)
+        submit_spec(project_id, bench_spec())
+
+    async def sample() -> dict[str, float]:
+        session_id = _fresh_id("runner-session")
+        started = time.perf_counter()
+        reply = await run_turn(agent, session_id=session_id, message=f"project_id={project_id}\nTalk.")
+        elapsed = time.perf_counter() - started
+        await delete_session(session_id)
+        if not reply:
+            raise RuntimeError("run_turn returned no text")
+        return {f"runner.run_turn.{events}_events": elapsed}
+
+    async def teardown() -> None:
+        await _evict(project_id)
+
+    return Benchmark(f"runner.run_turn.{events}", sample, setup=setup, teardown=teardown)
+
+
+def benchmarks() -> list[Benchmark]:
+    return [
+        Benchmark("handle", _handle_turns, repeats=5),
+        Benchmark("store.get_or_create_project", _get_or_create_threads),
+        Benchmark("tools.concurrent", _concurrent_tools, repeats=5),
+        *[_render_benchmark(files) for files in RENDER_SIZES],
+        _extract_questions_benchmark(),
+        *[_run_turn_benchmark(events) for events in RUN_TURN_EVENTS],
+    ]
+
+
+def select(all_benchmarks: list[Benchmark], only: list[str] | None) -> list[Benchmark]:
+    if not only:
+        return all_benchmarks
+    return [b for b in all_benchmarks if any(pattern in b.name for pattern in only)]
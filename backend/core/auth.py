@@ -1,16 +1,29 @@
+import asyncio
 import base64
+import json
 import os
 import time
 import httpx
+from core.coordination import get_coordinator, shared_state_enabled
 
 TOKEN_URL = "https://api-uat.cotality.com/oauth/token?grant_type=client_credentials"
 
 _cache = {"token": None, "expires_at": 0.0}
 
+def _load_shared_token() -> None:
+    # Refresh the local cache from the coordinator so workers share one token.
+    raw = get_coordinator().get("oauth", "token")
+    if raw:
+        _cache.update(json.loads(raw))
+
 async def get_oauth_token() -> str:
     now = time.time()
     if _cache["token"] and now < _cache["expires_at"]:
         return _cache["token"]
+    if shared_state_enabled():
+        await asyncio.to_thread(_load_shared_token)
+        if _cache["token"] and now < _cache["expires_at"]:
+            return _cache["token"]
 
     client_id = os.getenv("CLIENT_ID", "")
     client_secret = os.getenv("CLIENT_SECRET", "")
@@ -37,4 +50,6 @@ async def get_oauth_token() -> str:
     # keep 55 mins
     _cache["token"] = token
     _cache["expires_at"] = now + 55 * 60
+    if shared_state_enabled():
+        await asyncio.to_thread(get_coordinator().put, "oauth", "token", json.dumps(_cache))
     return token
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+Coordination layer for running several backend workers against shared state.
+
+STATE_BACKEND=memory (default) keeps everything process-local, which is only
+correct for a single uvicorn worker. STATE_BACKEND=sqlite stores project
+state, version history, the OAuth token and per-project locks in one SQLite
+database (STATE_DB_PATH) so `uvicorn --workers N`, or several processes on a
+host sharing the file, see one consistent view.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class LockLost(RuntimeError):
+    """The lease of a distributed_lock expired or was taken while the block ran."""
+
+
+def shared_state_enabled() -> bool:
+    return os.getenv("STATE_BACKEND", "memory").strip().lower() == "sqlite"
+
+
+def state_db_path() -> str:
+    return os.getenv("STATE_DB_PATH", "protopilot_state.db")
+
+
+class SQLiteCoordinator:
+    """
+    Key/value namespaces plus leased locks on top of a WAL-mode SQLite file.
+    Connections are per thread; every statement is its own short transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, namespace: str, key: str, value: str) -> None:
+        self._connect().execute(
+            "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (namespace, key, value, time.time()),
+        )
+
+    def put_if_absent(self, namespace: str, key: str, value: str) -> bool:
+        cur = self._connect().execute(
+            "INSERT OR IGNORE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time()),
+        )
+        return cur.rowcount == 1
+
+    def get_many(self, namespace: str, keys: list[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        conn = self._connect()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                conn.execute(
+                    f"SELECT key, value FROM kv WHERE namespace = ? AND key IN ({placeholders})", (namespace, *chunk)
+                ).fetchall()
+            )
+        return found
+
+    def put_many_if_absent(self, namespace: str, items: list[tuple[str, str]]) -> None:
+        if not items:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                [(namespace, key, value, now) for key, value in items],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connect().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def items(self, namespace: str, prefix: str = "") -> list[tuple[str, str]]:
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._connect().execute(
+            "SELECT key, value FROM kv WHERE namespace = ? AND key LIKE ? ESCAPE '\\' ORDER BY key",
+            (namespace, pattern),
+        ).fetchall()
+
+    def keys(self, namespace: str, prefix: str = "") -> list[str]:
+        return [key for key, _value in self.items(namespace, prefix)]
+
+    def try_acquire(self, name: str, owner: str, ttl: float) -> bool:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE name = ? AND expires_at < ?", (name, now))
+            conn.execute(
+                "INSERT OR IGNORE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl),
+            )
+            row = conn.execute("SELECT owner FROM locks WHERE name = ?", (name,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return bool(row) and row[0] == owner
+
+    def refresh(self, name: str, owner: str, ttl: float) -> bool:
+        cur = self._connect().execute(
+            "UPDATE locks SET expires_at = ? WHERE name = ? AND owner = ?",
+            (time.time() + ttl, name, owner),
+        )
+        return cur.rowcount == 1
+
+    def release(self, name: str, owner: str) -> None:
+        self._connect().execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+
+_coordinator: Optional[SQLiteCoordinator] = None
+_coordinator_guard = threading.Lock()
+
+
+def get_coordinator() -> SQLiteCoordinator:
+    global _coordinator
+    if _coordinator is None:
+        with _coordinator_guard:
+            if _coordinator is None:
+                _coordinator = SQLiteCoordinator(state_db_path())
+    return _coordinator
+
+
+_LOCAL_LOCKS: dict[str, asyncio.Lock] = {}
+
+
+def local_lock_held(name: str) -> bool:
+    lock = _LOCAL_LOCKS.get(name)
+    return lock is not None and lock.locked()
+
+
+def discard_local_lock(name: str) -> None:
+    if not local_lock_held(name):
+        _LOCAL_LOCKS.pop(name, None)
+
+
+@asynccontextmanager
+async def distributed_lock(name: str, ttl: float = 60.0, poll_interval: float = 0.1) -> AsyncIterator[None]:
+    """
+    Hold `name` exclusively across workers. In memory mode this is a plain
+    asyncio.Lock. In shared mode it is a leased row that a background task
+    keeps refreshing, so a crashed worker's lock expires after `ttl`. SQLite
+    calls run on worker threads: a busy database must not stall the loop.
+
+    If the lease is lost (a refresh finds another owner, or cannot reach the
+    database before the lease runs out), the block is cancelled and LockLost
+    is raised, since another worker may already be running it.
+    """
+    if not shared_state_enabled():
+        lock = _LOCAL_LOCKS.setdefault(name, asyncio.Lock())
+        async with lock:
+            yield
+        return
+
+    coordinator = get_coordinator()
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    delay = poll_interval
+    while not await asyncio.to_thread(coordinator.try_acquire, name, owner, ttl):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+    holder = asyncio.current_task()
+    lost = False
+
+    async def _keep_alive() -> None:
+        nonlocal lost
+        expires_at = time.time() + ttl
+        while True:
+            await asyncio.sleep(ttl / 3)
+            try:
+                held = await asyncio.to_thread(coordinator.refresh, name, owner, ttl)
+            except sqlite3.Error:
+                logger.exception("[Coordination] Refreshing lock %s failed", name)
+                held = time.time() < expires_at
+            else:
+                if held:
+                    expires_at = time.time() + ttl
+            if not held:
+                lost = True
+                holder.cancel()
+                return
+
+    keeper = asyncio.create_task(_keep_alive())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if not lost:
+            raise
+        holder.uncancel()
+        raise LockLost(f"Lost lock {name!r} while holding it") from None
+    finally:
+        keeper.cancel()
+        await asyncio.to_thread(coordinator.release, name, owner)
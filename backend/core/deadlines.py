@@ -0,0 +1,156 @@
+"""
+Request deadlines and model-time accounting.
+
+A deadline is an absolute point on the monotonic clock kept in a context
+variable, so it follows a request through the orchestrator, run_turn and the
+LiteLLM client without being passed through every signature. Nested scopes
+can only shorten it: a per-stage default never extends a client's deadline.
+
+Cancelled runs are counted per pipeline step: `wasted_s` is model time spent on
+runs whose result was thrown away, `saved_s` estimates the model time not
+spent because the run was stopped early (average completed run minus elapsed).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Iterator, Optional
+
+# Seconds per stage run; override with DEADLINE_<STAGE>_SECONDS (0 disables).
+DEFAULT_STAGE_DEADLINES: dict[str, float] = {
+    "REQ": 120.0,
+    "ARTIFACTS_NON_TECH": 300.0,
+    "TECH_ARTIFACTS": 300.0,
+    "CODEGEN": 900.0,
+    "QA": 300.0,
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float  # time.monotonic()
+    source: str
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_CURRENT: ContextVar[Optional[Deadline]] = ContextVar("protopilot_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _CURRENT.get()
+
+
+def stage_deadline_seconds(stage: str) -> Optional[float]:
+    raw = os.getenv(f"DEADLINE_{stage}_SECONDS")
+    seconds = float(raw) if raw else DEFAULT_STAGE_DEADLINES.get(stage)
+    return seconds if seconds and seconds > 0 else None
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], source: str) -> Iterator[Optional[Deadline]]:
+    """Narrow the current deadline to `seconds` from now (no-op for None)."""
+    existing = _CURRENT.get()
+    if seconds is None:
+        yield existing
+        return
+    candidate = Deadline(expires_at=time.monotonic() + max(0.0, seconds), source=source)
+    chosen = existing if existing is not None and existing.expires_at <= candidate.expires_at else candidate
+    token = _CURRENT.set(chosen)
+    try:
+        yield chosen
+    finally:
+        _CURRENT.reset(token)
+
+
+def raise_if_expired(cause: Optional[BaseException] = None) -> None:
+    deadline = _CURRENT.get()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(f"{deadline.source} deadline exceeded") from cause
+
+
+@asynccontextmanager
+async def enforce_deadline() -> AsyncIterator[None]:
+    """Cancel the enclosed block when the current deadline passes."""
+    deadline = _CURRENT.get()
+    if deadline is None:
+        yield
+        return
+    try:
+        async with asyncio.timeout(deadline.remaining()):
+            yield
+    except DeadlineExceeded:
+        raise
+    except TimeoutError as e:
+        raise DeadlineExceeded(f"{deadline.source} deadline exceeded") from e
+
+
+@dataclass
+class StepModelTime:
+    completed: int = 0
+    completed_s: float = 0.0
+    cancelled: dict[str, int] = field(default_factory=dict)  # reason -> runs
+    wasted_s: float = 0.0
+    saved_s: float = 0.0
+
+    @property
+    def average_s(self) -> Optional[float]:
+        return self.completed_s / self.completed if self.completed else None
+
+
+class ModelTimeMetrics:
+    """Process-local; each worker reports its own runs."""
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._steps: dict[str, StepModelTime] = {}
+
+    def record_completed(self, step: str, elapsed_s: float) -> None:
+        with self._guard:
+            stats = self._steps.setdefault(step, StepModelTime())
+            stats.completed += 1
+            stats.completed_s += elapsed_s
+
+    def record_cancelled(self, step: str, elapsed_s: float, reason: str) -> float:
+        """Returns the estimated model time saved by stopping this run."""
+        with self._guard:
+            stats = self._steps.setdefault(step, StepModelTime())
+            stats.cancelled[reason] = stats.cancelled.get(reason, 0) + 1
+            stats.wasted_s += elapsed_s
+            saved = max(0.0, (stats.average_s or 0.0) - elapsed_s)
+            stats.saved_s += saved
+            return saved
+
+    def report(self) -> dict[str, Any]:
+        with self._guard:
+            steps = {
+                step: {
+                    **asdict(stats),
+                    "completed_s": round(stats.completed_s, 3),
+                    "wasted_s": round(stats.wasted_s, 3),
+                    "saved_s": round(stats.saved_s, 3),
+                    "average_s": round(stats.average_s, 3) if stats.average_s is not None else None,
+                }
+                for step, stats in self._steps.items()
+            }
+        return {
+            "steps": steps,
+            "wasted_s": round(sum(s["wasted_s"] for s in steps.values()), 3),
+            "saved_s": round(sum(s["saved_s"] for s in steps.values()), 3),
+        }
+
+
+model_time = ModelTimeMetrics()
@@ -1,10 +1,19 @@
+from __future__ import annotations
+
 import os
 import logging
-from google.adk.models.lite_llm import LiteLlm
+from typing import TYPE_CHECKING
+
+from core.deadlines import current_deadline
+
+if TYPE_CHECKING:
+    from google.adk.models.lite_llm import LiteLlm
 
 logger = logging.getLogger(__name__)
 
 def create_litellm(oauth_token: str, model: str | None = None) -> LiteLlm:
+    from google.adk.models.lite_llm import LiteLlm
+
     litellm_api_key = os.getenv("LITELLM_API_KEY", "")
     resolved_model = model or os.getenv("LITELLM_MODEL", "")
     api_base = os.getenv("LITELLM_API_BASE", "")
@@ -13,6 +22,9 @@ def create_litellm(oauth_token: str, model: str | None = None) -> LiteLlm:
         raise RuntimeError("Missing LITELLM_API_KEY / LITELLM_MODEL / LITELLM_API_BASE in .env")
 
     logger.info("[LiteLLM] Using model: %s", resolved_model)
+    # Agents are built per turn, so the HTTP timeout can follow the turn's deadline.
+    deadline = current_deadline()
+    extra = {"timeout": max(1.0, deadline.remaining())} if deadline is not None else {}
     return LiteLlm(
         model=resolved_model,
         api_base=api_base,
@@ -21,6 +33,7 @@ def create_litellm(oauth_token: str, model: str | None = None) -> LiteLlm:
             "Authorization": f"Bearer {oauth_token}",
             "x-litellm-api-key": litellm_api_key,
         },
+        **extra,
     )
 
     # Groq LLM for testing, not used in production
@@ -1,5 +1,7 @@
 import re
 
+from core.profiling import phase
+
 # recognize quesitons
 _ENUM_Q_RE = re.compile(
     r"(?m)^\s*(\d+)[\.\)\、]\s+(.*?)(?=\n\s*\d+[\.\)\、]\s+|\Z)",
@@ -10,6 +12,11 @@ _BULLET_LINE_RE = re.compile(r"(?m)^\s*[-•]\s+(.*)$")
 
 
 def extract_questions(text: str) -> list[dict[str, str]]:
+    with phase("parse_spec"):
+        return _extract_questions(text)
+
+
+def _extract_questions(text: str) -> list[dict[str, str]]:
     """
     Extract questions from model reply, return:
       [{"id": "Q1", "text": "..."}, ...]
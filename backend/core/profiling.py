@@ -0,0 +1,305 @@
+"""
+Request profiling and event-loop stall detection.
+
+- SamplingProfiler: a daemon thread that samples Python stacks with
+  sys._current_frames() and aggregates them as collapsed stacks
+  ("thread;outer;inner count" per line), the input format of flamegraph.pl,
+  inferno and speedscope. Samples cover the whole process, so a profile taken
+  for one request also shows whatever else the loop was doing meanwhile.
+- LoopMonitor: a heartbeat coroutine plus a watchdog thread. When the loop
+  misses its heartbeat for longer than LOOP_LAG_THRESHOLD_MS, the loop
+  thread's current stack is logged once for that stall.
+- phase(): wall time per named phase (lock wait, steps, model, encoding) for
+  the current request, reported as a Server-Timing header on debug requests.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# Leaf frames of worker threads that are parked, not working. An event loop
+# idling in selectors.py is kept: it shows how much of the window was idle.
+_IDLE_FILES = ("threading.py", "queue.py", "thread.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+@dataclass
+class Profile:
+    id: str
+    started_at: float
+    interval_s: float
+    duration_s: float = 0.0
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    phases: dict[str, Any] = field(default_factory=dict)
+    label: str = ""
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration_s, 3),
+            "interval_ms": self.interval_s * 1000,
+            "samples": self.samples,
+            "phases": self.phases,
+        }
+
+
+class SamplingProfiler:
+    def __init__(self, interval_s: float = PROFILE_INTERVAL_S, label: str = ""):
+        self.profile = Profile(id=uuid.uuid4().hex[:12], started_at=time.time(), interval_s=interval_s, label=label)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="protopilot-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.profile.duration_s = time.perf_counter() - self._started
+        return self.profile
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.profile.interval_s):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or names.get(ident, "").startswith("protopilot-loop-watchdog"):
+                    continue
+                thread_name = names.get(ident, str(ident))
+                if thread_name != "MainThread" and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                self.profile.stacks[";".join([thread_name, *_collapse(frame)])] += 1
+            self.profile.samples += 1
+
+
+class ProfileStore:
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self._keep = keep
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+        self._guard = threading.Lock()
+        self._pending_requests = 0
+
+    def add(self, profile: Profile) -> None:
+        with self._guard:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self._keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list[dict[str, Any]]:
+        return [profile.summary() for profile in reversed(list(self._profiles.values()))]
+
+    def profile_next_requests(self, count: int) -> None:
+        with self._guard:
+            self._pending_requests = max(0, count)
+
+    def take_request_slot(self) -> bool:
+        with self._guard:
+            if self._pending_requests <= 0:
+                return False
+            self._pending_requests -= 1
+            return True
+
+    @property
+    def pending_requests(self) -> int:
+        return self._pending_requests
+
+
+profile_store = ProfileStore()
+
+
+_PHASES: ContextVar[Optional[dict[str, list[float]]]] = ContextVar("protopilot_phases", default=None)
+
+
+@contextmanager
+def collect_phases() -> Iterator[dict[str, list[float]]]:
+    """Collect phase() timings of this request (and the tasks it starts)."""
+    phases: dict[str, list[float]] = {}
+    token = _PHASES.set(phases)
+    try:
+        yield phases
+    finally:
+        _PHASES.reset(token)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    phases = _PHASES.get()
+    if phases is not None:
+        entry = phases.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    if _PHASES.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+
+def phases_summary(phases: dict[str, list[float]]) -> dict[str, dict[str, float]]:
+    return {name: {"ms": round(total * 1000, 2), "count": count} for name, (total, count) in phases.items()}
+
+
+def server_timing(phases: dict[str, list[float]]) -> str:
+    return ", ".join(
+        f'{name};dur={total * 1000:.1f};desc="x{count}"' for name, (total, count) in phases.items()
+    )
+
+
+class LoopMonitor:
+    def __init__(self, threshold_s: float, interval_s: float = 0.05, keep: int = 10):
+        self.threshold_s = threshold_s
+        self.interval_s = interval_s
+        self.stalls: deque[dict[str, Any]] = deque(maxlen=keep)
+        self.stall_count = 0
+        self.max_lag_s = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._reported_beat = 0.0
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="protopilot-loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                expected = time.monotonic() + self.interval_s
+                await asyncio.sleep(self.interval_s)
+                now = time.monotonic()
+                self.max_lag_s = max(self.max_lag_s, now - expected)
+                self._beat = now
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold_s or beat == self._reported_beat:
+                continue
+            # One report per stall: the heartbeat has not moved since.
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.stall_count += 1
+            self.stalls.append({"at": time.time(), "blocked_ms": round(blocked * 1000, 1), "stack": stack})
+            logger.warning("[LOOP] event loop blocked for %.0fms; loop thread stack:\n%s", blocked * 1000, stack)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_s * 1000,
+            "stalls": self.stall_count,
+            "max_lag_ms": round(self.max_lag_s * 1000, 1),
+            "recent": list(self.stalls),
+        }
+
+
+def loop_monitor_enabled() -> bool:
+    return os.getenv("LOOP_MONITOR", "1").strip().lower() not in {"0", "false", "no"}
+
+
+loop_monitor = LoopMonitor(threshold_s=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250")) / 1000)
+
+
+def profile_header_enabled() -> bool:
+    # Off by default: the sampler is process-wide, so any client could start it
+    # and read other requests' stacks through its profile.
+    return os.getenv("PROFILE_HEADER", "0").strip().lower() in {"1", "true", "yes"}
+
+
+class DiagnosticsMiddleware:
+    """
+    ASGI middleware for HTTP requests. `X-Debug-Timings: 1` adds a
+    Server-Timing header with the phase breakdown. A slot armed via
+    POST /admin/profile/requests (or `X-Profile: 1` when PROFILE_HEADER is
+    on) samples the request and returns X-Profile-Id, to be fetched from
+    GET /admin/profiles/{id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        want_timings = headers.get("x-debug-timings", "").strip() in {"1", "true", "yes"}
+        want_profile = profile_header_enabled() and headers.get("x-profile", "").strip() in {"1", "true", "yes"}
+        if not want_profile and scope.get("path") == "/chat":
+            want_profile = profile_store.take_request_slot()
+        if not (want_timings or want_profile):
+            return await self.app(scope, receive, send)
+
+        profiler = SamplingProfiler(label=f"{scope.get('method')} {scope.get('path')}").start() if want_profile else None
+
+        with collect_phases() as phases:
+            async def _send(message):
+                if message["type"] == "http.response.start":
+                    extra = []
+                    if want_timings and phases:
+                        extra.append((b"server-timing", server_timing(phases).encode("latin-1")))
+                    if profiler is not None:
+                        extra.append((b"x-profile-id", profiler.profile.id.encode("latin-1")))
+                    message = {**message, "headers": [*message.get("headers", []), *extra]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, _send)
+            finally:
+                if profiler is not None:
+                    profile = profiler.stop()
+                    profile.phases = phases_summary(phases)
+                    profile_store.add(profile)
@@ -1,12 +1,14 @@
-import os
-from google.adk.runners import Runner
-from google.genai import types
-from core.sessions import session_service
+from core.deadlines import enforce_deadline, raise_if_expired
+from core.profiling import phase
+from core.sessions import delete_session, get_session_service, record_session_usage, session_scope
 import uuid
 
 async def run_turn(agent, session_id: str, message: str) -> str:
-    user_id = os.getenv("USER_ID", "local-user")
-    app_name = os.getenv("APP_NAME", "ProtoPilot")
+    from google.adk.runners import Runner
+    from google.genai import types
+
+    app_name, user_id = session_scope()
+    session_service = get_session_service()
 
     session = None
     try:
@@ -28,16 +30,33 @@ async def run_turn(agent, session_id: str, message: str) -> str:
     runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
 
     chunks: list[str] = []
+    # Rough size of what this turn appends to the session history.
+    added_bytes = len(message)
 
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session.id,
-        new_message=types.Content(role="user", parts=[types.Part(text=message)]),
-    ):
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if getattr(part, "text", None):
-                    chunks.append(part.text)
+    try:
+        # The current request/stage deadline bounds the whole turn, tool calls included.
+        async with enforce_deadline():
+            with phase("model"):
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session.id,
+                    new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+                ):
+                    if event.content and event.content.parts:
+                        for part in event.content.parts:
+                            if getattr(part, "text", None):
+                                chunks.append(part.text)
+                                added_bytes += len(part.text)
+                            elif getattr(part, "function_call", None) and part.function_call.args:
+                                added_bytes += len(str(part.function_call.args))
+                            elif getattr(part, "function_response", None) and part.function_response.response:
+                                added_bytes += len(str(part.function_response.response))
+    except Exception as e:
+        # A client timeout inside LiteLLM surfaces as its own error type.
+        raise_if_expired(e)
+        raise
+    finally:
+        record_session_usage(session_id, added_bytes)
 
     return "".join(chunks).strip()
 
@@ -45,4 +64,7 @@ async def run_turn(agent, session_id: str, message: str) -> str:
 
 async def run_once(agent, message: str) -> str:
     temp_session_id = f"job-{uuid.uuid4().hex[:12]}"
-    return await run_turn(agent, session_id=temp_session_id, message=message)
\ No newline at end of file
+    try:
+        return await run_turn(agent, session_id=temp_session_id, message=message)
+    finally:
+        await delete_session(temp_session_id)
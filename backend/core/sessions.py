@@ -1,3 +1,70 @@
-from google.adk.sessions import InMemorySessionService
+import os
+import threading
+import time
+from dataclasses import dataclass
+from core.coordination import shared_state_enabled, state_db_path
 
-session_service = InMemorySessionService()
\ No newline at end of file
+
+def _create_session_service():
+    if shared_state_enabled():
+        from google.adk.sessions import DatabaseSessionService
+
+        return DatabaseSessionService(db_url=os.getenv("SESSION_DB_URL") or f"sqlite:///{state_db_path()}")
+    from google.adk.sessions import InMemorySessionService
+
+    return InMemorySessionService()
+
+
+_session_service = None
+_session_service_guard = threading.Lock()
+
+
+def get_session_service():
+    """Process-wide ADK session service, created (and google.adk imported) on first use."""
+    global _session_service
+    if _session_service is None:
+        with _session_service_guard:
+            if _session_service is None:
+                _session_service = _create_session_service()
+    return _session_service
+
+
+def session_scope() -> tuple[str, str]:
+    """(app_name, user_id) every ADK session of this backend lives under."""
+    return os.getenv("APP_NAME", "ProtoPilot"), os.getenv("USER_ID", "local-user")
+
+
+@dataclass
+class SessionUsage:
+    last_access: float
+    approx_bytes: int = 0
+
+
+# Process-local bookkeeping used by the resource manager; the sessions
+# themselves live in the ADK session service.
+_SESSION_USAGE: dict[str, SessionUsage] = {}
+
+
+def record_session_usage(session_id: str, added_bytes: int) -> None:
+    usage = _SESSION_USAGE.get(session_id)
+    if usage is None:
+        usage = _SESSION_USAGE[session_id] = SessionUsage(last_access=time.time())
+    usage.last_access = time.time()
+    usage.approx_bytes += added_bytes
+
+
+def session_usage() -> dict[str, SessionUsage]:
+    return dict(_SESSION_USAGE)
+
+
+async def delete_session(session_id: str) -> None:
+    app_name, user_id = session_scope()
+    _SESSION_USAGE.pop(session_id, None)
+    if _session_service is None:
+        # No session was ever created in this process.
+        return
+    try:
+        await get_session_service().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    except Exception:
+        # Already gone (or never created); nothing to free.
+        pass
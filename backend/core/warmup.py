@@ -0,0 +1,90 @@
+"""
+Optional start-up warm-up (WARMUP_ON_STARTUP=1).
+
+Heavy imports are deferred until first use, so without warm-up the first
+/chat pays for google.adk/litellm imports, the OAuth round trip and agent
+construction. warm_up() does that work in the background right after start-up
+and /ready reports when it has finished.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_HEAVY_MODULES = (
+    "google.adk.runners",
+    "google.adk.models.lite_llm",
+    "google.genai.types",
+)
+
+_status: dict[str, Any] = {
+    "enabled": False,
+    "ready": False,
+    "error": None,
+    "timings_ms": {},
+}
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("WARMUP_ON_STARTUP", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def readiness() -> dict[str, Any]:
+    # Without warm-up everything is loaded lazily, so the API is ready at once.
+    enabled = warmup_enabled()
+    return {**_status, "enabled": enabled, "ready": _status["ready"] or not enabled}
+
+
+async def _timed(name: str, fn) -> Any:
+    started = time.perf_counter()
+    result = fn()
+    if hasattr(result, "__await__"):
+        result = await result
+    _status["timings_ms"][name] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def warm_up() -> None:
+    from agents.registry import AGENT_FACTORIES
+    from core.auth import get_oauth_token
+    from core.sessions import get_session_service
+
+    _status["enabled"] = True
+    try:
+        # The heavy imports take seconds; run them in a worker thread so
+        # /health and /ready keep answering meanwhile.
+        await _timed(
+            "imports",
+            lambda: asyncio.to_thread(lambda: [importlib.import_module(name) for name in _HEAVY_MODULES]),
+        )
+        await _timed("session_service", lambda: asyncio.to_thread(get_session_service))
+        token = await _timed("oauth_token", get_oauth_token)
+        for name, factory in AGENT_FACTORIES.items():
+            await _timed(f"agent:{name}", lambda factory=factory: factory(token, tools=[]))
+        await _timed("llm_connection", _prime_llm_connection)
+        _status["ready"] = True
+        logger.info("[Warmup] Ready in %s", _status["timings_ms"])
+    except Exception as e:
+        _status["error"] = str(e)
+        logger.exception("[Warmup] Failed; the API keeps serving with lazy initialisation")
+
+
+async def _prime_llm_connection() -> None:
+    # Resolve DNS and complete the TLS handshake to the LLM gateway; any HTTP
+    # status is fine, only connectivity matters here.
+    api_base = os.getenv("LITELLM_API_BASE", "")
+    if not api_base:
+        return
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        try:
+            await client.get(api_base)
+        except httpx.HTTPError as e:
+            logger.warning("[Warmup] Could not reach %s: %s", api_base, e)
@@ -0,0 +1,279 @@
+"""
+Batch pipeline runner: push many projects through REQ -> ARTIFACTS_NON_TECH ->
+TECH_ARTIFACTS -> CODEGEN without a human in the loop.
+
+Each item is either an idea text (the requirements agent is told to assume
+instead of asking) or a ready spec (submitted directly, skipping REQ).
+Approval gates are auto-approved. Projects run concurrently up to a limit and
+report progress through a callback.
+
+CLI:
+    python -m orchestration.batch ideas.jsonl --concurrency 4 --out batch_runs
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from orchestration.orchestrator import Orchestrator
+from orchestration.store import Stage, get_or_create_project
+from orchestration.tool_runtime import run_blocking
+from orchestration.tools import submit_spec
+
+ProgressCallback = Callable[[dict[str, Any]], Awaitable[None] | None]
+
+AUTO_IDEA_PREFIX = (
+    "Batch mode: nobody will answer clarification questions. "
+    "Make reasonable assumptions, record them under assumptions, "
+    "and call submit_spec(project_id, spec) in this turn.\n\nProduct idea:\n"
+)
+AUTO_REQ_ANSWER = "Use your best judgement for every open point and call submit_spec now."
+
+
+@dataclass
+class BatchItem:
+    id: str
+    idea: Optional[str] = None
+    spec: Optional[dict[str, Any]] = None
+
+    @classmethod
+    def from_raw(cls, raw: Any, index: int) -> "BatchItem":
+        if isinstance(raw, str):
+            return cls(id=f"item{index}", idea=raw)
+        if not isinstance(raw, dict) or not (raw.get("idea") or raw.get("spec")):
+            raise ValueError(f"Batch item {index} needs an 'idea' or a 'spec'")
+        if raw.get("spec") is not None and not isinstance(raw["spec"], dict):
+            raise ValueError(f"Batch item {index}: 'spec' must be an object")
+        # The id becomes part of the project id and an output directory name.
+        item_id = re.sub(r"[^A-Za-z0-9_.-]", "-", str(raw.get("id") or f"item{index}")).lstrip(".") or f"item{index}"
+        return cls(id=item_id, idea=raw.get("idea"), spec=raw.get("spec"))
+
+
+@dataclass
+class BatchResult:
+    item_id: str
+    project_id: str
+    status: str  # completed / stalled / failed
+    stage: str
+    turns: int
+    elapsed_s: float
+    error: Optional[str] = None
+    stage_timings_s: dict[str, float] = field(default_factory=dict)
+
+
+async def _emit(on_progress: Optional[ProgressCallback], event: dict[str, Any]) -> None:
+    if on_progress is None:
+        return
+    result = on_progress(event)
+    if asyncio.iscoroutine(result):
+        await result
+
+
+async def run_project(
+    orch: Orchestrator,
+    item: BatchItem,
+    batch_id: str,
+    on_progress: Optional[ProgressCallback] = None,
+    max_turns: int = 12,
+) -> BatchResult:
+    project_id = f"batch-{batch_id}-{item.id}"
+    started = time.perf_counter()
+    stage_started = started
+    timings: dict[str, float] = {}
+    turns = 0
+
+    await asyncio.to_thread(get_or_create_project, project_id, project_id)
+    await _emit(on_progress, {"event": "started", "item_id": item.id, "project_id": project_id})
+
+    try:
+        if item.spec is not None:
+            await run_blocking(submit_spec, project_id, item.spec)
+        stalled_turns = 0
+        while turns < max_turns:
+            proj = await asyncio.to_thread(get_or_create_project, project_id, project_id)
+            before = proj.stage
+            if before == Stage.QA:
+                break
+            if before == Stage.WAIT_APPROVAL:
+                message = "approve"
+            elif before == Stage.REQ:
+                message = AUTO_IDEA_PREFIX + item.idea if turns == 0 and item.idea else AUTO_REQ_ANSWER
+            else:
+                # Artifact/codegen stages ignore the message; this just retries the stage.
+                message = "continue"
+
+            await orch.handle(project_id, project_id, message)
+            turns += 1
+            after = (await asyncio.to_thread(get_or_create_project, project_id, project_id)).stage
+            if after != before:
+                now = time.perf_counter()
+                timings[before.value] = round(timings.get(before.value, 0.0) + now - stage_started, 3)
+                stage_started = now
+                stalled_turns = 0
+            else:
+                stalled_turns += 1
+            await _emit(
+                on_progress,
+                {"event": "turn", "item_id": item.id, "project_id": project_id, "turn": turns, "stage": after.value},
+            )
+            if stalled_turns >= 3:
+                break
+
+        proj = await asyncio.to_thread(get_or_create_project, project_id, project_id)
+        status = "completed" if proj.stage == Stage.QA else "stalled"
+        result = BatchResult(
+            item_id=item.id,
+            project_id=project_id,
+            status=status,
+            stage=proj.stage.value,
+            turns=turns,
+            elapsed_s=round(time.perf_counter() - started, 3),
+            stage_timings_s=timings,
+        )
+    except Exception as e:
+        proj = await asyncio.to_thread(get_or_create_project, project_id, project_id)
+        result = BatchResult(
+            item_id=item.id,
+            project_id=project_id,
+            status="failed",
+            stage=proj.stage.value,
+            turns=turns,
+            elapsed_s=round(time.perf_counter() - started, 3),
+            error=str(e),
+            stage_timings_s=timings,
+        )
+
+    await _emit(on_progress, {"event": "finished", **asdict(result)})
+    return result
+
+
+def new_batch_id() -> str:
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+async def run_batch(
+    items: list[BatchItem],
+    concurrency: int = 4,
+    on_progress: Optional[ProgressCallback] = None,
+    orch: Optional[Orchestrator] = None,
+    batch_id: Optional[str] = None,
+    max_turns: int = 12,
+) -> tuple[str, list[BatchResult]]:
+    """
+    Run every item through the pipeline, at most `concurrency` at a time.
+    Returns (batch_id, results in input order).
+    """
+    ids = [item.id for item in items]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Batch item ids must be unique")
+    orch = orch or Orchestrator()
+    batch_id = batch_id or new_batch_id()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _guarded(item: BatchItem) -> BatchResult:
+        async with semaphore:
+            return await run_project(orch, item, batch_id, on_progress, max_turns)
+
+    results = await asyncio.gather(*(_guarded(item) for item in items))
+    return batch_id, list(results)
+
+
+def _safe_relpath(path: str) -> Optional[str]:
+    # Generated file names come from the model; never let them escape the output dir.
+    normalized = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+    if not normalized or normalized == "." or normalized.startswith(".."):
+        return None
+    return normalized
+
+
+def _write_documents(root: Path, documents: Optional[dict[str, Any]]) -> int:
+    written = 0
+    for name, body in (documents or {}).items():
+        rel = _safe_relpath(name)
+        if rel is None:
+            continue
+        target = root / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(body if isinstance(body, str) else json.dumps(body, indent=2), encoding="utf-8")
+        written += 1
+    return written
+
+
+def write_results(batch_id: str, results: list[BatchResult], out_dir: str) -> Path:
+    """
+    Write every project's spec, artifacts and code under <out_dir>/<batch_id>/
+    plus one summary.jsonl line per project.
+    """
+    root = Path(out_dir) / batch_id
+    root.mkdir(parents=True, exist_ok=True)
+    with (root / "summary.jsonl").open("w", encoding="utf-8") as summary:
+        for result in results:
+            proj = get_or_create_project(result.project_id, result.project_id)
+            project_root = root / result.item_id
+            project_root.mkdir(parents=True, exist_ok=True)
+            if proj.spec is not None:
+                (project_root / "spec.json").write_text(json.dumps(proj.spec, indent=2, ensure_ascii=False), encoding="utf-8")
+            _write_documents(project_root / "nontech_artifacts", proj.nontech_artifacts_md)
+            _write_documents(project_root / "technical_artifacts", proj.technical_artifacts_md)
+            files = _write_documents(project_root / "code", proj.generated_code_files)
+            summary.write(json.dumps({**asdict(result), "code_files": files}, ensure_ascii=False) + "\n")
+    return root
+
+
+def load_items(path: str) -> list[BatchItem]:
+    """
+    Accepts a JSON array, JSON lines (objects or strings), or plain text with
+    one idea per line.
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        raw_items = json.loads(stripped)
+    else:
+        raw_items = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                raw_items.append(json.loads(line) if line[0] in "{\"" else line)
+            except json.JSONDecodeError:
+                raw_items.append(line)
+    return [BatchItem.from_raw(raw, index) for index, raw in enumerate(raw_items, start=1)]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run many projects through the full pipeline.")
+    parser.add_argument("input", help="JSON / JSONL / text file with ideas or specs")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")))
+    parser.add_argument("--out", default=os.getenv("BATCH_OUTPUT_DIR", "batch_runs"))
+    parser.add_argument("--max-turns", type=int, default=12)
+    args = parser.parse_args(argv)
+
+    items = load_items(args.input)
+
+    def _print(event: dict[str, Any]) -> None:
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+
+    batch_id, results = asyncio.run(run_batch(items, args.concurrency, _print, max_turns=args.max_turns))
+    root = write_results(batch_id, results, args.out)
+    completed = sum(1 for r in results if r.status == "completed")
+    print(f"[BATCH] {completed}/{len(results)} completed; results in {root}", file=sys.stderr)
+    return 0 if completed == len(results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+"""
+Compressed, interned bodies for artifact documents and generated code.
+
+ProjectState.nontech_artifacts_md, technical_artifacts_md and
+generated_code_files hold BlobMaps: read-only Mapping[str, str] views over
+Blob objects. A Blob keeps the zlib-compressed UTF-8 body under its sha256.
+Identical bodies anywhere in the process (another project, the version
+history) resolve to the same Blob through a weak intern table, so a file
+costs its compressed size once and disappears when nothing references it.
+
+Reading a body decompresses it through a small LRU of hot entries
+(BLOB_CACHE_MB). Bulk reads (JSON encoding, tool results for the model) go
+through unpack(), which skips the LRU so a full code dump does not evict the
+files agents keep re-reading.
+
+BlobMaps are immutable: tools build new ones with pack() / merge(), and a
+checkpoint can keep a reference instead of copying.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Optional
+
+BLOB_CACHE_BYTES = int(float(os.getenv("BLOB_CACHE_MB", "16")) * 1024 * 1024)
+# Below this, zlib's header and dictionary cost more than they save.
+BLOB_MIN_COMPRESS = 256
+
+
+class Blob:
+    __slots__ = ("digest", "data", "size", "compressed", "__weakref__")
+
+    def __init__(self, digest: str, data: bytes, size: int, compressed: bool):
+        self.digest = digest
+        self.data = data
+        self.size = size  # uncompressed UTF-8 bytes
+        self.compressed = compressed
+
+    @property
+    def stored_size(self) -> int:
+        return len(self.data)
+
+    def decode(self) -> str:
+        raw = zlib.decompress(self.data) if self.compressed else self.data
+        return raw.decode("utf-8")
+
+    def text(self) -> str:
+        return _text_cache.get(self)
+
+
+class _TextCache:
+    """LRU of decompressed bodies, bounded by their UTF-8 size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._bytes = 0
+        self._guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, blob: Blob) -> str:
+        with self._guard:
+            entry = self._entries.get(blob.digest)
+            if entry is not None:
+                self._entries.move_to_end(blob.digest)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        text = blob.decode()
+        if blob.size <= self.max_bytes:
+            with self._guard:
+                if blob.digest not in self._entries:
+                    self._entries[blob.digest] = (text, blob.size)
+                    self._bytes += blob.size
+                while self._bytes > self.max_bytes:
+                    _digest, (_text, size) = self._entries.popitem(last=False)
+                    self._bytes -= size
+        return text
+
+    def stats(self) -> dict[str, int]:
+        with self._guard:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_text_cache = _TextCache(BLOB_CACHE_BYTES)
+_INTERNED: "weakref.WeakValueDictionary[str, Blob]" = weakref.WeakValueDictionary()
+_intern_guard = threading.Lock()
+_deduplicated = 0
+
+
+def as_text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, indent=2)
+
+
+def intern_text(text: str) -> Blob:
+    """Return the process-wide Blob for `text`, compressing it on first sight."""
+    global _deduplicated
+    raw = text.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    with _intern_guard:
+        blob = _INTERNED.get(digest)
+        if blob is not None:
+            _deduplicated += 1
+            return blob
+    packed = zlib.compress(raw, 6) if len(raw) >= BLOB_MIN_COMPRESS else raw
+    compressed = len(packed) < len(raw)
+    candidate = Blob(digest, packed if compressed else raw, len(raw), compressed)
+    with _intern_guard:
+        blob = _INTERNED.get(digest)
+        if blob is None:
+            _INTERNED[digest] = blob = candidate
+        return blob
+
+
+def interned_blob(digest: str) -> Optional[Blob]:
+    """The live Blob for `digest`, if anything in the process still references it."""
+    with _intern_guard:
+        return _INTERNED.get(digest)
+
+
+class BlobMap(Mapping):
+    """Read-only name -> body mapping; bodies are decompressed on access."""
+
+    __slots__ = ("_blobs",)
+
+    def __init__(self, blobs: dict[str, Blob]):
+        self._blobs = blobs
+
+    def __getitem__(self, name: str) -> str:
+        return self._blobs[name].text()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._blobs)
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._blobs
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, BlobMap):
+            return self.digests() == other.digests()
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __copy__(self) -> "BlobMap":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "BlobMap":
+        return self
+
+    def __repr__(self) -> str:
+        return f"BlobMap({len(self._blobs)} entries, {self.stored_bytes()} stored bytes)"
+
+    def blob(self, name: str) -> Blob:
+        return self._blobs[name]
+
+    def blobs(self) -> dict[str, Blob]:
+        return dict(self._blobs)
+
+    def digests(self) -> dict[str, str]:
+        return {name: blob.digest for name, blob in self._blobs.items()}
+
+    def raw_bytes(self) -> int:
+        return sum(blob.size for blob in self._blobs.values())
+
+    def stored_bytes(self) -> int:
+        return sum(blob.stored_size for blob in self._blobs.values())
+
+
+def _blob_entries(documents: Optional[Mapping]) -> dict[str, Blob]:
+    if documents is None:
+        return {}
+    if isinstance(documents, BlobMap):
+        return documents.blobs()
+    return {name: body if isinstance(body, Blob) else intern_text(as_text(body)) for name, body in documents.items()}
+
+
+def pack(documents: Optional[Mapping]) -> Optional[BlobMap]:
+    """Compress a document dict into a BlobMap (None stays None; non-str bodies become JSON text)."""
+    if documents is None or isinstance(documents, BlobMap):
+        return documents
+    return BlobMap(_blob_entries(documents))
+
+
+def merge(base: Optional[Mapping], updates: Optional[Mapping], removed: Iterable[str] = ()) -> BlobMap:
+    """`{**base, **updates}` minus `removed`, without decompressing the entries of base."""
+    blobs = _blob_entries(base)
+    blobs.update(_blob_entries(updates))
+    for name in removed:
+        blobs.pop(name, None)
+    return BlobMap(blobs)
+
+
+def unpack(value: Any) -> Any:
+    """Plain dict for a BlobMap (for JSON and tool results); anything else is returned as is."""
+    if isinstance(value, BlobMap):
+        return {name: blob.decode() for name, blob in value.blobs().items()}
+    return value
+
+
+def blob_stats() -> dict[str, Any]:
+    with _intern_guard:
+        blobs = list(_INTERNED.values())
+        deduplicated = _deduplicated
+    raw = sum(blob.size for blob in blobs)
+    stored = sum(blob.stored_size for blob in blobs)
+    return {
+        "interned": len(blobs),
+        "raw_bytes": raw,
+        "stored_bytes": stored,
+        "ratio": round(raw / stored, 2) if stored else 0.0,
+        "deduplicated": deduplicated,
+        "cache": _text_cache.stats(),
+    }
@@ -0,0 +1,136 @@
+"""
+In-process pub/sub bus for project change events.
+
+Tools and the orchestrator publish compact deltas (stage changes, which
+artifact or code files changed). Every event gets a per-project sequence
+number and the last EVENT_HISTORY_SIZE events are kept so a reconnecting
+client can resume from the last sequence it saw.
+
+Each subscriber has a bounded queue. A subscriber that falls behind is not
+allowed to grow memory: its queue is dropped and replaced by a single
+`resync` event telling the client to re-fetch full state.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "256"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", "64"))
+
+
+@dataclass(frozen=True)
+class ProjectEvent:
+    seq: int
+    project_id: str
+    type: str
+    data: dict[str, Any]
+    ts: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class Subscription:
+    def __init__(self, project_id: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.project_id = project_id
+        self.loop = loop
+        self.queue: asyncio.Queue[ProjectEvent] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _deliver(self, event: ProjectEvent) -> None:
+        # Runs on the subscriber's loop.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(
+                ProjectEvent(seq=event.seq, project_id=self.project_id, type="resync", data={"reason": "slow_consumer"})
+            )
+
+    async def get(self) -> ProjectEvent:
+        return await self.queue.get()
+
+
+class EventBus:
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self._history_size = history_size
+        self._queue_size = queue_size
+        self._guard = threading.Lock()
+        self._seq: dict[str, int] = {}
+        self._history: dict[str, deque[ProjectEvent]] = {}
+        self._subscribers: dict[str, set[Subscription]] = {}
+
+    def publish(self, project_id: str, type: str, data: dict[str, Any]) -> ProjectEvent:
+        """Safe to call from the event loop or from worker threads."""
+        with self._guard:
+            seq = self._seq.get(project_id, 0) + 1
+            self._seq[project_id] = seq
+            event = ProjectEvent(seq=seq, project_id=project_id, type=type, data=data)
+            self._history.setdefault(project_id, deque(maxlen=self._history_size)).append(event)
+            subscribers = list(self._subscribers.get(project_id, ()))
+
+        for sub in subscribers:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is sub.loop:
+                sub._deliver(event)
+            elif not sub.loop.is_closed():
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+        return event
+
+    def subscribe(self, project_id: str, since: Optional[int] = None) -> Subscription:
+        """
+        Register a subscriber. With `since`, events after that sequence number
+        are replayed first; if they are no longer in history a `resync` event
+        is queued instead. A `since` ahead of the latest sequence means the
+        numbering restarted (server restart, project evicted), so it resyncs too.
+        """
+        sub = Subscription(project_id, asyncio.get_running_loop(), self._queue_size)
+        with self._guard:
+            self._subscribers.setdefault(project_id, set()).add(sub)
+            history = list(self._history.get(project_id, ()))
+            latest = self._seq.get(project_id, 0)
+
+        if since is not None and since > latest:
+            sub._deliver(ProjectEvent(seq=latest, project_id=project_id, type="resync", data={"reason": "sequence_reset"}))
+        elif since is not None and since < latest:
+            oldest = history[0].seq if history else latest + 1
+            if since + 1 < oldest:
+                sub._deliver(ProjectEvent(seq=latest, project_id=project_id, type="resync", data={"reason": "history_gap"}))
+            else:
+                for event in history:
+                    if event.seq > since:
+                        sub._deliver(event)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._guard:
+            subscribers = self._subscribers.get(sub.project_id)
+            if subscribers is not None:
+                subscribers.discard(sub)
+                if not subscribers:
+                    del self._subscribers[sub.project_id]
+
+    def latest_seq(self, project_id: str) -> int:
+        with self._guard:
+            return self._seq.get(project_id, 0)
+
+    def forget(self, project_id: str) -> None:
+        """Drop history for an evicted project; live subscribers stay attached."""
+        with self._guard:
+            self._history.pop(project_id, None)
+            if project_id not in self._subscribers:
+                self._seq.pop(project_id, None)
+
+
+event_bus = EventBus()
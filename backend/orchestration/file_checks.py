@@ -0,0 +1,110 @@
+"""
+Cheap checks on a single generated file before it is stored.
+
+They catch what breaks a per-file save in practice: unsafe or malformed
+paths, markdown fences around the code, JSON that does not parse and output
+cut off mid-file (more brackets opened than closed). They are not a compiler;
+anything they cannot judge passes.
+"""
+from __future__ import annotations
+
+import json
+import posixpath
+import re
+from typing import Optional
+
+MAX_FILE_BYTES = 512 * 1024
+_PATH_RE = re.compile(r"^[A-Za-z0-9_.@()\[\]+-]+(?:/[A-Za-z0-9_.@()\[\]+-]+)*$")
+_BRACKETED = (".ts", ".js", ".mjs", ".scss", ".css")
+_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+
+def check_path(path: str) -> Optional[str]:
+    if not isinstance(path, str) or not path.strip():
+        return "path is empty"
+    if path.startswith("/") or "\\" in path or not _PATH_RE.match(path):
+        return f"path {path!r} must be relative, with letters, digits and -_.@()[]+ only"
+    if posixpath.normpath(path) != path or path.split("/")[0] == "..":
+        return f"path {path!r} must not contain '.', '..' or empty segments"
+    return None
+
+
+def _skip_string(content: str, i: int, quote: str) -> tuple[int, bool]:
+    """Index after the string opened at content[i - 1]; True if it stops at a template `${`."""
+    n = len(content)
+    while i < n:
+        ch = content[i]
+        if ch == "\\":
+            i += 2
+        elif ch == quote:
+            return i + 1, False
+        elif quote == "`" and content.startswith("${", i):
+            return i + 2, True
+        elif ch == "\n" and quote != "`":
+            return i, False  # Unterminated one-line string: not ours to judge.
+        else:
+            i += 1
+    return n + 1, False
+
+
+def _unclosed(content: str) -> Optional[str]:
+    """First bracket left open at end of file, skipping strings and comments."""
+    stack: list[str] = []  # "${" marks a template substitution to return to.
+    i, n = 0, len(content)
+    while i < n:
+        ch = content[i]
+        # "://" is a URL (url(http://...) in styles, a string-less import), not a comment.
+        if content.startswith("//", i) and content[i - 1 : i] != ":":
+            end = content.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if content.startswith("/*", i):
+            end = content.find("*/", i + 2)
+            if end < 0:
+                return "/*"
+            i = end + 2
+            continue
+        if ch in "'\"`" or (ch == "}" and stack and stack[-1] == "${"):
+            if ch == "}":
+                stack.pop()
+                ch = "`"
+            i, substitution = _skip_string(content, i + 1, ch)
+            if i > n:
+                return ch
+            if substitution:
+                stack.append("${")
+            continue
+        if ch in "([{":
+            stack.append(ch)
+        elif ch in _PAIRS:
+            if not stack or stack[-1] != _PAIRS[ch]:
+                return None  # Mismatch (a regex literal, say): give up rather than misreport.
+            stack.pop()
+        i += 1
+    return (stack[-1] if stack[-1] != "${" else "`") if stack else None
+
+
+def check_content(path: str, content: str) -> Optional[str]:
+    if not isinstance(content, str):
+        return "content must be a string"
+    if not content.strip():
+        return "content is empty"
+    if len(content.encode("utf-8")) > MAX_FILE_BYTES:
+        return f"content exceeds {MAX_FILE_BYTES // 1024} KB"
+    if content.lstrip().startswith("```"):
+        return "content is wrapped in a markdown code fence; send the file body only"
+    if path.endswith(".json"):
+        try:
+            json.loads(content)
+        except ValueError as e:
+            return f"invalid JSON: {e}"
+    elif path.endswith(_BRACKETED):
+        opened = _unclosed(content)
+        if opened is not None:
+            return f"{opened!r} is never closed; the file looks cut off"
+    return None
+
+
+def validate_code_file(path: str, content: str) -> Optional[str]:
+    """Return why the file should be rejected, or None if it looks complete."""
+    return check_path(path) or check_content(path, content)
@@ -1,182 +1,488 @@
-from typing import Any
+import functools
+import json
+import os
+import time
+from typing import Any, Callable, Optional
 
 from core.auth import get_oauth_token
+from core.deadlines import DeadlineExceeded, deadline_scope, enforce_deadline
+from core.profiling import record_phase
 from core.runner import run_turn
 from agents.registry import AGENT_FACTORIES
 from orchestration.tools import (
     load_spec,
     save_nontech_artifacts,
-    save_technical_artifacts,
+    save_technical_documents,
     set_project_stage,
     submit_spec,
     load_artifacts,
     save_generated_code,
+    seed_generated_code,
+    load_reference_project,
+    load_reference_code,
+    copy_reference_files,
+    begin_codegen_attempt,
+    codegen_remaining,
+    record_codegen_error,
+    begin_codegen,
+    save_generated_file,
+    finish_codegen,
+    checkpoint_generated_code,
+    list_code_files,
+    read_code_file,
+    search_code,
+    apply_code_patch,
+    set_reuse_enabled,
 )
-from orchestration.store import Stage, get_or_create_project
+from orchestration.events import event_bus
+from orchestration.pipeline import Pipeline, Step, StepContext, StepResult, run_pipeline
+from orchestration.scaffold import render_scaffold, scaffold_enabled, scaffold_prompt
+from orchestration.snapshot import ProjectResponse
+from orchestration.spec_docs import render_structural_docs, structural_docs_prompt
+from orchestration.store import ProjectState, Stage, get_or_create_project, project_turn
+from orchestration.tool_runtime import agent_tools, run_blocking
+
+# Technical artifacts are written by two agent runs in parallel, each in its own ADK session.
+# The structural documents (spec_docs.STRUCTURAL_DOCUMENTS) are rendered locally alongside.
+TECHNICAL_DOCUMENT_GROUPS: dict[str, tuple[str, ...]] = {
+    "technical_design": ("system_design.md", "project_structure.md"),
+    "technical_interfaces": ("api_documentation.md",),
+}
+TECHNICAL_SESSION_SUFFIXES: dict[str, str] = {
+    "technical_design": "-tech",
+    "technical_interfaces": "-tech-interfaces",
+}
+
+# Follow-up prompts per codegen turn when planned files are still missing
+# (e.g. a response cut off at the output token cap).
+CODEGEN_CONTINUATIONS = int(os.getenv("CODEGEN_CONTINUATIONS", "2"))
+
+
+def _noting_saved(tool: Callable[..., dict[str, Any]], saved: set[str]) -> Callable[..., dict[str, Any]]:
+    """`tool` as the agent sees it, also adding the document names each successful call saved to `saved`."""
+
+    @functools.wraps(tool)
+    def wrapper(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        result = tool(*args, **kwargs)
+        if result.get("ok"):
+            saved.update(result.get("saved", ()))
+        return result
+
+    return wrapper
 
 
 class Orchestrator:
-    def _build_response(self, proj, reply: str, artifacts_md: dict[str, str] | None = None, generated_code_files: dict[str, str] | None = None) -> dict[str, Any]:
-        return {
-            "stage": proj.stage,
-            "reply": reply,
-            "spec": proj.spec,
-            "nontech_artifacts_md": proj.nontech_artifacts_md,
-            "technical_artifacts_md": proj.technical_artifacts_md,
-            "artifacts_md": artifacts_md or proj.technical_artifacts_md or proj.nontech_artifacts_md,
-            "generated_code_files": generated_code_files or proj.generated_code_files,
-        }
+    def _build_response(self, proj, reply: str, artifacts_field: str | None = None) -> ProjectResponse:
+        # artifacts_md is the requested artifact set, else the latest one available.
+        if not (artifacts_field and getattr(proj, artifacts_field)):
+            artifacts_field = "technical_artifacts_md" if proj.technical_artifacts_md else "nontech_artifacts_md"
+        return ProjectResponse(proj, reply, artifacts_field)
 
     def _requirements_tools(self) -> list:
-        return [submit_spec, set_project_stage]
+        return agent_tools(submit_spec, set_project_stage)
 
-    def _artifacts_tools(self) -> list:
-        return [load_spec, save_nontech_artifacts, save_technical_artifacts, set_project_stage]
+    def _artifacts_tools(self, phase: str = "non_tech", saved: Optional[set[str]] = None) -> list:
+        if phase == "technical":
+            save = save_technical_documents if saved is None else _noting_saved(save_technical_documents, saved)
+            return agent_tools(load_spec, save, load_reference_project)
+        return agent_tools(load_spec, save_nontech_artifacts, set_project_stage, load_reference_project)
 
     def _code_generation_tools(self) -> list:
-        return [load_spec, load_artifacts, save_generated_code, set_project_stage]
+        return agent_tools(
+            load_spec,
+            load_artifacts,
+            begin_codegen,
+            save_generated_file,
+            finish_codegen,
+            save_generated_code,
+            set_project_stage,
+            load_reference_project,
+            load_reference_code,
+            copy_reference_files,
+        )
 
-    async def _handle_wait_approval(self, project_id: str, req_session_id: str, normalized: str) -> dict[str, Any]:
-        proj = get_or_create_project(project_id, req_session_id)
-        if normalized == "approve":
-            set_project_stage(project_id, Stage.TECH_ARTIFACTS.value)
-            return {}
-        if normalized == "change":
-            set_project_stage(project_id, Stage.REQ.value)
-            proj = get_or_create_project(project_id, req_session_id)
-            return self._build_response(
-                proj=proj,
-                reply='{"message": "You have entered revision mode. Please enter the points to be modified."}',
-                artifacts_md=proj.nontech_artifacts_md,
+    def _refine_tools(self) -> list:
+        return agent_tools(load_spec, list_code_files, read_code_file, search_code, apply_code_patch)
+
+    def _reuse_hint(self, project_id: str, req_session_id: str, target: str) -> str:
+        """Prompt suffix pointing the agent at a similar prior project, if one was matched."""
+        source = get_or_create_project(project_id, req_session_id).reuse_source
+        if not source:
+            return ""
+        hint = (
+            f"\n\nA similar completed project exists (similarity {source['score']}). "
+            "Call load_reference_project(project_id) and use it as a starting draft to edit; "
+            "keep what fits this spec and change what differs."
+        )
+        if target == "code":
+            hint += (
+                " For code files that fit unchanged, call copy_reference_files(project_id, paths) "
+                "instead of re-emitting them; use load_reference_code(project_id, paths) to inspect files first."
+            )
+        else:
+            hint += f" Reuse the structure of its {target} artifacts."
+        return hint
+
+    def pipeline(self) -> Pipeline:
+        """
+        REQ -> non-tech artifacts -> PM approval, then the two technical artifact
+        groups, the structural documents and the scaffold in parallel, then
+        code generation. After that,
+        every message is a change request applied to the code as patches.
+        """
+        scaffold = scaffold_enabled()
+        steps = [
+            Step(
+                name="requirements",
+                stage=Stage.REQ,
+                run=self._step_requirements,
+                outputs=("spec",),
+                rollback=("spec", "reuse_source"),
+                agent="requirements",
+                needs_message=True,
+                # A chat, not a derivation: done once a spec is submitted and no revision is open.
+                done=lambda proj: bool(proj.spec) and proj.stage != Stage.REQ,
+            ),
+            Step(
+                name="nontech_artifacts",
+                stage=Stage.ARTIFACTS_NON_TECH,
+                run=self._step_nontech_artifacts,
+                inputs=("spec",),
+                outputs=("nontech_artifacts_md",),
+                after=("requirements",),
+                rollback=("nontech_artifacts_md",),
+                agent="artifacts",
+                pause_after=True,
+            ),
+            Step(
+                name="approval",
+                stage=Stage.WAIT_APPROVAL,
+                run=self._step_approval,
+                inputs=("nontech_artifacts_md",),
+                after=("nontech_artifacts",),
+                needs_message=True,
+            ),
+        ]
+        steps.append(
+            Step(
+                name="structural_docs",
+                stage=Stage.TECH_ARTIFACTS,
+                run=self._step_structural_docs,
+                inputs=("spec",),
+                outputs=("technical_artifacts_md",),
+                after=("approval",),
+            )
+        )
+        if scaffold:
+            steps.append(
+                Step(
+                    name="scaffold",
+                    stage=Stage.CODEGEN,
+                    run=self._step_scaffold,
+                    inputs=("spec",),
+                    outputs=("generated_code_files",),
+                    after=("approval",),
+                )
+            )
+        for name in TECHNICAL_DOCUMENT_GROUPS:
+            steps.append(
+                Step(
+                    name=name,
+                    stage=Stage.TECH_ARTIFACTS,
+                    run=self._step_technical_artifacts,
+                    inputs=("spec", "nontech_artifacts_md"),
+                    outputs=("technical_artifacts_md",),
+                    after=("approval",),
+                    agent="artifacts",
+                    pause_after=True,
+                )
+            )
+        steps.append(
+            Step(
+                name="codegen",
+                stage=Stage.CODEGEN,
+                run=self._step_code_generation,
+                inputs=("spec", "technical_artifacts_md"),
+                outputs=("generated_code_files",),
+                after=tuple(TECHNICAL_DOCUMENT_GROUPS) + ("structural_docs",) + (("scaffold",) if scaffold else ()),
+                agent="code_generation",
+                pause_after=True,
             )
-        return self._build_response(
-            proj=proj,
-            reply='{"message": "approve or change"}',
-            artifacts_md=proj.nontech_artifacts_md,
         )
+        steps.append(
+            Step(
+                name="refine",
+                stage=Stage.QA,
+                run=self._step_refine,
+                outputs=("generated_code_files",),
+                after=("codegen",),
+                agent="code_edit",
+                needs_message=True,
+                # Open-ended: runs on every message once the code exists.
+                done=lambda proj: False,
+            )
+        )
+        return Pipeline(steps)
+
+    def _stage_reply(self, stage: Stage, proj: ProjectState) -> str:
+        if stage == Stage.ARTIFACTS_NON_TECH:
+            saved = proj.stage == Stage.WAIT_APPROVAL
+            message = "Non-technical artifacts saved." if saved else "Artifacts generation did not complete tool save."
+        elif stage == Stage.TECH_ARTIFACTS:
+            saved = proj.stage in {Stage.CODEGEN, Stage.QA}
+            message = (
+                "Technical artifacts saved." if saved else "Technical artifacts generation did not complete tool save."
+            )
+        elif stage == Stage.CODEGEN:
+            saved = proj.stage == Stage.QA and bool(proj.generated_code_files)
+            message = "Angular frontend code generated successfully." if saved else "Code generation did not complete tool save."
+        elif proj.stage == Stage.QA:
+            message = "Project complete. Ready for QA. Describe a change to apply it to the code."
+        else:
+            message = f"Nothing to run at stage {proj.stage.value}."
+        return '{"message": "' + message + '"}'
 
-    async def _run_requirements(self, token, project_id: str, req_session_id: str, user_message: str) -> dict[str, Any]:
+    async def handle(
+        self,
+        project_id: str,
+        req_session_id: str,
+        user_message: str,
+        timeout_s: Optional[float] = None,
+        reuse_prior_projects: Optional[bool] = None,
+    ) -> dict:
+        """
+        `timeout_s` is the caller's deadline for the whole turn (lock wait
+        included); each model-backed step is further bounded by its stage default.
+        Raises DeadlineExceeded when it passes, and LockLost if the project's
+        lock lease is lost mid-turn (shared mode). `reuse_prior_projects` toggles
+        reuse under the turn's lock, so it cannot overwrite another worker's turn.
+        """
+        with deadline_scope(timeout_s, source="request"):
+            async with enforce_deadline():
+                # One turn per project at a time, across every worker.
+                waiting = time.perf_counter()
+                async with project_turn(project_id, req_session_id):
+                    record_phase("lock_wait", time.perf_counter() - waiting)
+                    if reuse_prior_projects is not None:
+                        await run_blocking(set_reuse_enabled, project_id, reuse_prior_projects)
+                    stage = get_or_create_project(project_id, req_session_id).stage
+                    event_bus.publish(project_id, "turn_started", {"stage": stage.value})
+                    outcome = "cancelled"
+                    try:
+                        result = await self._handle(project_id, req_session_id, user_message)
+                        outcome = "ok"
+                        return result
+                    except DeadlineExceeded:
+                        outcome = "deadline"
+                        raise
+                    finally:
+                        stage = get_or_create_project(project_id, req_session_id).stage
+                        event_bus.publish(project_id, "turn_finished", {"stage": stage.value, "outcome": outcome})
+
+    async def _handle(self, project_id: str, req_session_id: str, user_message: str) -> dict:
+        pipeline = self.pipeline()
+        ctx = StepContext(project_id, req_session_id, user_message, token_provider=get_oauth_token)
+        run = await run_pipeline(pipeline, ctx)
         proj = get_or_create_project(project_id, req_session_id)
-        req_agent = AGENT_FACTORIES["requirements"](token, tools=self._requirements_tools())
+
+        ran = [step for step in pipeline.steps if step.name in run.results]
+        if not ran:
+            return self._build_response(proj=proj, reply=self._stage_reply(proj.stage, proj))
+        # The response describes the last step (in pipeline order) this turn ran.
+        last = ran[-1]
+        reply = run.results[last.name].reply or self._stage_reply(last.stage, proj)
+        artifacts_field = {
+            Stage.ARTIFACTS_NON_TECH: "nontech_artifacts_md",
+            Stage.WAIT_APPROVAL: "nontech_artifacts_md",
+            Stage.TECH_ARTIFACTS: "technical_artifacts_md",
+        }.get(last.stage)
+        return self._build_response(proj=proj, reply=reply, artifacts_field=artifacts_field)
+
+    async def _step_requirements(self, step: Step, ctx: StepContext) -> StepResult:
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
         phase = "requirements_revision" if proj.nontech_artifacts_md else "requirements_gathering"
         req_prompt = (
-            f"project_id={project_id}\n"
+            f"project_id={ctx.project_id}\n"
             f"phase={phase}\n"
             "Continue requirements gathering for this project.\n"
-            f"User message:\n{user_message}"
+            f"User message:\n{ctx.message}"
         )
+        req_agent = AGENT_FACTORIES[step.agent](await ctx.token(), tools=self._requirements_tools())
         reply = await run_turn(req_agent, session_id=proj.req_session_id, message=req_prompt)
-        proj = get_or_create_project(project_id, req_session_id)
-
-        if proj.stage == Stage.ARTIFACTS_NON_TECH and proj.spec:
-            return await self._run_artifacts_non_tech(token, project_id, req_session_id)
-
-        return self._build_response(proj=proj, reply=reply)
-
-    async def handle(self, project_id: str, req_session_id: str, user_message: str) -> dict:
-        proj = get_or_create_project(project_id, req_session_id)
-        normalized = user_message.strip().lower()
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+        submitted = bool(proj.spec) and proj.stage != Stage.REQ
+        # Once the spec is in, the artifacts step that follows describes the turn.
+        return StepResult(ok=submitted, reply=None if submitted else reply)
 
+    async def _step_approval(self, step: Step, ctx: StepContext) -> StepResult:
         # Approval gate does not need an LLM call.
-        if proj.stage == Stage.WAIT_APPROVAL:
-            approval_result = await self._handle_wait_approval(project_id, req_session_id, normalized)
-            if approval_result:
-                return approval_result
-            proj = get_or_create_project(project_id, req_session_id)
-
-        # Remaining stages are model-backed.
-        token = await get_oauth_token()
-
-        if proj.stage == Stage.REQ:
-            return await self._run_requirements(token, project_id, req_session_id, user_message)
-        if proj.stage == Stage.ARTIFACTS_NON_TECH:
-            return await self._run_artifacts_non_tech(token, project_id, req_session_id)
-        if proj.stage == Stage.TECH_ARTIFACTS:
-            return await self._run_artifacts_technical(token, project_id, req_session_id)
-        if proj.stage == Stage.CODEGEN:
-            return await self._run_code_generation(token, project_id, req_session_id)
-
-        return self._build_response(
-            proj=proj,
-            reply='{"message": "Project complete. Ready for QA."}',
-        )
+        normalized = (ctx.message or "").strip().lower()
+        if normalized == "approve":
+            return StepResult(ok=True)
+        if normalized == "change":
+            await run_blocking(set_project_stage, ctx.project_id, Stage.REQ.value)
+            return StepResult(
+                ok=False,
+                reply='{"message": "You have entered revision mode. Please enter the points to be modified."}',
+            )
+        return StepResult(ok=False, reply='{"message": "approve or change"}')
 
-    async def _run_artifacts_non_tech(self, token, project_id: str, req_session_id: str) -> dict:
-        art_agent = AGENT_FACTORIES["artifacts"](token, tools=self._artifacts_tools(), phase="non_tech")
+    async def _step_nontech_artifacts(self, step: Step, ctx: StepContext) -> StepResult:
         art_prompt = (
-            f"project_id={project_id}\n"
+            f"project_id={ctx.project_id}\n"
             "phase=non_tech\n"
             "Generate PM-facing non-technical artifacts now.\n"
             "Save full content via save_nontech_artifacts(project_id, artifacts_dict) as a dictionary with filename keys and markdown content values, "
-        )
-        raw_reply = await run_turn(art_agent, session_id=f"{req_session_id}-nontech", message=art_prompt)
-        proj = get_or_create_project(project_id, req_session_id)
-        reply = '{"message": ' + (
-            '"Non-technical artifacts saved."'
-            if proj.stage == Stage.WAIT_APPROVAL
-            else '"Artifacts generation did not complete tool save."'
-        ) + '}'
-        return self._build_response(
-            proj=proj,
-            reply=reply,
-            artifacts_md=proj.nontech_artifacts_md,
-        )
+        ) + self._reuse_hint(ctx.project_id, ctx.req_session_id, "non-technical")
+        before = get_or_create_project(ctx.project_id, ctx.req_session_id).field_versions.get("nontech_artifacts_md", 0)
+        art_agent = AGENT_FACTORIES[step.agent](await ctx.token(), tools=self._artifacts_tools("non_tech"), phase="non_tech")
+        await run_turn(art_agent, session_id=f"{ctx.req_session_id}-nontech", message=art_prompt)
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+        return StepResult(ok=proj.field_versions.get("nontech_artifacts_md", 0) > before)
 
-    async def _run_artifacts_technical(self, token, project_id: str, req_session_id: str) -> dict:
-        art_agent = AGENT_FACTORIES["artifacts"](token, tools=self._artifacts_tools(), phase="technical")
+    async def _step_technical_artifacts(self, step: Step, ctx: StepContext) -> StepResult:
+        documents = TECHNICAL_DOCUMENT_GROUPS[step.name]
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+        # Rendered here too instead of waiting for structural_docs: it is instant.
+        derived = structural_docs_prompt(render_structural_docs(proj.spec))
         art_prompt = (
-            f"project_id={project_id}\n"
+            f"project_id={ctx.project_id}\n"
             "phase=technical\n"
-            "Generate technical artifacts now. "
-            "Use load_spec first, then save_technical_artifacts with a dictionary (filename keys, markdown content values) at the end."
-        )
-        _raw_reply = await run_turn(art_agent, session_id=f"{req_session_id}-tech", message=art_prompt)
-        proj = get_or_create_project(project_id, req_session_id)
-        reply = '{"message": ' + (
-            '"Technical artifacts saved."'
-            if proj.stage in {Stage.CODEGEN, Stage.QA}
-            else '"Technical artifacts generation did not complete tool save."'
-        ) + '}'
-        return self._build_response(
-            proj=proj,
-            reply=reply,
-            artifacts_md=proj.technical_artifacts_md,
+            f"Generate only these technical artifacts now: {', '.join(documents)}. "
+            "Other technical documents are written in parallel by another run. "
+            "Use load_spec first, then save_technical_documents with a dictionary (filename keys, markdown content values) at the end.\n\n"
+            f"{derived}"
+        ) + self._reuse_hint(ctx.project_id, ctx.req_session_id, "technical")
+        # Judged by what this run's save calls stored, not by a content change: a retry
+        # may re-save exactly what an interrupted run already saved. The field version
+        # cannot tell either, since the other group and structural_docs bump it too.
+        saved: set[str] = set()
+        tools = self._artifacts_tools("technical", saved=saved)
+        art_agent = AGENT_FACTORIES[step.agent](await ctx.token(), tools=tools, phase="technical")
+        session_id = f"{ctx.req_session_id}{TECHNICAL_SESSION_SUFFIXES[step.name]}"
+        await run_turn(art_agent, session_id=session_id, message=art_prompt)
+        return StepResult(ok=all(name in saved for name in documents))
+
+    async def _step_structural_docs(self, step: Step, ctx: StepContext) -> StepResult:
+        # Entity list, ER skeleton, CRUD table and traceability matrix follow from the spec alone.
+        spec = get_or_create_project(ctx.project_id, ctx.req_session_id).spec
+        docs = await run_blocking(render_structural_docs, spec)
+        await run_blocking(save_technical_documents, ctx.project_id, docs)
+        return StepResult(ok=True)
+
+    async def _step_scaffold(self, step: Step, ctx: StepContext) -> StepResult:
+        # Boilerplate is rendered locally while the technical artifacts are written.
+        spec = get_or_create_project(ctx.project_id, ctx.req_session_id).spec
+        files = await run_blocking(render_scaffold, spec)
+        await run_blocking(seed_generated_code, ctx.project_id, files)
+        return StepResult(ok=True)
+
+    def _codegen_prompt(self, ctx: StepContext, progress: dict[str, Any]) -> str:
+        remaining = codegen_remaining(progress)
+        if progress["resumed"] and (progress["plan"] or progress["saved"]):
+            # Retry of an unfinished run: only what the checkpoint is missing.
+            return (
+                f"project_id={ctx.project_id}\n"
+                "Resume Angular code generation from the last checkpoint.\n"
+                + self._remaining_files_prompt(progress, remaining)
+            )
+        code_prompt = (
+            f"project_id={ctx.project_id}\n"
+            "Generate production-ready Angular frontend code now.\n"
+            "Use load_spec to get requirements, load_artifacts to get all artifacts, "
+            "generate modular Angular components and services with mocked API calls.\n"
+            "Before writing code, call begin_codegen(project_id, files) with every file path you will write. "
+            "Save each file via save_generated_file(project_id, path, content) as soon as it is written, "
+            "then call finish_codegen(project_id)."
         )
+        if scaffold_enabled():
+            # The scaffold step already seeded these files; the agent only writes feature code.
+            spec = get_or_create_project(ctx.project_id, ctx.req_session_id).spec
+            code_prompt += "\n\n" + scaffold_prompt(spec, render_scaffold(spec))
+        return code_prompt + self._reuse_hint(ctx.project_id, ctx.req_session_id, "code")
 
-    async def _run_code_generation(self, token, project_id: str, req_session_id: str) -> dict:
-        try:
-            code_agent = AGENT_FACTORIES["code_generation"](token, tools=self._code_generation_tools())
-            code_prompt = (
-                f"project_id={project_id}\n"
-                "Generate production-ready Angular frontend code now.\n"
-                "Use load_spec to get requirements, load_artifacts to get all artifacts, "
-                "generate modular Angular components and services with mocked API calls, "
-                "then save all code files via save_generated_code(project_id, files_json)."
+    def _remaining_files_prompt(self, progress: dict[str, Any], remaining: list[str]) -> str:
+        if not progress["plan"]:
+            return (
+                f"{len(progress['saved'])} files are already saved; do not re-emit them. "
+                "Call begin_codegen(project_id, files) with the files still to write, "
+                "save each via save_generated_file(project_id, path, content), then call finish_codegen(project_id)."
             )
-            _raw_reply = await run_turn(code_agent, session_id=f"{req_session_id}-codegen", message=code_prompt)
-            proj = get_or_create_project(project_id, req_session_id)
-            
-            # Check if code generation was successful
+        return (
+            f"{len(progress['saved'])} of {len(progress['plan'])} planned files are already saved; do not re-emit them. "
+            f"Write only these remaining files: {', '.join(remaining)}. "
+            "Save each via save_generated_file(project_id, path, content), then call finish_codegen(project_id). "
+            "If a remaining file is no longer needed, call begin_codegen again with the corrected list."
+        )
+
+    async def _step_code_generation(self, step: Step, ctx: StepContext) -> StepResult:
+        """
+        Codegen checkpoints as it goes: the plan and every saved file are kept
+        on ProjectState.codegen_progress. If a turn ends with planned files
+        missing (cut-off response, model error), a continuation prompt asks for
+        just those; a later attempt from the same inputs resumes the checkpoint.
+        """
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+        progress = await run_blocking(begin_codegen_attempt, ctx.project_id, step.input_versions(proj))
+        session_id = f"{ctx.req_session_id}-codegen"
+        code_prompt = self._codegen_prompt(ctx, progress)
+        error_message = None
+        for turn in range(CODEGEN_CONTINUATIONS + 1):
+            saved_before = len(progress["saved"])
+            try:
+                code_agent = AGENT_FACTORIES[step.agent](await ctx.token(), tools=self._code_generation_tools())
+                await run_turn(code_agent, session_id=session_id, message=code_prompt)
+                error_message = None
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                error_message = f"Code generation failed: {str(e)}"
+                print(f"[ERROR] Code generation: {error_message}")
+                await run_blocking(record_codegen_error, ctx.project_id, error_message)
+            proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+            progress = proj.codegen_progress or progress
+            if proj.stage != Stage.QA and progress["plan"] and not codegen_remaining(progress):
+                # Every planned file is in, but the agent stopped before finish_codegen.
+                await run_blocking(finish_codegen, ctx.project_id)
+                proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
             if proj.stage == Stage.QA and proj.generated_code_files:
-                reply = '{"message": "Angular frontend code generated successfully."}'
-                return self._build_response(
-                    proj=proj,
-                    reply=reply,
-                    generated_code_files=proj.generated_code_files,
-                )
-            else:
-                reply = '{"message": "Code generation did not complete tool save."}'
-                return self._build_response(
-                    proj=proj,
-                    reply=reply,
-                )
-        except Exception as e:
-            proj = get_or_create_project(project_id, req_session_id)
-            error_message = f"Code generation failed: {str(e)}"
-            reply = '{"message": "' + error_message + '"}'
-            print(f"[ERROR] Code generation: {error_message}")
-            # Do not change stage on error - return current project state
-            return self._build_response(
-                proj=proj,
-                reply=reply,
+                return StepResult(ok=True)
+            if turn > 0 and len(progress["saved"]) == saved_before:
+                break  # A continuation that saves nothing will not converge.
+            remaining = codegen_remaining(progress)
+            print(
+                f"[CODEGEN] {ctx.project_id} continuing: {len(progress['saved'])} saved, {len(remaining)} remaining"
             )
+            code_prompt = (
+                f"project_id={ctx.project_id}\n"
+                "Continue code generation; your last response ended before all files were saved.\n"
+                + self._remaining_files_prompt(progress, remaining)
+            )
+        # Do not change stage on error - the step stays pending and the next turn resumes the checkpoint.
+        # The files written so far are kept as a version of their own.
+        await run_blocking(checkpoint_generated_code, ctx.project_id)
+        if error_message is not None:
+            return StepResult(ok=False, reply='{"message": "' + error_message + '"}')
+        return StepResult(ok=False)
+
+    async def _step_refine(self, step: Step, ctx: StepContext) -> StepResult:
+        """
+        Apply a change request to the generated code. The edit agent reads the
+        files it needs and sends unified diffs, so a one-line fix costs a few
+        hundred output tokens instead of a full regeneration.
+        """
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+        if not (ctx.message or "").strip():
+            return StepResult(ok=False, reply=self._stage_reply(Stage.QA, proj))
+        before = proj.field_versions.get("generated_code_files", 0)
+        edit_prompt = (
+            f"project_id={ctx.project_id}\n"
+            "The Angular code is already generated. Apply this change request with apply_code_patch "
+            "(unified diffs against the current files); do not regenerate whole files.\n"
+            f"Change request:\n{ctx.message}"
+        )
+        edit_agent = AGENT_FACTORIES[step.agent](await ctx.token(), tools=self._refine_tools())
+        reply = await run_turn(edit_agent, session_id=f"{ctx.req_session_id}-refine", message=edit_prompt)
+        proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+        changed = proj.field_versions.get("generated_code_files", 0) > before
+        return StepResult(ok=changed, reply=reply or json.dumps({"message": "No changes were applied."}))
@@ -0,0 +1,126 @@
+"""
+Unified-diff application for single generated files.
+
+Hunks are located by their context and removed lines, not by the line
+numbers in the @@ header: models often miscount them, so the header only
+says where to start looking. Hunk line counts are ignored for the same reason.
+A hunk that cannot be matched is rejected; the file is then left untouched,
+so a patch applies completely or not at all. A file with CRLF line endings
+keeps them.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+DEV_NULL = "/dev/null"
+
+
+class PatchError(ValueError):
+    pass
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    lines: list[tuple[str, str]] = field(default_factory=list)  # (" " | "-" | "+", text)
+
+    @property
+    def old(self) -> list[str]:
+        return [text for op, text in self.lines if op != "+"]
+
+    @property
+    def new(self) -> list[str]:
+        return [text for op, text in self.lines if op != "-"]
+
+
+@dataclass
+class FilePatch:
+    old_path: Optional[str]
+    new_path: Optional[str]
+    hunks: list[Hunk]
+
+    @property
+    def deletes(self) -> bool:
+        return self.new_path == DEV_NULL
+
+    @property
+    def added(self) -> int:
+        return sum(1 for hunk in self.hunks for op, _ in hunk.lines if op == "+")
+
+    @property
+    def removed(self) -> int:
+        return sum(1 for hunk in self.hunks for op, _ in hunk.lines if op == "-")
+
+
+def _header_path(line: str) -> str:
+    path = line[4:].split("\t")[0].strip()
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse_unified_diff(diff: str) -> FilePatch:
+    old_path = new_path = None
+    hunks: list[Hunk] = []
+    for line in diff.splitlines():
+        if line.startswith("--- ") and not hunks:
+            old_path = _header_path(line)
+        elif line.startswith("+++ ") and not hunks:
+            new_path = _header_path(line)
+        elif line.startswith("@@"):
+            match = _HUNK_RE.match(line)
+            if match is None:
+                raise PatchError(f"Malformed hunk header: {line!r}")
+            hunks.append(Hunk(old_start=int(match.group(1))))
+        elif hunks:
+            if line.startswith("\\"):
+                continue  # "\ No newline at end of file"
+            if line == "":
+                # Blank context lines often lose their leading space.
+                hunks[-1].lines.append((" ", ""))
+            elif line[0] in " +-":
+                hunks[-1].lines.append((line[0], line[1:]))
+            else:
+                raise PatchError(f"Unexpected line in hunk: {line!r}")
+    if not hunks and new_path != DEV_NULL:
+        raise PatchError("Diff has no hunks")
+    return FilePatch(old_path, new_path, hunks)
+
+
+def _matches(lines: list[str], at: int, block: list[str], loose: bool) -> bool:
+    if at < 0 or at + len(block) > len(lines):
+        return False
+    if loose:
+        return all(lines[at + i].rstrip() == text.rstrip() for i, text in enumerate(block))
+    return lines[at : at + len(block)] == block
+
+
+def _locate(lines: list[str], hunk: Hunk, floor: int, shift: int) -> int:
+    block = hunk.old
+    if not block:
+        # Pure insertion: "-N,0" inserts after line N.
+        return min(max(floor, hunk.old_start + shift), len(lines))
+    expected = max(floor, hunk.old_start - 1 + shift)
+    for loose in (False, True):
+        for distance in range(max(expected, len(lines)) + 1):
+            for at in (expected - distance, expected + distance):
+                if at >= floor and _matches(lines, at, block, loose):
+                    return at
+    preview = "\n".join(block[:3])
+    raise PatchError(f"Hunk at line {hunk.old_start} does not match the file; expected:\n{preview}")
+
+
+def apply_patch(original: str, patch: FilePatch) -> str:
+    lines = original.splitlines()
+    newline = "\r\n" if "\r\n" in original else "\n"
+    trailing_newline = original.endswith("\n") or not original
+    floor = 0
+    shift = 0  # Line offset introduced by the hunks already applied.
+    for hunk in patch.hunks:
+        at = _locate(lines, hunk, floor, shift)
+        lines[at : at + len(hunk.old)] = hunk.new
+        floor = at + len(hunk.new)
+        shift += len(hunk.new) - len(hunk.old)
+    text = newline.join(lines)
+    return text + newline if trailing_newline and lines else text
@@ -0,0 +1,323 @@
+"""
+Declarative pipeline engine.
+
+A pipeline is a list of named steps. Each step declares the ProjectState
+fields it reads (`inputs`) and writes (`outputs`), the steps it waits for
+(`after`), the Stage reported while it is pending and, for model-backed steps,
+the AGENT_FACTORIES key it runs.
+
+A step is done when its outputs exist and were produced from the current
+versions of its inputs (recorded in ProjectState.step_inputs), make-style: a
+revised spec re-opens everything downstream of it. The project's stage is the
+earliest stage among steps that are not done.
+
+The scheduler starts every ready step at once and looks again whenever one
+finishes. Steps with `needs_message` consume the user's message (requirements,
+approval gate), so at most one runs per turn. When a `pause_after` step
+finishes, no new steps start in that turn; their dependents wait for the next
+message, which keeps the one-review-per-turn rhythm of the chat API.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from core.deadlines import DeadlineExceeded, current_deadline, deadline_scope, model_time, stage_deadline_seconds
+from core.profiling import phase
+from orchestration.events import event_bus
+from orchestration.store import ProjectState, Stage, get_or_create_project
+from orchestration.tool_runtime import run_blocking
+from orchestration.tools import record_step_inputs, rollback_stage, set_project_stage, stage_checkpoint
+
+_STAGE_ORDER = {stage: index for index, stage in enumerate(Stage)}
+
+
+@dataclass
+class StepResult:
+    ok: bool
+    reply: Optional[str] = None
+
+
+@dataclass
+class StepContext:
+    project_id: str
+    req_session_id: str
+    message: Optional[str]
+    token_provider: Callable[[], Awaitable[str]]
+    _token: Optional[str] = None
+
+    async def token(self) -> str:
+        if self._token is None:
+            self._token = await self.token_provider()
+        return self._token
+
+
+StepFn = Callable[["Step", StepContext], Awaitable[StepResult]]
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    stage: Stage
+    run: StepFn
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    after: tuple[str, ...] = ()
+    agent: Optional[str] = None
+    needs_message: bool = False
+    pause_after: bool = False
+    # Fields restored, together with the stage, if the run is cancelled or times out.
+    rollback: tuple[str, ...] = ()
+    # Overrides the outputs/input-versions check (used by the requirements chat).
+    done: Optional[Callable[[ProjectState], bool]] = None
+
+    def input_versions(self, proj: ProjectState) -> dict[str, int]:
+        return {name: proj.field_versions.get(name, 0) for name in self.inputs}
+
+    def is_done(self, proj: ProjectState) -> bool:
+        if self.done is not None:
+            return self.done(proj)
+        if any(not getattr(proj, name) for name in self.outputs):
+            return False
+        return proj.step_inputs.get(self.name) == self.input_versions(proj)
+
+
+class Pipeline:
+    def __init__(self, steps: list[Step]):
+        names = [step.name for step in steps]
+        if len(set(names)) != len(names):
+            raise ValueError("Pipeline step names must be unique")
+        self._by_name = {step.name: step for step in steps}
+        for step in steps:
+            unknown = [dep for dep in step.after if dep not in self._by_name]
+            if unknown:
+                raise ValueError(f"Step {step.name!r} waits for unknown steps {unknown}")
+        self.steps = self._topological(steps)
+
+    @staticmethod
+    def _topological(steps: list[Step]) -> list[Step]:
+        # Stable: keeps definition order wherever dependencies allow it.
+        ordered: list[Step] = []
+        placed: set[str] = set()
+        remaining = list(steps)
+        while remaining:
+            ready = [step for step in remaining if all(dep in placed for dep in step.after)]
+            if not ready:
+                raise ValueError(f"Pipeline has a cycle among {[step.name for step in remaining]}")
+            ordered.append(ready[0])
+            placed.add(ready[0].name)
+            remaining.remove(ready[0])
+        return ordered
+
+    def step(self, name: str) -> Step:
+        return self._by_name[name]
+
+    def done_steps(self, proj: ProjectState) -> set[str]:
+        return {step.name for step in self.steps if step.is_done(proj)}
+
+    def pending_stage(self, proj: ProjectState) -> Stage:
+        done = self.done_steps(proj)
+        pending = [step.stage for step in self.steps if step.name not in done]
+        return min(pending, key=_STAGE_ORDER.__getitem__) if pending else Stage.QA
+
+    def describe(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "name": step.name,
+                "stage": step.stage.value,
+                "inputs": list(step.inputs),
+                "outputs": list(step.outputs),
+                "after": list(step.after),
+                "agent": step.agent,
+                "needs_message": step.needs_message,
+                "pause_after": step.pause_after,
+            }
+            for step in self.steps
+        ]
+
+
+@dataclass
+class StepTiming:
+    name: str
+    stage: str
+    started_s: float
+    finished_s: float = 0.0
+    status: str = "running"  # done / incomplete / failed / cancelled
+
+    @property
+    def duration_s(self) -> float:
+        return round(self.finished_s - self.started_s, 3)
+
+
+@dataclass
+class PipelineRun:
+    project_id: str
+    started_at: float = field(default_factory=time.time)
+    steps: list[StepTiming] = field(default_factory=list)
+    results: dict[str, StepResult] = field(default_factory=dict)
+    wall_s: float = 0.0
+    critical_path: list[str] = field(default_factory=list)
+    critical_path_s: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        busy = sum(timing.duration_s for timing in self.steps)
+        return {
+            "project_id": self.project_id,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "critical_path": self.critical_path,
+            "critical_path_s": self.critical_path_s,
+            # Sum of step time over wall time; above 1 means steps overlapped.
+            "parallelism": round(busy / self.wall_s, 2) if self.wall_s else 0.0,
+            "steps": [{**asdict(timing), "duration_s": timing.duration_s} for timing in self.steps],
+        }
+
+
+_LAST_RUNS: dict[str, dict[str, Any]] = {}
+
+
+def last_run(project_id: str) -> Optional[dict[str, Any]]:
+    return _LAST_RUNS.get(project_id)
+
+
+def forget(project_id: str) -> None:
+    _LAST_RUNS.pop(project_id, None)
+
+
+def _critical_path(pipeline: Pipeline, run: PipelineRun) -> tuple[list[str], float]:
+    """Walk back from the last step to finish through the latest-finishing dependency."""
+    timings = {timing.name: timing for timing in run.steps}
+    if not timings:
+        return [], 0.0
+    path = []
+    current: Optional[StepTiming] = max(timings.values(), key=lambda timing: timing.finished_s)
+    end = current.finished_s
+    while current is not None:
+        path.append(current.name)
+        deps = [timings[dep] for dep in pipeline.step(current.name).after if dep in timings]
+        current = max(deps, key=lambda timing: timing.finished_s) if deps else None
+    return list(reversed(path)), round(end, 3)
+
+
+async def _run_step(pipeline: Pipeline, step: Step, ctx: StepContext, timing: StepTiming, t0: float) -> StepResult:
+    """
+    Run one step under its stage deadline. On cancellation or timeout a step
+    that declares `rollback` fields has them and the stage restored to their
+    values at step start, even if its save tool already committed: a turn
+    nobody is waiting for must not move the project on. Steps without them
+    keep what they saved (codegen's files are the checkpoint a retry resumes
+    from).
+    """
+    checkpoint = await run_blocking(stage_checkpoint, ctx.project_id, step.rollback) if step.rollback else None
+    consumed = step.input_versions(get_or_create_project(ctx.project_id, ctx.req_session_id))
+    event_bus.publish(ctx.project_id, "step_started", {"step": step.name, "stage": step.stage.value})
+    started = time.perf_counter()
+    with deadline_scope(stage_deadline_seconds(step.stage.value), source=f"stage {step.stage.value}"):
+        try:
+            with phase(f"step.{step.name}"):
+                result = await step.run(step, ctx)
+        except (asyncio.CancelledError, DeadlineExceeded) as e:
+            deadline = current_deadline()
+            timed_out = isinstance(e, DeadlineExceeded) or (deadline is not None and deadline.expired())
+            reason = "deadline" if timed_out else "disconnect"
+            elapsed = time.perf_counter() - started
+            if checkpoint is not None:
+                # Queued after, or skipped by, any save call still in flight (both take the project guard).
+                await run_blocking(rollback_stage, ctx.project_id, checkpoint, reason)
+            proj = get_or_create_project(ctx.project_id, ctx.req_session_id)
+            timing.finished_s = round(time.perf_counter() - t0, 3)
+            timing.status = "cancelled"
+            if _STAGE_ORDER[proj.stage] > _STAGE_ORDER[step.stage]:
+                model_time.record_completed(step.name, elapsed)
+            else:
+                saved = model_time.record_cancelled(step.name, elapsed, reason)
+                print(f"[CANCEL] {ctx.project_id} {step.name} after {elapsed:.1f}s ({reason}); ~{saved:.1f}s saved")
+            raise
+        except Exception:
+            timing.finished_s = round(time.perf_counter() - t0, 3)
+            timing.status = "failed"
+            raise
+    model_time.record_completed(step.name, time.perf_counter() - started)
+    if result.ok and step.done is None:
+        await run_blocking(record_step_inputs, ctx.project_id, step.name, consumed)
+    timing.finished_s = round(time.perf_counter() - t0, 3)
+    timing.status = "done" if result.ok else "incomplete"
+    event_bus.publish(
+        ctx.project_id,
+        "step_finished",
+        {"step": step.name, "stage": step.stage.value, "status": timing.status, "duration_s": timing.duration_s},
+    )
+    return result
+
+
+async def _sync_stage(pipeline: Pipeline, project_id: str, req_session_id: str) -> None:
+    proj = get_or_create_project(project_id, req_session_id)
+    stage = pipeline.pending_stage(proj)
+    if proj.stage != stage:
+        await run_blocking(set_project_stage, project_id, stage.value)
+
+
+async def run_pipeline(pipeline: Pipeline, ctx: StepContext) -> PipelineRun:
+    """
+    Run every ready step concurrently until nothing more can start in this
+    turn. Returns timings, per-step results and the critical path.
+    """
+    run = PipelineRun(project_id=ctx.project_id)
+    t0 = time.perf_counter()
+    tasks: dict[asyncio.Task, Step] = {}
+    attempted: set[str] = set()
+    message_used = ctx.message is None
+    paused = False
+
+    try:
+        while True:
+            if not paused:
+                done = pipeline.done_steps(get_or_create_project(ctx.project_id, ctx.req_session_id))
+                for step in pipeline.steps:
+                    if step.name in done or step.name in attempted:
+                        continue
+                    if any(dep not in done for dep in step.after):
+                        continue
+                    if step.needs_message:
+                        if message_used:
+                            continue
+                        message_used = True
+                    attempted.add(step.name)
+                    timing = StepTiming(name=step.name, stage=step.stage.value, started_s=round(time.perf_counter() - t0, 3))
+                    run.steps.append(timing)
+                    tasks[asyncio.create_task(_run_step(pipeline, step, ctx, timing, t0))] = step
+            if not tasks:
+                break
+
+            finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                step = tasks.pop(task)
+                result = task.result()
+                run.results[step.name] = result
+                await _sync_stage(pipeline, ctx.project_id, ctx.req_session_id)
+                # A refused gate or a finished review step ends the turn's scheduling.
+                if step.pause_after or (step.needs_message and not result.ok):
+                    paused = True
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    run.wall_s = round(time.perf_counter() - t0, 3)
+    run.critical_path, run.critical_path_s = _critical_path(pipeline, run)
+    report = run.to_dict()
+    if run.steps:
+        _LAST_RUNS[ctx.project_id] = report
+        event_bus.publish(
+            ctx.project_id,
+            "pipeline_run",
+            {key: report[key] for key in ("wall_s", "critical_path", "critical_path_s", "parallelism")},
+        )
+        print(
+            f"[PIPELINE] {ctx.project_id} wall={run.wall_s}s "
+            f"critical={'>'.join(run.critical_path)} ({run.critical_path_s}s) parallelism={report['parallelism']}"
+        )
+    return run
@@ -0,0 +1,228 @@
+"""
+Memory-bounded eviction for process-local projects and ADK sessions.
+
+Idle entries are dropped once they pass their TTL; if the estimated footprint
+is still above MEMORY_BUDGET_MB, least-recently-used entries go next. A project
+whose turn is in flight is never evicted. A project's own sessions (its chat
+history) only go together with the project; SESSION_IDLE_TTL_SECONDS applies
+to sessions no loaded project owns. In shared mode sessions live in the shared
+database and may be mid-turn on another worker, so none are evicted here.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from core.coordination import discard_local_lock, local_lock_held, shared_state_enabled
+from core.sessions import delete_session, session_usage
+from orchestration import pipeline, snapshot
+from orchestration.blobs import BlobMap, blob_stats
+from orchestration.events import event_bus
+from orchestration.similarity import similarity_index
+from orchestration.store import DOCUMENT_FIELDS, ProjectState, drop_project, loaded_projects, project_lock_name
+from orchestration.versions import drop_history, history_bytes, storage_stats
+
+logger = logging.getLogger(__name__)
+
+# Sessions the orchestrator opens per project, relative to req_session_id.
+PROJECT_SESSION_SUFFIXES = ("", "-nontech", "-tech", "-tech-interfaces", "-codegen", "-refine")
+
+
+@dataclass
+class ResourceLimits:
+    memory_budget_bytes: int
+    project_idle_ttl: float
+    session_idle_ttl: float
+    sweep_interval: float
+
+    @classmethod
+    def from_env(cls) -> "ResourceLimits":
+        return cls(
+            memory_budget_bytes=int(float(os.getenv("MEMORY_BUDGET_MB", "512")) * 1024 * 1024),
+            project_idle_ttl=float(os.getenv("PROJECT_IDLE_TTL_SECONDS", str(6 * 3600))),
+            session_idle_ttl=float(os.getenv("SESSION_IDLE_TTL_SECONDS", str(2 * 3600))),
+            sweep_interval=float(os.getenv("RESOURCE_SWEEP_INTERVAL_SECONDS", "60")),
+        )
+
+
+def project_session_ids(proj: ProjectState) -> list[str]:
+    return [f"{proj.req_session_id}{suffix}" for suffix in PROJECT_SESSION_SUFFIXES]
+
+
+def project_footprint(proj: ProjectState) -> dict[str, int]:
+    """
+    Approximate bytes held by one project, broken down by field. Document
+    fields count their compressed bodies; `uncompressed` is what the same
+    fields would take as plain strings.
+    """
+    out = {"spec": len(json.dumps(proj.spec, ensure_ascii=False)) if proj.spec else 0}
+    uncompressed = 0
+    for field in DOCUMENT_FIELDS:
+        docs = getattr(proj, field) or {}
+        names = sum(len(name) for name in docs)
+        if isinstance(docs, BlobMap):
+            out[field] = names + docs.stored_bytes()
+            uncompressed += names + docs.raw_bytes()
+        else:
+            out[field] = sum(len(name) + len(body) for name, body in docs.items() if isinstance(body, str))
+            uncompressed += out[field]
+    out["version_manifests"] = history_bytes(proj.project_id)
+    out["snapshot_cache"] = snapshot.cache_bytes(proj.project_id)
+    out["total"] = sum(out.values())
+    out["uncompressed"] = uncompressed
+    return out
+
+
+def reuse_reference_bytes() -> int:
+    """Bytes the similarity index keeps for reuse of completed projects no longer loaded."""
+    loaded = {proj.project_id for proj, _last in loaded_projects()}
+    total = 0
+    for ref in similarity_index.references():
+        if ref.project_id in loaded:
+            continue  # Same BlobMaps as the loaded project, counted there.
+        total += len(json.dumps(ref.spec, ensure_ascii=False)) if ref.spec else 0
+        for field in DOCUMENT_FIELDS:
+            docs = getattr(ref, field) or {}
+            total += sum(len(name) for name in docs)
+            total += docs.stored_bytes() if isinstance(docs, BlobMap) else sum(len(body) for body in docs.values())
+    return total
+
+
+def _is_busy(project_id: str) -> bool:
+    return local_lock_held(project_lock_name(project_id))
+
+
+class ResourceManager:
+    def __init__(self, limits: ResourceLimits | None = None):
+        self._limits = limits
+        self.evicted_projects = 0
+        self.evicted_sessions = 0
+
+    @property
+    def limits(self) -> ResourceLimits:
+        # Resolved lazily so values from backend/.env (loaded at app start) apply.
+        if self._limits is None:
+            self._limits = ResourceLimits.from_env()
+        return self._limits
+
+    def report(self) -> dict[str, Any]:
+        """
+        Per-project and per-session footprint. total_bytes counts project heads,
+        session history, the version blob store and the decompressed-body LRU,
+        so it is an upper bound (a body shared by a project head and its
+        history, or by a kept reuse reference, is counted twice).
+        """
+        projects = {
+            proj.project_id: {"stage": proj.stage.value, "last_access": last, **project_footprint(proj)}
+            for proj, last in loaded_projects()
+        }
+        sessions = {
+            sid: {"last_access": usage.last_access, "approx_bytes": usage.approx_bytes}
+            for sid, usage in session_usage().items()
+        }
+        blobs = storage_stats()
+        interned = blob_stats()
+        references = reuse_reference_bytes()
+        total = (
+            sum(p["total"] for p in projects.values())
+            + sum(s["approx_bytes"] for s in sessions.values())
+            + blobs["blob_bytes"]
+            + interned["cache"]["bytes"]
+            + references
+        )
+        return {
+            "budget_bytes": self.limits.memory_budget_bytes,
+            "total_bytes": total,
+            "blob_store": blobs,
+            "interned_blobs": interned,
+            "reuse_reference_bytes": references,
+            "evicted_projects": self.evicted_projects,
+            "evicted_sessions": self.evicted_sessions,
+            "projects": projects,
+            "sessions": sessions,
+        }
+
+    async def _evict_project(self, proj: ProjectState) -> None:
+        drop_project(proj.project_id)
+        drop_history(proj.project_id)
+        discard_local_lock(project_lock_name(proj.project_id))
+        event_bus.forget(proj.project_id)
+        snapshot.forget(proj.project_id)
+        pipeline.forget(proj.project_id)
+        for sid in project_session_ids(proj):
+            if sid in session_usage():
+                await self._evict_session(sid)
+        self.evicted_projects += 1
+        logger.info("[Resources] Evicted project %s", proj.project_id)
+
+    async def evict(self, project_id: str) -> bool:
+        """Evict one loaded project now, regardless of TTL and budget."""
+        proj = next((proj for proj, _last in loaded_projects() if proj.project_id == project_id), None)
+        if proj is None:
+            return False
+        await self._evict_project(proj)
+        return True
+
+    async def _evict_session(self, session_id: str) -> None:
+        await delete_session(session_id)
+        self.evicted_sessions += 1
+
+    async def sweep(self) -> dict[str, list[str]]:
+        now = time.time()
+        evicted: dict[str, list[str]] = {"projects": [], "sessions": []}
+
+        # 1) TTL expiry.
+        for proj, last in loaded_projects():
+            if now - last > self.limits.project_idle_ttl and not _is_busy(proj.project_id):
+                await self._evict_project(proj)
+                evicted["projects"].append(proj.project_id)
+        owned = {sid for proj, _ in loaded_projects() for sid in project_session_ids(proj)}
+        orphans = {} if shared_state_enabled() else {
+            sid: usage for sid, usage in session_usage().items() if sid not in owned
+        }
+        for sid, usage in orphans.items():
+            if now - usage.last_access > self.limits.session_idle_ttl:
+                await self._evict_session(sid)
+                evicted["sessions"].append(sid)
+
+        # 2) LRU until under budget. Blobs are shared between projects, so the
+        # footprint is re-measured after every eviction instead of subtracted.
+        report = self.report()
+        if report["total_bytes"] > self.limits.memory_budget_bytes:
+            candidates: list[tuple[float, str, str]] = []
+            for pid, info in report["projects"].items():
+                if not _is_busy(pid):
+                    candidates.append((info["last_access"], "projects", pid))
+            for sid, info in report["sessions"].items():
+                if sid in orphans:
+                    candidates.append((info["last_access"], "sessions", sid))
+            projects = {proj.project_id: proj for proj, _ in loaded_projects()}
+            for _last, kind, key in sorted(candidates):
+                if kind == "projects":
+                    await self._evict_project(projects[key])
+                elif key in session_usage():
+                    await self._evict_session(key)
+                else:
+                    continue
+                evicted[kind].append(key)
+                if self.report()["total_bytes"] <= self.limits.memory_budget_bytes:
+                    break
+        return evicted
+
+    async def run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.limits.sweep_interval)
+            try:
+                evicted = await self.sweep()
+                if evicted["projects"] or evicted["sessions"]:
+                    logger.info("[Resources] Sweep evicted %s", evicted)
+            except Exception:
+                logger.exception("[Resources] Sweep failed")
+
+
+resource_manager = ResourceManager()
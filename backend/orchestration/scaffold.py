@@ -0,0 +1,529 @@
+"""
+Deterministic Angular scaffold for code generation.
+
+Everything here is boilerplate the code generation agent used to re-emit on
+every run (workspace config, bootstrap, app config, routes shell, mock HTTP
+interceptor, shared loading/error components, environments). It is rendered
+from the spec (project_name, core_entities) into generated_code_files before
+the agent runs; the agent only writes feature code and its files are merged
+on top.
+
+Contract with the agent: for every entity the routes shell lazy-loads
+src/app/features/<entity>/<entity>.routes.ts, which must default-export Routes.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from string import Template
+from typing import Any
+
+
+def scaffold_enabled() -> bool:
+    return os.getenv("CODEGEN_SCAFFOLD", "1").strip().lower() not in {"0", "false", "no"}
+
+
+@dataclass(frozen=True)
+class EntityNames:
+    label: str
+    kebab: str
+    pascal: str
+    camel: str
+    collection: str
+
+
+def _words(text: str) -> list[str]:
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return [w for w in re.split(r"[^A-Za-z0-9]+", text) if w]
+
+
+def plural(word: str) -> str:
+    """English plural of a lower-case word or kebab name: task -> tasks, category -> categories."""
+    if word.endswith(("s", "x", "ch", "sh")):
+        return word + "es"
+    if word.endswith("y") and len(word) > 1 and word[-2] not in "aeiou":
+        return word[:-1] + "ies"
+    return word + "s"
+
+
+def entity_names(raw: Any) -> EntityNames | None:
+    # core_entities is usually a list of strings, but models sometimes emit
+    # objects such as {"name": "Task", "attributes": [...]}.
+    if isinstance(raw, dict):
+        raw = raw.get("name") or next((v for v in raw.values() if isinstance(v, str)), "")
+    words = _words(str(raw or ""))[:4]
+    if not words:
+        return None
+    kebab = "-".join(w.lower() for w in words)
+    pascal = "".join(w[:1].upper() + w[1:].lower() for w in words)
+    camel = pascal[:1].lower() + pascal[1:]
+    collection = plural(kebab)
+    return EntityNames(label=" ".join(words), kebab=kebab, pascal=pascal, camel=camel, collection=collection)
+
+
+def spec_entities(spec: dict[str, Any] | None) -> list[EntityNames]:
+    seen: set[str] = set()
+    out: list[EntityNames] = []
+    for raw in (spec or {}).get("core_entities") or []:
+        names = entity_names(raw)
+        if names and names.kebab not in seen:
+            seen.add(names.kebab)
+            out.append(names)
+    return out
+
+
+def _slug(project_name: str) -> str:
+    return "-".join(w.lower() for w in _words(project_name)) or "protopilot-app"
+
+
+_STATIC_FILES: dict[str, str] = {
+    "tsconfig.json": json.dumps(
+        {
+            "compileOnSave": False,
+            "compilerOptions": {
+                "outDir": "./dist/out-tsc",
+                "strict": True,
+                "noImplicitOverride": True,
+                "noPropertyAccessFromIndexSignature": True,
+                "noImplicitReturns": True,
+                "noFallthroughCasesInSwitch": True,
+                "skipLibCheck": True,
+                "isolatedModules": True,
+                "esModuleInterop": True,
+                "experimentalDecorators": True,
+                "moduleResolution": "bundler",
+                "importHelpers": True,
+                "target": "ES2022",
+                "module": "ES2022",
+            },
+            "angularCompilerOptions": {
+                "enableI18nLegacyMessageIdFormat": False,
+                "strictInjectionParameters": True,
+                "strictInputAccessModifiers": True,
+                "strictTemplates": True,
+            },
+        },
+        indent=2,
+    )
+    + "\n",
+    "tsconfig.app.json": json.dumps(
+        {
+            "extends": "./tsconfig.json",
+            "compilerOptions": {"outDir": "./out-tsc/app", "types": []},
+            "files": ["src/main.ts"],
+            "include": ["src/**/*.d.ts"],
+        },
+        indent=2,
+    )
+    + "\n",
+    "src/main.ts": """import { bootstrapApplication } from '@angular/platform-browser';
+import { appConfig } from './app/app.config';
+import { AppComponent } from './app/app.component';
+
+bootstrapApplication(AppComponent, appConfig).catch((err) => console.error(err));
+""",
+    "src/styles.scss": """*,
+*::before,
+*::after {
+  box-sizing: border-box;
+}
+
+body {
+  margin: 0;
+  font-family: system-ui, -apple-system, 'Segoe UI', Roboto, sans-serif;
+  color: #1f2937;
+  background: #f9fafb;
+}
+""",
+    "src/environments/environment.ts": """export const environment = {
+  production: true,
+  apiBaseUrl: '/api',
+  useMockApi: true,
+};
+""",
+    "src/environments/environment.development.ts": """export const environment = {
+  production: false,
+  apiBaseUrl: '/api',
+  useMockApi: true,
+};
+""",
+    "src/app/app.config.ts": """import { ApplicationConfig, provideZoneChangeDetection } from '@angular/core';
+import { provideHttpClient, withInterceptors } from '@angular/common/http';
+import { provideRouter, withComponentInputBinding } from '@angular/router';
+import { routes } from './app.routes';
+import { mockApiInterceptor } from './core/interceptors/mock-api.interceptor';
+
+export const appConfig: ApplicationConfig = {
+  providers: [
+    provideZoneChangeDetection({ eventCoalescing: true }),
+    provideRouter(routes, withComponentInputBinding()),
+    provideHttpClient(withInterceptors([mockApiInterceptor])),
+  ],
+};
+""",
+    "src/app/app.component.scss": """.app-header {
+  display: flex;
+  align-items: center;
+  gap: 1.5rem;
+  padding: 0.75rem 1.5rem;
+  background: #111827;
+  color: #fff;
+}
+
+.app-header nav {
+  display: flex;
+  gap: 1rem;
+}
+
+.app-header a {
+  color: #d1d5db;
+  text-decoration: none;
+}
+
+.app-header a.active {
+  color: #fff;
+  font-weight: 600;
+}
+
+.app-main {
+  padding: 1.5rem;
+}
+""",
+    "src/app/core/interceptors/mock-api.interceptor.ts": """import { HttpInterceptorFn, HttpResponse } from '@angular/common/http';
+import { of, throwError } from 'rxjs';
+import { delay } from 'rxjs/operators';
+import { environment } from '../../../environments/environment';
+import { MOCK_DATA } from '../mocks/mock-data';
+
+type MockRecord = { id: string | number } & Record<string, unknown>;
+
+const store: Record<string, MockRecord[]> = structuredClone(MOCK_DATA) as Record<string, MockRecord[]>;
+
+/**
+ * In-memory CRUD backend for `${apiBaseUrl}/<collection>[/<id>]`.
+ * Every HTTP call in the prototype is served from MOCK_DATA; nothing leaves the browser.
+ */
+export const mockApiInterceptor: HttpInterceptorFn = (req, next) => {
+  if (!environment.useMockApi || !req.url.startsWith(environment.apiBaseUrl)) {
+    return next(req);
+  }
+
+  const [collection, id] = req.url.slice(environment.apiBaseUrl.length).split('/').filter(Boolean);
+  const items = store[collection];
+  if (!items) {
+    return throwError(() => ({ status: 404, message: `Unknown collection: ${collection}` }));
+  }
+
+  const index = id === undefined ? -1 : items.findIndex((item) => String(item.id) === id);
+  const respond = (body: unknown, status = 200) => of(new HttpResponse({ status, body })).pipe(delay(250));
+
+  switch (req.method) {
+    case 'GET':
+      if (id === undefined) {
+        return respond(items);
+      }
+      return index >= 0 ? respond(items[index]) : throwError(() => ({ status: 404, message: 'Not found' }));
+    case 'POST': {
+      const created = { ...(req.body as object), id: Date.now() } as MockRecord;
+      items.push(created);
+      return respond(created, 201);
+    }
+    case 'PUT':
+    case 'PATCH':
+      if (index < 0) {
+        return throwError(() => ({ status: 404, message: 'Not found' }));
+      }
+      items[index] = { ...items[index], ...(req.body as object), id: items[index].id };
+      return respond(items[index]);
+    case 'DELETE':
+      if (index >= 0) {
+        items.splice(index, 1);
+      }
+      return respond(null, 204);
+    default:
+      return next(req);
+  }
+};
+""",
+    "src/app/core/services/api.service.ts": """import { HttpClient } from '@angular/common/http';
+import { Injectable, inject } from '@angular/core';
+import { Observable } from 'rxjs';
+import { environment } from '../../../environments/environment';
+
+/** Thin CRUD wrapper; feature services call this with their collection name. */
+@Injectable({ providedIn: 'root' })
+export class ApiService {
+  private readonly http = inject(HttpClient);
+  private readonly baseUrl = environment.apiBaseUrl;
+
+  list<T>(collection: string): Observable<T[]> {
+    return this.http.get<T[]>(`${this.baseUrl}/${collection}`);
+  }
+
+  get<T>(collection: string, id: string | number): Observable<T> {
+    return this.http.get<T>(`${this.baseUrl}/${collection}/${id}`);
+  }
+
+  create<T>(collection: string, body: Partial<T>): Observable<T> {
+    return this.http.post<T>(`${this.baseUrl}/${collection}`, body);
+  }
+
+  update<T>(collection: string, id: string | number, body: Partial<T>): Observable<T> {
+    return this.http.put<T>(`${this.baseUrl}/${collection}/${id}`, body);
+  }
+
+  delete(collection: string, id: string | number): Observable<void> {
+    return this.http.delete<void>(`${this.baseUrl}/${collection}/${id}`);
+  }
+}
+""",
+    "src/app/shared/components/loading-spinner/loading-spinner.component.ts": """import { ChangeDetectionStrategy, Component, input } from '@angular/core';
+
+@Component({
+  selector: 'app-loading-spinner',
+  standalone: true,
+  changeDetection: ChangeDetectionStrategy.OnPush,
+  template: `
+    <div class="spinner" role="status" [attr.aria-label]="label()">
+      <span class="dot"></span><span class="dot"></span><span class="dot"></span>
+    </div>
+  `,
+  styles: `
+    .spinner { display: flex; gap: 0.4rem; justify-content: center; padding: 1.5rem; }
+    .dot { width: 0.6rem; height: 0.6rem; border-radius: 50%; background: #6366f1; animation: pulse 1s infinite ease-in-out; }
+    .dot:nth-child(2) { animation-delay: 0.15s; }
+    .dot:nth-child(3) { animation-delay: 0.3s; }
+    @keyframes pulse { 0%, 100% { opacity: 0.3; } 50% { opacity: 1; } }
+  `,
+})
+export class LoadingSpinnerComponent {
+  readonly label = input('Loading');
+}
+""",
+    "src/app/shared/components/error-message/error-message.component.ts": """import { ChangeDetectionStrategy, Component, input, output } from '@angular/core';
+
+@Component({
+  selector: 'app-error-message',
+  standalone: true,
+  changeDetection: ChangeDetectionStrategy.OnPush,
+  template: `
+    <div class="error" role="alert">
+      <span>{{ message() }}</span>
+      @if (retryable()) {
+        <button type="button" (click)="retry.emit()">Retry</button>
+      }
+    </div>
+  `,
+  styles: `
+    .error { display: flex; align-items: center; justify-content: space-between; gap: 1rem;
+      padding: 0.75rem 1rem; border: 1px solid #fca5a5; border-radius: 0.5rem; background: #fef2f2; color: #991b1b; }
+    button { border: none; border-radius: 0.375rem; padding: 0.35rem 0.8rem; background: #991b1b; color: #fff; cursor: pointer; }
+  `,
+})
+export class ErrorMessageComponent {
+  readonly message = input('Something went wrong.');
+  readonly retryable = input(true);
+  readonly retry = output<void>();
+}
+""",
+}
+
+
+_PACKAGE_JSON = Template(
+    """{
+  "name": "$slug",
+  "version": "0.0.0",
+  "private": true,
+  "scripts": {
+    "ng": "ng",
+    "start": "ng serve",
+    "build": "ng build"
+  },
+  "dependencies": {
+    "@angular/common": "^19.0.0",
+    "@angular/compiler": "^19.0.0",
+    "@angular/core": "^19.0.0",
+    "@angular/forms": "^19.0.0",
+    "@angular/platform-browser": "^19.0.0",
+    "@angular/router": "^19.0.0",
+    "rxjs": "~7.8.0",
+    "tslib": "^2.6.0",
+    "zone.js": "~0.15.0"
+  },
+  "devDependencies": {
+    "@angular/build": "^19.0.0",
+    "@angular/cli": "^19.0.0",
+    "@angular/compiler-cli": "^19.0.0",
+    "typescript": "~5.6.0"
+  }
+}
+"""
+)
+
+_ANGULAR_JSON = Template(
+    """{
+  "$$schema": "./node_modules/@angular/cli/lib/config/schema.json",
+  "version": 1,
+  "newProjectRoot": "projects",
+  "projects": {
+    "$slug": {
+      "projectType": "application",
+      "schematics": { "@schematics/angular:component": { "style": "scss" } },
+      "root": "",
+      "sourceRoot": "src",
+      "prefix": "app",
+      "architect": {
+        "build": {
+          "builder": "@angular/build:application",
+          "options": {
+            "outputPath": "dist/$slug",
+            "index": "src/index.html",
+            "browser": "src/main.ts",
+            "polyfills": ["zone.js"],
+            "tsConfig": "tsconfig.app.json",
+            "inlineStyleLanguage": "scss",
+            "styles": ["src/styles.scss"]
+          },
+          "configurations": {
+            "development": {
+              "optimization": false,
+              "sourceMap": true,
+              "fileReplacements": [
+                { "replace": "src/environments/environment.ts", "with": "src/environments/environment.development.ts" }
+              ]
+            }
+          },
+          "defaultConfiguration": "development"
+        },
+        "serve": {
+          "builder": "@angular/build:dev-server",
+          "defaultConfiguration": "development",
+          "configurations": { "development": { "buildTarget": "$slug:build:development" } }
+        }
+      }
+    }
+  }
+}
+"""
+)
+
+_INDEX_HTML = Template(
+    """<!doctype html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8" />
+    <title>$title</title>
+    <base href="/" />
+    <meta name="viewport" content="width=device-width, initial-scale=1" />
+  </head>
+  <body>
+    <app-root></app-root>
+  </body>
+</html>
+"""
+)
+
+_APP_COMPONENT_TS = Template(
+    """import { Component } from '@angular/core';
+import { RouterLink, RouterLinkActive, RouterOutlet } from '@angular/router';
+
+@Component({
+  selector: 'app-root',
+  standalone: true,
+  imports: [RouterOutlet, RouterLink, RouterLinkActive],
+  templateUrl: './app.component.html',
+  styleUrl: './app.component.scss',
+})
+export class AppComponent {
+  readonly title = $title_literal;
+  readonly navItems = [
+$nav_items  ];
+}
+"""
+)
+
+_APP_COMPONENT_HTML = """<header class="app-header">
+  <strong>{{ title }}</strong>
+  <nav>
+    @for (item of navItems; track item.path) {
+      <a [routerLink]="item.path" routerLinkActive="active">{{ item.label }}</a>
+    }
+  </nav>
+</header>
+<main class="app-main">
+  <router-outlet />
+</main>
+"""
+
+_APP_ROUTES_TS = Template(
+    """import { Routes } from '@angular/router';
+
+export const routes: Routes = [
+$entity_routes  { path: '**', redirectTo: '$default_path' },
+];
+"""
+)
+
+
+def _ts_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def feature_routes_file(entity: EntityNames) -> str:
+    return f"src/app/features/{entity.kebab}/{entity.kebab}.routes.ts"
+
+
+def render_scaffold(spec: dict[str, Any] | None) -> dict[str, str]:
+    """Return {path: content} for the project skeleton described by `spec`."""
+    project_name = str((spec or {}).get("project_name") or "ProtoPilot App")
+    slug = _slug(project_name)
+    entities = spec_entities(spec)
+
+    entity_routes = "".join(
+        f"  {{ path: '{e.collection}', loadChildren: () => import('./features/{e.kebab}/{e.kebab}.routes') }},\n"
+        for e in entities
+    )
+    if entities:
+        entity_routes = f"  {{ path: '', pathMatch: 'full', redirectTo: '{entities[0].collection}' }},\n" + entity_routes
+    nav_items = "".join(
+        f"    {{ path: '/{e.collection}', label: {_ts_string(e.label.title())} }},\n" for e in entities
+    )
+    mock_data = "".join(f"  {_ts_string(e.collection)}: [],\n" for e in entities)
+
+    files = dict(_STATIC_FILES)
+    files["package.json"] = _PACKAGE_JSON.substitute(slug=slug)
+    files["angular.json"] = _ANGULAR_JSON.substitute(slug=slug)
+    files["src/index.html"] = _INDEX_HTML.substitute(title=project_name.replace("<", "&lt;"))
+    files["src/app/app.component.ts"] = _APP_COMPONENT_TS.substitute(
+        title_literal=_ts_string(project_name), nav_items=nav_items
+    )
+    files["src/app/app.component.html"] = _APP_COMPONENT_HTML
+    files["src/app/app.routes.ts"] = _APP_ROUTES_TS.substitute(
+        entity_routes=entity_routes, default_path=entities[0].collection if entities else ""
+    )
+    files["src/app/core/mocks/mock-data.ts"] = (
+        "/** Seed records per API collection; feature code replaces these with realistic samples. */\n"
+        "export const MOCK_DATA: Record<string, Array<{ id: string | number } & Record<string, unknown>>> = {\n"
+        f"{mock_data}}};\n"
+    )
+    return files
+
+
+def scaffold_prompt(spec: dict[str, Any] | None, files: dict[str, str]) -> str:
+    """Prompt section telling the agent what already exists and what it owes."""
+    entities = spec_entities(spec)
+    lines = [
+        "Scaffold: the following files already exist in generated_code_files. "
+        "Do NOT re-emit them unless you must change them; anything you save is merged on top.",
+        *[f"- {path}" for path in sorted(files)],
+        "Available building blocks: ApiService (src/app/core/services/api.service.ts, CRUD against /api/<collection>), "
+        "mockApiInterceptor serving MOCK_DATA (src/app/core/mocks/mock-data.ts), "
+        "LoadingSpinnerComponent and ErrorMessageComponent (src/app/shared/components/).",
+    ]
+    if entities:
+        lines.append("You MUST create, for each entity, a routes file that default-exports Routes:")
+        lines += [f"- {feature_routes_file(e)} (collection '{e.collection}')" for e in entities]
+        lines.append("Overwrite src/app/core/mocks/mock-data.ts with realistic sample records for those collections.")
+    return "\n".join(lines)
@@ -0,0 +1,195 @@
+"""
+Local similarity index over completed projects' specs.
+
+Embedding-free: specs are reduced to bag-of-words term frequencies and compared
+with TF-IDF cosine similarity, so lookups need no model call. When a new spec
+is submitted, the closest completed project above SIMILAR_REUSE_THRESHOLD is
+recorded on the project and offered to the artifacts and codegen agents as a
+starting draft.
+
+Entries outlive memory eviction. In shared mode the terms are kept in the
+coordinator, so every worker (and a restarted one) sees the same candidates,
+and the reference itself is read back from the store. In memory mode an
+evicted project is gone from the store, so the index keeps the reference's
+spec and compressed documents itself, for the SIMILAR_REUSE_KEEP most
+recently completed projects.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+from core.coordination import get_coordinator, shared_state_enabled
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have in into is it its of on or should that the their them "
+    "they this to users user with will within without able allow allows app application system".split()
+)
+# Fields that describe the product shape; free-form assumptions and open
+# questions are left out because they add noise rather than signal.
+_SPEC_FIELDS = (
+    "project_name",
+    "problem_statement",
+    "target_users",
+    "goals",
+    "functional_requirements",
+    "core_entities",
+)
+
+
+def reuse_enabled() -> bool:
+    return os.getenv("SIMILAR_REUSE", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def reuse_threshold() -> float:
+    return float(os.getenv("SIMILAR_REUSE_THRESHOLD", "0.35"))
+
+
+def reuse_keep() -> int:
+    return int(os.getenv("SIMILAR_REUSE_KEEP", "50"))
+
+
+_NAMESPACE = "similarity"
+
+
+def _flatten(value: Any) -> str:
+    if isinstance(value, dict):
+        return " ".join(_flatten(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten(v) for v in value)
+    return str(value) if value is not None else ""
+
+
+def spec_terms(spec: dict[str, Any] | None) -> Counter[str]:
+    terms: Counter[str] = Counter()
+    for name in _SPEC_FIELDS:
+        text = _flatten((spec or {}).get(name)).lower()
+        weight = 2 if name in ("core_entities", "functional_requirements") else 1
+        for token in _TOKEN_RE.findall(text):
+            if token not in _STOPWORDS:
+                terms[token] += weight
+    return terms
+
+
+@dataclass(frozen=True)
+class ReferenceProject:
+    """What reuse reads from a completed project; the documents are the project's own BlobMaps."""
+
+    project_id: str
+    spec: Optional[dict[str, Any]]
+    nontech_artifacts_md: Optional[Mapping[str, str]]
+    technical_artifacts_md: Optional[Mapping[str, str]]
+    generated_code_files: Optional[Mapping[str, str]]
+
+
+class SimilarityIndex:
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._docs: dict[str, Counter[str]] = {}
+        self._df: Counter[str] = Counter()
+        # Shared mode: coordinator rows as last read, to re-decode only changed ones.
+        self._rows: dict[str, str] = {}
+        # Memory mode: references of completed projects, oldest first.
+        self._references: OrderedDict[str, ReferenceProject] = OrderedDict()
+
+    def add(self, project_id: str, spec: dict[str, Any] | None, reference: Any = None) -> None:
+        """Index a completed project; `reference` (its ProjectState) is kept in memory mode."""
+        terms = spec_terms(spec)
+        if shared_state_enabled():
+            get_coordinator().put(_NAMESPACE, project_id, json.dumps(terms))
+        with self._guard:
+            self._set_locked(project_id, terms)
+            if reference is not None and not shared_state_enabled():
+                self._references.pop(project_id, None)
+                self._references[project_id] = ReferenceProject(
+                    project_id=project_id,
+                    spec=reference.spec,
+                    nontech_artifacts_md=reference.nontech_artifacts_md,
+                    technical_artifacts_md=reference.technical_artifacts_md,
+                    generated_code_files=reference.generated_code_files,
+                )
+                while len(self._references) > max(1, reuse_keep()):
+                    dropped, _ref = self._references.popitem(last=False)
+                    self._remove_locked(dropped)
+
+    def reference(self, project_id: str) -> Optional[ReferenceProject]:
+        with self._guard:
+            return self._references.get(project_id)
+
+    def references(self) -> list[ReferenceProject]:
+        with self._guard:
+            return list(self._references.values())
+
+    def _set_locked(self, project_id: str, terms: Counter[str]) -> None:
+        self._remove_locked(project_id)
+        if terms:
+            self._docs[project_id] = terms
+            self._df.update(terms.keys())
+
+    def _remove_locked(self, project_id: str) -> None:
+        old = self._docs.pop(project_id, None)
+        if old:
+            self._df.subtract(old.keys())
+            self._df += Counter()  # drop zero counts
+
+    def _sync(self) -> None:
+        """Shared mode: pick up projects other workers completed."""
+        if not shared_state_enabled():
+            return
+        rows = dict(get_coordinator().items(_NAMESPACE))
+        with self._guard:
+            for project_id in set(self._rows) - set(rows):
+                self._rows.pop(project_id)
+                self._remove_locked(project_id)
+            for project_id, raw in rows.items():
+                if self._rows.get(project_id) != raw:
+                    self._rows[project_id] = raw
+                    self._set_locked(project_id, Counter(json.loads(raw)))
+
+    def _vector(self, terms: Counter[str], n_docs: int) -> dict[str, float]:
+        return {t: (1 + math.log(tf)) * math.log((1 + n_docs) / (1 + self._df.get(t, 0)) + 1) for t, tf in terms.items()}
+
+    def most_similar(self, spec: dict[str, Any] | None, exclude: Optional[str] = None) -> Optional[tuple[str, float]]:
+        query = spec_terms(spec)
+        if not query:
+            return None
+        self._sync()
+        with self._guard:
+            n_docs = len(self._docs)
+            q = self._vector(query, n_docs)
+            q_norm = math.sqrt(sum(w * w for w in q.values()))
+            best: Optional[tuple[str, float]] = None
+            for project_id, terms in self._docs.items():
+                if project_id == exclude:
+                    continue
+                d = self._vector(terms, n_docs)
+                d_norm = math.sqrt(sum(w * w for w in d.values()))
+                if not q_norm or not d_norm:
+                    continue
+                score = sum(w * d.get(t, 0.0) for t, w in q.items()) / (q_norm * d_norm)
+                if best is None or score > best[1]:
+                    best = (project_id, score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+similarity_index = SimilarityIndex()
+
+
+def find_reuse_source(project_id: str, spec: dict[str, Any] | None) -> Optional[dict[str, Any]]:
+    """Closest completed project above the threshold, or None."""
+    if not reuse_enabled():
+        return None
+    match = similarity_index.most_similar(spec, exclude=project_id)
+    if match is None or match[1] < reuse_threshold():
+        return None
+    return {"project_id": match[0], "score": round(match[1], 3)}
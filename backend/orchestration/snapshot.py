@@ -0,0 +1,127 @@
+"""
+Pre-serialised project snapshots for response bodies.
+
+The spec, artifact dicts and generated code change only when a save tool runs,
+which bumps that field's counter in ProjectState.field_versions. The JSON bytes
+of each field are cached per (project, field) together with the version they
+were encoded at, so building a response for unchanged state is a dictionary
+lookup plus a byte join instead of re-encoding the whole project.
+
+The fragments are plain (uncompressed) JSON, so the cache is an LRU bounded by
+SNAPSHOT_CACHE_MB across all projects; without the bound every rendered
+project would hold more in fragments than its compressed bodies.
+
+orjson is used when installed; otherwise the stdlib encoder.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Optional
+
+from core.profiling import phase
+from orchestration.blobs import unpack
+from orchestration.store import ProjectState
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+SNAPSHOT_FIELDS = ("spec", "nontech_artifacts_md", "technical_artifacts_md", "generated_code_files")
+
+SNAPSHOT_CACHE_BYTES = int(float(os.getenv("SNAPSHOT_CACHE_MB", "16")) * 1024 * 1024)
+
+_CACHE: OrderedDict[tuple[str, str], tuple[int, bytes]] = OrderedDict()
+_cache_size = 0
+_guard = threading.Lock()
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _drop(key: tuple[str, str]) -> None:
+    global _cache_size
+    _version, encoded = _CACHE.pop(key)
+    _cache_size -= len(encoded)
+
+
+def field_json(proj: ProjectState, field: str) -> bytes:
+    global _cache_size
+    version = proj.field_versions.get(field, 0)
+    key = (proj.project_id, field)
+    with _guard:
+        cached = _CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            _CACHE.move_to_end(key)
+            return cached[1]
+    with phase("encode"):
+        encoded = dumps(unpack(getattr(proj, field)))
+    with _guard:
+        if key in _CACHE:
+            _drop(key)
+        if len(encoded) <= SNAPSHOT_CACHE_BYTES:
+            _CACHE[key] = (version, encoded)
+            _cache_size += len(encoded)
+        while _cache_size > SNAPSHOT_CACHE_BYTES:
+            _drop(next(iter(_CACHE)))
+    return encoded
+
+
+def forget(project_id: str) -> None:
+    """Drop cached fragments of an evicted project (its counters restart at 0)."""
+    with _guard:
+        for key in [key for key in _CACHE if key[0] == project_id]:
+            _drop(key)
+
+
+def cache_bytes(project_id: Optional[str] = None) -> int:
+    if project_id is None:
+        return _cache_size
+    with _guard:
+        return sum(len(encoded) for (pid, _field), (_v, encoded) in _CACHE.items() if pid == project_id)
+
+
+class ProjectResponse(dict):
+    """
+    Orchestrator response. Behaves as the plain dict callers always used; the
+    API renders it with render(), which splices cached field fragments for any
+    heavy key the caller has not replaced.
+    """
+
+    def __init__(self, proj: ProjectState, reply: str, artifacts_field: str):
+        super().__init__(
+            stage=proj.stage,
+            reply=reply,
+            spec=proj.spec,
+            nontech_artifacts_md=proj.nontech_artifacts_md,
+            technical_artifacts_md=proj.technical_artifacts_md,
+            artifacts_md=getattr(proj, artifacts_field),
+            generated_code_files=proj.generated_code_files,
+        )
+        self._proj = proj
+        self._fields = {field: field for field in SNAPSHOT_FIELDS}
+        self._fields["artifacts_md"] = artifacts_field
+
+    def render(self, prefix: dict[str, Any] | None = None) -> bytes:
+        # Fragments are joined exactly once; concatenating key + fragment
+        # per entry would copy multi-megabyte code dicts twice.
+        parts: list[bytes] = []
+        for key, value in (prefix or {}).items():
+            parts += (b",", dumps(key), b":", dumps(value))
+        for key, value in self.items():
+            field = self._fields.get(key)
+            if field is not None and value is getattr(self._proj, field):
+                encoded = field_json(self._proj, field)
+            else:
+                encoded = dumps(value.value if isinstance(value, Enum) else unpack(value))
+            parts += (b",", dumps(key), b":", encoded)
+        parts[0] = b"{"
+        parts.append(b"}")
+        return b"".join(parts)
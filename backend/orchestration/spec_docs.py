@@ -0,0 +1,188 @@
+"""
+Technical documents derived from the spec without a model call.
+
+The entity list, the ER diagram skeleton, the CRUD endpoint table and the
+requirement-to-feature traceability matrix follow mechanically from
+core_entities and functional_requirements. They are rendered here while the
+technical artifact agents run, and the agents write only the narrative and
+design documents on top.
+
+Names come from scaffold.entity_names, so collections, routes and feature
+folders match what the scaffold and the code generation agent use.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+from orchestration.scaffold import EntityNames, entity_names, feature_routes_file, plural, spec_entities
+
+STRUCTURAL_DOCUMENTS = ("entity_diagram.md", "api_endpoints.md", "traceability_matrix.md")
+
+
+def _cell(value: Any) -> str:
+    return " ".join(str(value).split()).replace("|", "\\|") or "N/A"
+
+
+def _identifier(value: Any, fallback: str) -> str:
+    ident = re.sub(r"\W+", "_", str(value or "")).strip("_")
+    return ident or fallback
+
+
+def _raw_entities(spec: dict[str, Any] | None) -> dict[str, Any]:
+    """kebab name -> the raw core_entities item, for entities given as objects."""
+    out: dict[str, Any] = {}
+    for raw in (spec or {}).get("core_entities") or []:
+        names = entity_names(raw)
+        if names and names.kebab not in out:
+            out[names.kebab] = raw
+    return out
+
+
+def entity_attributes(raw: Any) -> list[tuple[str, str]]:
+    """(type, name) pairs for an entity given as {"name": ..., "attributes"/"fields": ...}."""
+    attrs = (raw.get("attributes") or raw.get("fields")) if isinstance(raw, dict) else None
+    if isinstance(attrs, dict):
+        attrs = [{"name": name, "type": kind} for name, kind in attrs.items()]
+    out: list[tuple[str, str]] = []
+    for attr in attrs or []:
+        if isinstance(attr, dict):
+            name, kind = attr.get("name"), attr.get("type") or "string"
+        else:
+            name, kind = attr, "string"
+        name = _identifier(name, "")
+        if name and name != "id":
+            out.append((_identifier(kind, "string"), name))
+    return out
+
+
+def _references(attrs: list[tuple[str, str]], entities: list[EntityNames]) -> list[EntityNames]:
+    # taskId / task_id on another entity is the only relationship the spec states outright.
+    names = {name.lower().replace("_", "") for _kind, name in attrs}
+    return [e for e in entities if f"{e.camel.lower()}id" in names]
+
+
+def render_entity_diagram(spec: dict[str, Any] | None) -> str:
+    entities = spec_entities(spec)
+    raw = _raw_entities(spec)
+    lines = [
+        "# Entity Diagram",
+        "",
+        "Derived from `core_entities`. Attributes and relationships not stated in the spec are",
+        "described in `api_documentation.md`.",
+        "",
+        "## Entities",
+        "",
+        "| Entity | Collection | Frontend feature | Attributes |",
+        "|---|---|---|---|",
+    ]
+    if not entities:
+        lines.append("| N/A | N/A | N/A | N/A |")
+    for entity in entities:
+        attrs = entity_attributes(raw.get(entity.kebab))
+        attr_text = ", ".join(name for _kind, name in attrs) or "N/A (TBD)"
+        lines.append(
+            f"| {_cell(entity.pascal)} | `{entity.collection}` | `src/app/features/{entity.kebab}/` | {_cell(attr_text)} |"
+        )
+    lines += ["", "## ER Diagram (skeleton)", "", "```mermaid", "erDiagram"]
+    for entity in entities:
+        lines.append(f"    {entity.pascal} {{")
+        lines.append("        string id PK")
+        for kind, name in entity_attributes(raw.get(entity.kebab)):
+            lines.append(f"        {kind} {name}")
+        lines.append("    }")
+    for entity in entities:
+        for target in _references(entity_attributes(raw.get(entity.kebab)), entities):
+            lines.append(f"    {entity.pascal} }}o--|| {target.pascal} : references")
+    lines += ["```", ""]
+    return "\n".join(lines)
+
+
+def render_api_endpoints(spec: dict[str, Any] | None) -> str:
+    lines = [
+        "# API Endpoints",
+        "",
+        "CRUD endpoints per entity in `core_entities`. In the prototype they are served by the",
+        "mock API interceptor; the Spring Boot backend implements the same contract.",
+        "",
+        "| Entity | Method | URL | Description |",
+        "|---|---|---|---|",
+    ]
+    entities = spec_entities(spec)
+    if not entities:
+        lines.append("| N/A | N/A | N/A | N/A |")
+    for entity in entities:
+        base = f"/api/{entity.collection}"
+        label = entity.label.lower()
+        lines += [
+            f"| {entity.pascal} | GET | `{base}` | List {label} records |",
+            f"| {entity.pascal} | GET | `{base}/{{id}}` | Get one {label} |",
+            f"| {entity.pascal} | POST | `{base}` | Create a {label} |",
+            f"| {entity.pascal} | PUT | `{base}/{{id}}` | Update a {label} |",
+            f"| {entity.pascal} | DELETE | `{base}/{{id}}` | Delete a {label} |",
+        ]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _requirement(raw: Any, index: int) -> tuple[str, str]:
+    if isinstance(raw, dict):
+        text = raw.get("description") or raw.get("title") or raw.get("name") or json.dumps(raw, ensure_ascii=False)
+        return str(raw.get("id") or f"FR-{index:02d}"), str(text)
+    return f"FR-{index:02d}", str(raw)
+
+
+def _mentions(text: str, entity: EntityNames) -> bool:
+    label = entity.label.lower()
+    forms = {label, plural(label), entity.collection.replace("-", " ")}
+    pattern = "|".join(re.escape(form) for form in sorted(forms, key=len, reverse=True))
+    return re.search(rf"\b(?:{pattern})\b", text.lower()) is not None
+
+
+def render_traceability_matrix(spec: dict[str, Any] | None) -> str:
+    entities = spec_entities(spec)
+    lines = [
+        "# Traceability Matrix",
+        "",
+        "Functional requirements mapped to the frontend features of the entities they mention.",
+        "Requirements that name no entity belong to the app shell.",
+        "",
+        "| ID | Requirement | Entities | Feature | Route |",
+        "|---|---|---|---|---|",
+    ]
+    requirements = (spec or {}).get("functional_requirements") or []
+    if not requirements:
+        lines.append("| N/A | N/A | N/A | N/A | N/A |")
+    for index, raw in enumerate(requirements, start=1):
+        req_id, text = _requirement(raw, index)
+        matched = [entity for entity in entities if _mentions(text, entity)]
+        if matched:
+            names = ", ".join(entity.pascal for entity in matched)
+            features = ", ".join(f"`{feature_routes_file(entity)}`" for entity in matched)
+            routes = ", ".join(f"`/{entity.collection}`" for entity in matched)
+        else:
+            names, features, routes = "—", "App shell (`src/app/app.component.ts`)", "`/`"
+        lines.append(f"| {_cell(req_id)} | {_cell(text)} | {names} | {features} | {routes} |")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def render_structural_docs(spec: dict[str, Any] | None) -> dict[str, str]:
+    """Return {filename: markdown} for STRUCTURAL_DOCUMENTS."""
+    return {
+        "entity_diagram.md": render_entity_diagram(spec),
+        "api_endpoints.md": render_api_endpoints(spec),
+        "traceability_matrix.md": render_traceability_matrix(spec),
+    }
+
+
+def structural_docs_prompt(docs: dict[str, str]) -> str:
+    """Prompt section giving the agent the derived documents it must build on, not rewrite."""
+    return "\n\n".join(
+        [
+            "These technical documents are derived from the spec and saved already. "
+            "Do NOT write or save them again; keep names, collections and URLs consistent with them:",
+            *[f"--- {name} ---\n{body}" for name, body in docs.items()],
+        ]
+    )
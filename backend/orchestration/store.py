@@ -1,6 +1,16 @@
-from dataclasses import dataclass
+import asyncio
+import copy
+import json
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field, fields
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Iterator, Mapping, Optional
+
+from core.coordination import distributed_lock, get_coordinator, shared_state_enabled
+from orchestration.blobs import BlobMap, intern_text, interned_blob, pack
+from orchestration.versions import BLOBS_NAMESPACE
 
 class Stage(str, Enum):
     REQ = "REQ"
@@ -16,15 +26,213 @@ class ProjectState:
     req_session_id: str
     stage: Stage = Stage.REQ
     spec: Optional[dict[str, Any]] = None
-    nontech_artifacts_md: Optional[dict[str, str]] = None
-    technical_artifacts_md: Optional[dict[str, str]] = None
-    generated_code_files: Optional[dict[str, str]] = None
+    # Document fields hold compressed BlobMaps once a tool has written them or
+    # they are loaded in shared mode (plain dicts from a row of the old
+    # format); both read as Mapping[str, str].
+    nontech_artifacts_md: Optional[Mapping[str, str]] = None
+    technical_artifacts_md: Optional[Mapping[str, str]] = None
+    generated_code_files: Optional[Mapping[str, str]] = None
+    # Bumped by the save tools; keys the pre-serialised snapshot cache.
+    field_versions: dict[str, int] = field(default_factory=dict)
+    # Closest completed project ({"project_id", "score"}) offered as a draft.
+    reuse_source: Optional[dict[str, Any]] = None
+    reuse_enabled: bool = True
+    # Pipeline step name -> input field versions it last completed from.
+    step_inputs: dict[str, dict[str, int]] = field(default_factory=dict)
+    # Codegen checkpoint: {"inputs", "plan", "saved", "attempts", "last_error", "updated_at"}.
+    codegen_progress: Optional[dict[str, Any]] = None
 
 _PROJECTS: dict[str, ProjectState] = {}
+_LAST_ACCESS: dict[str, float] = {}
+
+_PROJECTS_NAMESPACE = "projects"
+DOCUMENT_FIELDS = ("nontech_artifacts_md", "technical_artifacts_md", "generated_code_files")
+
+# Per-project re-entrant locks for read-modify-write from tool threads.
+_GUARDS: dict[str, threading.RLock] = {}
+_GUARDS_LOCK = threading.Lock()
+
+# Shared mode: projects whose turn this process is running, with their last
+# loaded or saved state. Only the lock holder writes a project, so for the
+# rest of the turn reads are served from here instead of re-decoding the row.
+_TURN_PROJECTS: dict[str, Optional["ProjectState"]] = {}
+_TURN_GUARD = threading.Lock()
+
+
+def _dump_project(proj: ProjectState, stored: Optional[ProjectState] = None) -> str:
+    """
+    Shared-mode row: document fields are {name: sha256} manifests, their bodies
+    go to the blob table once per digest. A save that adds one code file
+    therefore writes that file's body and a list of digests, not every file
+    again. Bodies the row last read or written (`stored`) already referenced
+    are known to be there and are not re-sent.
+    """
+    data = {f.name: getattr(proj, f.name) for f in fields(proj) if f.name not in DOCUMENT_FIELDS}
+    data["stage"] = proj.stage.value
+    known: set[str] = set()
+    for name in DOCUMENT_FIELDS:
+        previous = getattr(stored, name, None) if stored is not None else None
+        if isinstance(previous, BlobMap):
+            known.update(previous.digests().values())
+    manifests: dict[str, Optional[dict[str, str]]] = {}
+    bodies: list[tuple[str, str]] = []
+    for name in DOCUMENT_FIELDS:
+        docs = pack(getattr(proj, name))
+        if docs is None:
+            manifests[name] = None
+            continue
+        manifests[name] = docs.digests()
+        for blob in docs.blobs().values():
+            if blob.digest not in known:
+                known.add(blob.digest)
+                bodies.append((blob.digest, blob.decode()))
+    get_coordinator().put_many_if_absent(BLOBS_NAMESPACE, bodies)
+    data["documents"] = manifests
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _load_project(raw: str) -> ProjectState:
+    data = json.loads(raw)
+    data["stage"] = Stage(data["stage"])
+    manifests = data.pop("documents", None)
+    if manifests is None:
+        # Row written before document bodies moved to the blob table: kept as
+        # plain dicts, so the next save does not assume the bodies are stored.
+        return ProjectState(**data)
+    blobs = {digest: interned_blob(digest) for m in manifests.values() for digest in (m or {}).values()}
+    missing = [digest for digest, blob in blobs.items() if blob is None]
+    if missing:
+        for digest, body in get_coordinator().get_many(BLOBS_NAMESPACE, missing).items():
+            blobs[digest] = intern_text(body)
+    for name in DOCUMENT_FIELDS:
+        manifest = manifests.get(name)
+        data[name] = BlobMap({doc: blobs[digest] for doc, digest in manifest.items()}) if manifest is not None else None
+    return ProjectState(**data)
+
+
+def _copy_project(proj: ProjectState) -> ProjectState:
+    """A copy callers may mutate; document bodies (strings, immutable BlobMaps) are shared."""
+    copied = copy.copy(proj)
+    for f in fields(proj):
+        value = getattr(proj, f.name)
+        if f.name in DOCUMENT_FIELDS:
+            setattr(copied, f.name, dict(value) if isinstance(value, dict) else value)
+        elif isinstance(value, (dict, list)):
+            setattr(copied, f.name, copy.deepcopy(value))
+    return copied
+
+
+def _turn_project(project_id: str) -> Optional[ProjectState]:
+    with _TURN_GUARD:
+        proj = _TURN_PROJECTS.get(project_id)
+    return _copy_project(proj) if proj is not None else None
+
+
+def _remember(proj: ProjectState) -> ProjectState:
+    with _TURN_GUARD:
+        if proj.project_id in _TURN_PROJECTS:
+            _TURN_PROJECTS[proj.project_id] = _copy_project(proj)
+    return proj
+
 
 def get_or_create_project(project_id: str, req_session_id: str) -> ProjectState:
+    """
+    In memory mode the returned object is the live state. In shared mode it is
+    a fresh copy loaded from the coordinator (or, during this process's turn,
+    from project_turn's cache); callers that mutate it must call
+    save_project() afterwards.
+    """
+    if shared_state_enabled():
+        cached = _turn_project(project_id)
+        if cached is not None:
+            return cached
+        coordinator = get_coordinator()
+        raw = coordinator.get(_PROJECTS_NAMESPACE, project_id)
+        if raw is None:
+            proj = ProjectState(project_id=project_id, req_session_id=req_session_id)
+            if coordinator.put_if_absent(_PROJECTS_NAMESPACE, project_id, _dump_project(proj)):
+                return _remember(proj)
+            raw = coordinator.get(_PROJECTS_NAMESPACE, project_id)
+        return _remember(_load_project(raw))
+
     proj = _PROJECTS.get(project_id)
     if proj is None:
         proj = ProjectState(project_id=project_id, req_session_id=req_session_id)
         _PROJECTS[project_id] = proj
+    _LAST_ACCESS[project_id] = time.time()
     return proj
+
+
+def get_project(project_id: str) -> Optional[ProjectState]:
+    """Like get_or_create_project, but never creates."""
+    if shared_state_enabled():
+        cached = _turn_project(project_id)
+        if cached is not None:
+            return cached
+        raw = get_coordinator().get(_PROJECTS_NAMESPACE, project_id)
+        return _remember(_load_project(raw)) if raw is not None else None
+    return _PROJECTS.get(project_id)
+
+
+def loaded_projects() -> list[tuple[ProjectState, float]]:
+    """Process-local projects with their last access time (memory mode only)."""
+    return [(proj, _LAST_ACCESS.get(project_id, 0.0)) for project_id, proj in list(_PROJECTS.items())]
+
+
+def project_lock_name(project_id: str) -> str:
+    return f"project:{project_id}"
+
+
+@asynccontextmanager
+async def project_turn(project_id: str, req_session_id: Optional[str] = None) -> AsyncIterator[None]:
+    """
+    Hold the project's turn lock across workers. In shared mode the decoded
+    project is cached while it is held and dropped on release. It is loaded
+    afresh (another worker may have written since this one last read), on a
+    worker thread, so the turn's own reads never touch SQLite on the loop.
+    """
+    async with distributed_lock(project_lock_name(project_id)):
+        if not shared_state_enabled():
+            yield
+            return
+        with _TURN_GUARD:
+            _TURN_PROJECTS[project_id] = None
+        try:
+            await asyncio.to_thread(get_or_create_project, project_id, req_session_id or project_id)
+            yield
+        finally:
+            with _TURN_GUARD:
+                _TURN_PROJECTS.pop(project_id, None)
+
+
+@contextmanager
+def project_guard(project_id: str) -> Iterator[None]:
+    """
+    Serialise mutation of one project within this process. Across processes
+    the turn's distributed_lock already keeps writers apart.
+    """
+    with _GUARDS_LOCK:
+        guard = _GUARDS.setdefault(project_id, threading.RLock())
+    with guard:
+        yield
+
+
+def drop_project(project_id: str) -> Optional[ProjectState]:
+    _LAST_ACCESS.pop(project_id, None)
+    with _GUARDS_LOCK:
+        _GUARDS.pop(project_id, None)
+    return _PROJECTS.pop(project_id, None)
+
+
+def bump_field_version(proj: ProjectState, name: str) -> int:
+    proj.field_versions[name] = proj.field_versions.get(name, 0) + 1
+    return proj.field_versions[name]
+
+
+def save_project(proj: ProjectState) -> None:
+    """Persist a mutated project. No-op in memory mode."""
+    if shared_state_enabled():
+        with _TURN_GUARD:
+            stored = _TURN_PROJECTS.get(proj.project_id)
+        get_coordinator().put(_PROJECTS_NAMESPACE, proj.project_id, _dump_project(proj, stored))
+        _remember(proj)
@@ -0,0 +1,219 @@
+"""
+Execution layer for agent tools.
+
+Tools stay plain synchronous functions in tools.py. ADK calls plain functions
+directly on the event loop, so a tool that hashes and versions a few hundred
+code files stalls every other project's turn while it runs. Tools marked
+`@heavy` are therefore wrapped in coroutines that run them on a bounded
+thread pool (TOOL_WORKERS); cheap reads (loads, listings) stay inline,
+where a thread hop would cost more than the call.
+
+Tools that mutate ProjectState hold the project's guard
+(store.project_guard), so two steps of the same project running in parallel
+cannot interleave their read-modify-write of it. The guard is a thread lock
+a worker may be holding, so those tools run on the pool too, cheap or not;
+the orchestrator calls them through run_blocking for the same reason. A heavy call still queued when its turn is
+cancelled is skipped, so it cannot commit after the turn has given up.
+
+Per tool, ToolMetrics records time spent on the loop thread against time
+spent on workers; GET /admin/tools shows both.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+from core.profiling import phase
+from orchestration.store import project_guard
+
+TOOL_WORKERS = max(1, int(os.getenv("TOOL_WORKERS", "4")))
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def heavy(fn: F) -> F:
+    """Mark a tool as heavy: agents get a version that runs on the tool pool."""
+    fn.tool_cost = "heavy"
+    return fn
+
+
+def is_heavy(fn: Callable[..., Any]) -> bool:
+    return getattr(fn, "tool_cost", "cheap") == "heavy"
+
+
+def runs_on_pool(fn: Callable[..., Any]) -> bool:
+    """
+    Heavy tools, and any tool that takes the project guard: a heavy tool of the
+    same project may hold it on a worker, and waiting for it on the loop thread
+    would stall every other turn.
+    """
+    return is_heavy(fn) or getattr(fn, "locks_project", False)
+
+
+@dataclass
+class ToolStats:
+    heavy: bool
+    calls: int = 0
+    loop_s: float = 0.0
+    max_loop_s: float = 0.0
+    worker_s: float = 0.0
+    queue_s: float = 0.0
+    skipped: int = 0
+
+
+class ToolMetrics:
+    """Process-local, like ModelTimeMetrics."""
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._tools: dict[str, ToolStats] = {}
+
+    def record(self, name: str, heavy: bool, loop_s: float, worker_s: float = 0.0, queue_s: float = 0.0, skipped: bool = False) -> None:
+        with self._guard:
+            stats = self._tools.setdefault(name, ToolStats(heavy=heavy))
+            stats.calls += 1
+            stats.loop_s += loop_s
+            stats.max_loop_s = max(stats.max_loop_s, loop_s)
+            stats.worker_s += worker_s
+            stats.queue_s += queue_s
+            stats.skipped += int(skipped)
+
+    def report(self) -> dict[str, Any]:
+        with self._guard:
+            tools = {
+                name: {
+                    "cost": "heavy" if stats.heavy else "cheap",
+                    "calls": stats.calls,
+                    "loop_ms": round(stats.loop_s * 1000, 2),
+                    "max_loop_ms": round(stats.max_loop_s * 1000, 2),
+                    "worker_ms": round(stats.worker_s * 1000, 2),
+                    "queue_ms": round(stats.queue_s * 1000, 2),
+                    "skipped": stats.skipped,
+                }
+                for name, stats in self._tools.items()
+            }
+        return {
+            "workers": TOOL_WORKERS,
+            "in_flight": _in_flight,
+            "tools": tools,
+            "loop_ms": round(sum(t["loop_ms"] for t in tools.values()), 2),
+            "worker_ms": round(sum(t["worker_ms"] for t in tools.values()), 2),
+        }
+
+
+tool_metrics = ToolMetrics()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="protopilot-tool")
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _project_id(args: tuple, kwargs: dict[str, Any]) -> Optional[str]:
+    if "project_id" in kwargs:
+        return kwargs["project_id"]
+    return args[0] if args and isinstance(args[0], str) else None
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any, name: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Run `fn` on the tool pool and await it, under the project guard when the
+    first argument (or `project_id=`) names a project. Context variables
+    (deadline, request phases) follow the call into the worker.
+    """
+    global _in_flight
+    name = name or fn.__name__
+    project_id = _project_id(args, kwargs)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    cancelled = threading.Event()
+    timing = {"queue": 0.0, "worker": 0.0, "ran": False}
+    submitted = time.perf_counter()
+
+    def _call() -> Any:
+        started = time.perf_counter()
+        timing["queue"] = started - submitted
+        try:
+            if project_id is None:
+                timing["ran"] = True
+                return context.run(fn, *args, **kwargs)
+            with project_guard(project_id):
+                # Checked under the guard: a cancellation that landed first wins.
+                if cancelled.is_set():
+                    return None
+                timing["ran"] = True
+                return context.run(fn, *args, **kwargs)
+        finally:
+            timing["worker"] = time.perf_counter() - started
+
+    loop_started = time.perf_counter()
+    future = loop.run_in_executor(_get_executor(), _call)
+    loop_s = time.perf_counter() - loop_started
+    _in_flight += 1
+    try:
+        with phase(f"tool.{name}"):
+            return await future
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+    finally:
+        _in_flight -= 1
+        tool_metrics.record(
+            name,
+            heavy=True,
+            loop_s=loop_s,
+            worker_s=timing["worker"],
+            queue_s=timing["queue"],
+            skipped=cancelled.is_set() and not timing["ran"],
+        )
+
+
+def _offloaded(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_blocking(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def _inline(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            with phase(f"tool.{fn.__name__}"):
+                return fn(*args, **kwargs)
+        finally:
+            tool_metrics.record(fn.__name__, heavy=False, loop_s=time.perf_counter() - started)
+
+    return wrapper
+
+
+def agent_tools(*fns: Callable[..., Any]) -> list[Callable[..., Any]]:
+    """
+    Wrap tool functions for an ADK agent. Wrappers keep the name, signature
+    and docstring, so the function declarations the model sees are unchanged.
+    """
+    return [_offloaded(fn) if runs_on_pool(fn) else _inline(fn) for fn in fns]
@@ -1,15 +1,46 @@
 from __future__ import annotations
 
+import copy
+import functools
 import json
-from typing import Any
+import re
+import time
+from typing import Any, Callable
 
-from orchestration.store import Stage, get_or_create_project
+from core.profiling import phase
+from orchestration.blobs import BlobMap, merge, pack, unpack
+from orchestration.events import event_bus
+from orchestration.file_checks import validate_code_file
+from orchestration.patches import PatchError, apply_patch, parse_unified_diff
+from orchestration.similarity import find_reuse_source, similarity_index
+from orchestration.store import Stage, bump_field_version, get_or_create_project, get_project, project_guard, save_project
+from orchestration.tool_runtime import heavy
+from orchestration.versions import VersionKind, record_version, spec_documents
 
 
 def _log_tool_event(tool: str, payload: dict[str, Any]) -> None:
-    print(f"[TOOL_CALL] {tool} {json.dumps(payload, ensure_ascii=False)}")
+    with phase("tool_log"):
+        print(f"[TOOL_CALL] {tool} {json.dumps(payload, ensure_ascii=False)}")
 
 
+def _locked(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Hold the project guard across the tool's read-modify-write of ProjectState.
+    The guard may be held by a heavy tool on a worker, so locked tools never
+    run on the event loop (see tool_runtime.runs_on_pool).
+    """
+
+    @functools.wraps(fn)
+    def wrapper(project_id: str, *args: Any, **kwargs: Any) -> Any:
+        with project_guard(project_id):
+            return fn(project_id, *args, **kwargs)
+
+    wrapper.locks_project = True
+    return wrapper
+
+
+@heavy
+@_locked
 def submit_spec(project_id: str, spec: dict[str, Any]) -> dict[str, Any]:
     """
     Save finalized requirements spec and move project to non-technical artifacts.
@@ -17,7 +48,16 @@ def submit_spec(project_id: str, spec: dict[str, Any]) -> dict[str, Any]:
     proj = get_or_create_project(project_id, req_session_id=project_id)
     before = proj.stage.value
     proj.spec = spec
+    bump_field_version(proj, "spec")
     proj.stage = Stage.ARTIFACTS_NON_TECH
+    proj.reuse_source = find_reuse_source(project_id, spec) if proj.reuse_enabled else None
+    save_project(proj)
+    version = record_version(project_id, VersionKind.SPEC, spec_documents(spec))
+    event_bus.publish(
+        project_id,
+        "spec_saved",
+        {"stage_before": before, "stage": proj.stage.value, "version": version.number},
+    )
     _log_tool_event(
         "submit_spec",
         {
@@ -25,9 +65,11 @@ def submit_spec(project_id: str, spec: dict[str, Any]) -> dict[str, Any]:
             "stage_before": before,
             "stage_after": proj.stage.value,
             "spec_keys": list(spec.keys()),
+            "version": version.label,
+            "reuse_source": proj.reuse_source,
         },
     )
-    return {"ok": True, "project_id": project_id, "stage": proj.stage.value}
+    return {"ok": True, "project_id": project_id, "stage": proj.stage.value, "version": version.number}
 
 
 def load_spec(project_id: str) -> dict[str, Any]:
@@ -46,14 +88,30 @@ def load_spec(project_id: str) -> dict[str, Any]:
     return {"project_id": project_id, "spec": proj.spec or {}}
 
 
+@heavy
+@_locked
 def save_nontech_artifacts(project_id: str, artifacts_md: dict[str, str]) -> dict[str, Any]:
     """
     Save non-technical artifacts (as dictionary of filename: markdown_content) and wait for product-manager approval.
     """
     proj = get_or_create_project(project_id, req_session_id=project_id)
     before = proj.stage.value
-    proj.nontech_artifacts_md = artifacts_md
+    proj.nontech_artifacts_md = pack(artifacts_md)
+    bump_field_version(proj, "nontech_artifacts_md")
     proj.stage = Stage.WAIT_APPROVAL
+    save_project(proj)
+    version = record_version(project_id, VersionKind.NONTECH_ARTIFACTS, proj.nontech_artifacts_md)
+    event_bus.publish(
+        project_id,
+        "nontech_artifacts_saved",
+        {
+            "stage_before": before,
+            "stage": proj.stage.value,
+            "version": version.number,
+            "changed_files": version.changed,
+            "removed_files": version.removed,
+        },
+    )
     _log_tool_event(
         "save_nontech_artifacts",
         {
@@ -61,31 +119,46 @@ def save_nontech_artifacts(project_id: str, artifacts_md: dict[str, str]) -> dic
             "stage_before": before,
             "stage_after": proj.stage.value,
             "artifact_files": list(artifacts_md.keys()) if artifacts_md else [],
+            "version": version.label,
         },
     )
-    return {"ok": True, "project_id": project_id, "stage": proj.stage.value}
+    return {"ok": True, "project_id": project_id, "stage": proj.stage.value, "version": version.number}
 
 
-def save_technical_artifacts(project_id: str, artifacts_md: dict[str, str]) -> dict[str, Any]:
+@heavy
+@_locked
+def save_technical_documents(project_id: str, artifacts_md: dict[str, str]) -> dict[str, Any]:
     """
-    Save technical artifacts (as dictionary of filename: markdown_content) and move workflow to CODEGEN.
+    Save some of the technical artifacts (dictionary of filename: markdown content),
+    merged into the ones already saved. The stage is left to the orchestrator.
     """
     proj = get_or_create_project(project_id, req_session_id=project_id)
-    before = proj.stage.value
-    proj.technical_artifacts_md = artifacts_md
-    proj.stage = Stage.CODEGEN
+    proj.technical_artifacts_md = merge(proj.technical_artifacts_md, artifacts_md)
+    bump_field_version(proj, "technical_artifacts_md")
+    save_project(proj)
+    version = record_version(project_id, VersionKind.TECHNICAL_ARTIFACTS, proj.technical_artifacts_md)
+    event_bus.publish(
+        project_id,
+        "technical_artifacts_saved",
+        {
+            "stage": proj.stage.value,
+            "version": version.number,
+            "changed_files": version.changed,
+            "removed_files": version.removed,
+        },
+    )
     _log_tool_event(
-        "save_technical_artifacts",
+        "save_technical_documents",
         {
             "project_id": project_id,
-            "stage_before": before,
-            "stage_after": proj.stage.value,
-            "artifact_files": list(artifacts_md.keys()) if artifacts_md else [],
+            "artifacts_keys": sorted((artifacts_md or {}).keys()),
+            "version": version.label,
         },
     )
-    return {"ok": True, "project_id": project_id, "stage": proj.stage.value}
+    return {"ok": True, "project_id": project_id, "saved": sorted((artifacts_md or {}).keys()), "version": version.number}
 
 
+@_locked
 def set_project_stage(project_id: str, stage: str) -> dict[str, Any]:
     """
     Force-set project stage. Intended for explicit orchestration transitions.
@@ -93,6 +166,8 @@ def set_project_stage(project_id: str, stage: str) -> dict[str, Any]:
     proj = get_or_create_project(project_id, req_session_id=project_id)
     before = proj.stage.value
     proj.stage = Stage(stage)
+    save_project(proj)
+    event_bus.publish(project_id, "stage_changed", {"stage_before": before, "stage": proj.stage.value})
     _log_tool_event(
         "set_project_stage",
         {
@@ -120,19 +195,261 @@ def load_artifacts(project_id: str) -> dict[str, Any]:
     )
     return {
         "project_id": project_id,
-        "nontech_artifacts_md": proj.nontech_artifacts_md or {},
-        "technical_artifacts_md": proj.technical_artifacts_md or {},
+        "nontech_artifacts_md": unpack(proj.nontech_artifacts_md) or {},
+        "technical_artifacts_md": unpack(proj.technical_artifacts_md) or {},
     }
 
 
-def save_generated_code(project_id: str, files_json: dict[str, str]) -> dict[str, Any]:
+def codegen_remaining(progress: dict[str, Any] | None) -> list[str]:
+    """Planned code files not saved yet in the current codegen run."""
+    if not progress:
+        return []
+    saved = set(progress["saved"])
+    return [path for path in progress["plan"] if path not in saved]
+
+
+def _new_progress(inputs: dict[str, int]) -> dict[str, Any]:
+    return {
+        "inputs": dict(inputs),
+        "plan": [],
+        "saved": [],
+        # Saved by save_generated_file since the last recorded version.
+        "unversioned": [],
+        "rejected": {},
+        "attempts": 1,
+        "last_error": None,
+    }
+
+
+def _publish_progress(proj, remaining: list[str], path: str | None = None) -> None:
+    progress = proj.codegen_progress
+    payload = {"planned": len(progress["plan"]), "saved": len(progress["saved"]), "remaining": len(remaining)}
+    if path is not None:
+        payload["path"] = path
+    event_bus.publish(proj.project_id, "codegen_progress", payload)
+
+
+def _mark_saved(proj, files: dict[str, Any], versioned: bool = True) -> list[str]:
+    progress = proj.codegen_progress
+    if progress is None:
+        return []
+    progress["saved"] = sorted(set(progress["saved"]) | set(files))
+    rejected = progress.setdefault("rejected", {})
+    for path in files:
+        rejected.pop(path, None)
+    unversioned = set(progress.setdefault("unversioned", []))
+    progress["unversioned"] = [] if versioned else sorted(unversioned | set(files))
+    progress["updated_at"] = time.time()
+    remaining = codegen_remaining(progress)
+    _publish_progress(proj, remaining, path=next(iter(files)) if not versioned and len(files) == 1 else None)
+    return remaining
+
+
+def _record_code_version(proj, stage_before: str, source: str | None = None, **extra: Any):
+    """Version generated_code_files and announce it; the caller has saved the project."""
+    version = record_version(proj.project_id, VersionKind.GENERATED_CODE, proj.generated_code_files)
+    payload = {
+        "stage_before": stage_before,
+        "stage": proj.stage.value,
+        "version": version.number,
+        "written_files": version.changed,
+        "removed_files": version.removed,
+        **extra,
+    }
+    if source is not None:
+        payload["source"] = source
+    event_bus.publish(proj.project_id, "code_saved", payload)
+    return version
+
+
+@_locked
+def begin_codegen_attempt(project_id: str, inputs: dict[str, int]) -> dict[str, Any]:
     """
-    Save generated code files (as dictionary of filepath: file_content) and move to QA stage.
+    Open a codegen attempt. The checkpoint of an unfinished run from the same
+    input versions is resumed; otherwise a fresh one starts. Not exposed to agents.
     """
     proj = get_or_create_project(project_id, req_session_id=project_id)
+    progress = proj.codegen_progress
+    resumed = bool(progress) and progress["inputs"] == inputs and proj.stage != Stage.QA
+    if resumed:
+        progress["attempts"] += 1
+    else:
+        progress = _new_progress(inputs)
+    progress["updated_at"] = time.time()
+    proj.codegen_progress = progress
+    save_project(proj)
+    _log_tool_event(
+        "begin_codegen_attempt",
+        {
+            "project_id": project_id,
+            "resumed": resumed,
+            "attempt": progress["attempts"],
+            "planned": len(progress["plan"]),
+            "saved": len(progress["saved"]),
+        },
+    )
+    return {**progress, "resumed": resumed}
+
+
+@_locked
+def record_codegen_error(project_id: str, error: str) -> None:
+    """Keep the last failure on the codegen checkpoint. Not exposed to agents."""
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    if proj.codegen_progress is not None:
+        proj.codegen_progress["last_error"] = error
+        proj.codegen_progress["updated_at"] = time.time()
+        save_project(proj)
+
+
+@_locked
+def begin_codegen(project_id: str, files: list[str]) -> dict[str, Any]:
+    """
+    Start (or resume) writing code: record every file path you will write, before writing any.
+    Returns the files already saved and those remaining. Then save each file with
+    save_generated_file as soon as it is written, and call finish_codegen at the end.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    progress = proj.codegen_progress
+    if progress is None:
+        progress = _new_progress({})
+    progress["plan"] = list(dict.fromkeys(files or []))
+    progress["updated_at"] = time.time()
+    proj.codegen_progress = progress
+    save_project(proj)
+    remaining = codegen_remaining(progress)
+    _publish_progress(proj, remaining)
+    _log_tool_event(
+        "begin_codegen",
+        {"project_id": project_id, "planned": len(progress["plan"]), "remaining": len(remaining)},
+    )
+    pending = set(remaining)
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "planned": len(progress["plan"]),
+        "saved_files": [path for path in progress["plan"] if path not in pending],
+        "remaining_files": remaining,
+    }
+
+
+@heavy
+@_locked
+def save_generated_file(project_id: str, path: str, content: str) -> dict[str, Any]:
+    """
+    Save one generated code file as soon as it is written. The file is checked first
+    (path, JSON syntax, unclosed brackets of a cut-off file); a rejected file is not
+    stored and the error says why, so fix it and save it again.
+    Returns progress: files written versus planned, and the ones remaining.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    error = validate_code_file(path, content)
+    if error is not None:
+        if proj.codegen_progress is not None:
+            proj.codegen_progress.setdefault("rejected", {})[str(path)] = error
+            save_project(proj)
+        _log_tool_event("save_generated_file", {"project_id": project_id, "path": path, "error": error})
+        return {"ok": False, "project_id": project_id, "path": path, "error": error}
+
+    proj.generated_code_files = merge(proj.generated_code_files, {path: content})
+    bump_field_version(proj, "generated_code_files")
+    # Versioned once by finish_codegen (or the orchestrator's checkpoint), not per file.
+    remaining = _mark_saved(proj, {path: content}, versioned=False)
+    save_project(proj)
+    progress = proj.codegen_progress or {}
+    _log_tool_event(
+        "save_generated_file",
+        {"project_id": project_id, "path": path, "bytes": len(content), "remaining": len(remaining)},
+    )
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "path": path,
+        "written": len(progress.get("saved", [])),
+        "planned": len(progress.get("plan", [])),
+        "remaining_files": remaining,
+    }
+
+
+@heavy
+@_locked
+def finish_codegen(project_id: str) -> dict[str, Any]:
+    """
+    Finish code generation after the last save_generated_file. If planned files are still
+    missing, nothing changes and they are listed: save them (or call begin_codegen with
+    the corrected list) and call finish_codegen again. Otherwise the stage moves to QA.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    progress = proj.codegen_progress
+    remaining = codegen_remaining(progress)
+    if remaining or (progress is not None and not progress["saved"]) or not proj.generated_code_files:
+        error = "Planned files are not saved yet." if remaining else "No code files saved yet."
+        _log_tool_event("finish_codegen", {"project_id": project_id, "remaining": len(remaining), "error": error})
+        return {
+            "ok": False,
+            "project_id": project_id,
+            "stage": proj.stage.value,
+            "error": error,
+            "remaining_files": remaining,
+        }
     before = proj.stage.value
-    proj.generated_code_files = files_json
     proj.stage = Stage.QA
+    if progress is not None:
+        progress["unversioned"] = []
+    save_project(proj)
+    similarity_index.add(project_id, proj.spec, reference=proj)
+    version = _record_code_version(proj, before)
+    _log_tool_event(
+        "finish_codegen",
+        {"project_id": project_id, "stage_before": before, "files": len(proj.generated_code_files), "version": version.label},
+    )
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "stage": proj.stage.value,
+        "files_count": len(proj.generated_code_files),
+        "version": version.number,
+    }
+
+
+@_locked
+def checkpoint_generated_code(project_id: str) -> dict[str, Any] | None:
+    """
+    Version the files save_generated_file wrote since the last version, so an
+    unfinished run is kept in the history. Not exposed to agents.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    progress = proj.codegen_progress
+    if not progress or not progress.get("unversioned"):
+        return None
+    written = progress["unversioned"]
+    progress["unversioned"] = []
+    save_project(proj)
+    version = _record_code_version(proj, proj.stage.value, source="checkpoint")
+    _log_tool_event("checkpoint_generated_code", {"project_id": project_id, "files": len(written), "version": version.label})
+    return {"version": version.number, "files": written}
+
+
+@heavy
+@_locked
+def save_generated_code(project_id: str, files_json: dict[str, str]) -> dict[str, Any]:
+    """
+    Save several generated code files at once (as dictionary of filepath: file_content).
+    Files are merged on top of the ones already present (the server-side scaffold).
+    Without a plan from begin_codegen this also moves to QA stage; with one, the stage
+    moves to QA once every planned file is saved.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    before = proj.stage.value
+    proj.generated_code_files = merge(proj.generated_code_files, files_json)
+    bump_field_version(proj, "generated_code_files")
+    remaining = _mark_saved(proj, files_json or {})
+    if not remaining:
+        proj.stage = Stage.QA
+    save_project(proj)
+    if not remaining:
+        # Completed projects become reuse candidates for later look-alike specs.
+        similarity_index.add(project_id, proj.spec, reference=proj)
+    version = _record_code_version(proj, before)
     _log_tool_event(
         "save_generated_code",
         {
@@ -140,6 +457,326 @@ def save_generated_code(project_id: str, files_json: dict[str, str]) -> dict[str
             "stage_before": before,
             "stage_after": proj.stage.value,
             "generated_files": list(files_json.keys()) if files_json else [],
+            "version": version.label,
+            "remaining": len(remaining),
         },
     )
-    return {"ok": True, "project_id": project_id, "stage": proj.stage.value, "files_count": len(files_json or {})}
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "stage": proj.stage.value,
+        "files_count": len(proj.generated_code_files),
+        "saved_files_count": len(files_json or {}),
+        "version": version.number,
+        "remaining_files": remaining,
+    }
+
+
+@heavy
+@_locked
+def seed_generated_code(project_id: str, files: dict[str, str]) -> dict[str, Any]:
+    """
+    Replace generated code with a server-side scaffold before the code generation
+    agent runs. Not exposed to agents; the stage is left unchanged.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    proj.generated_code_files = pack(files)
+    bump_field_version(proj, "generated_code_files")
+    save_project(proj)
+    version = _record_code_version(proj, proj.stage.value, source="scaffold")
+    _log_tool_event(
+        "seed_generated_code",
+        {"project_id": project_id, "scaffold_files": len(files), "version": version.label},
+    )
+    return {"ok": True, "project_id": project_id, "files_count": len(files), "version": version.number}
+
+
+def _reference_project(project_id: str):
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    source = proj.reuse_source if proj.reuse_enabled else None
+    ref = None
+    if source:
+        # The live project if still loaded; otherwise what the index kept of it.
+        ref = get_project(source["project_id"]) or similarity_index.reference(source["project_id"])
+    return proj, source, ref
+
+
+def load_reference_project(project_id: str) -> dict[str, Any]:
+    """
+    Load the most similar completed project (if any) as a starting draft:
+    its spec, artifacts and the list of its generated code file paths.
+    """
+    _proj, source, ref = _reference_project(project_id)
+    _log_tool_event(
+        "load_reference_project",
+        {"project_id": project_id, "reference": source, "available": ref is not None},
+    )
+    if ref is None:
+        return {"ok": False, "project_id": project_id, "reason": "No similar prior project."}
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "reference_project_id": ref.project_id,
+        "similarity": source["score"],
+        "spec": ref.spec or {},
+        "nontech_artifacts_md": unpack(ref.nontech_artifacts_md) or {},
+        "technical_artifacts_md": unpack(ref.technical_artifacts_md) or {},
+        "code_files": sorted((ref.generated_code_files or {}).keys()),
+    }
+
+
+def load_reference_code(project_id: str, paths: list[str]) -> dict[str, Any]:
+    """
+    Read selected code files of the reference project, to decide what can be reused.
+    """
+    _proj, source, ref = _reference_project(project_id)
+    files = (ref.generated_code_files or {}) if ref else {}
+    found = {path: files[path] for path in paths if path in files}
+    _log_tool_event(
+        "load_reference_code",
+        {"project_id": project_id, "reference": source, "requested": len(paths), "found": len(found)},
+    )
+    return {"ok": ref is not None, "project_id": project_id, "files": found, "missing": [p for p in paths if p not in files]}
+
+
+@heavy
+@_locked
+def copy_reference_files(project_id: str, paths: list[str]) -> dict[str, Any]:
+    """
+    Copy code files unchanged from the reference project into this project's generated code,
+    so they do not need to be re-emitted. Stage is unchanged.
+    """
+    proj, source, ref = _reference_project(project_id)
+    files = (ref.generated_code_files or {}) if ref else {}
+    copied = {path: files[path] for path in paths if path in files}
+    version = None
+    if copied:
+        proj.generated_code_files = merge(proj.generated_code_files, copied)
+        bump_field_version(proj, "generated_code_files")
+        _mark_saved(proj, copied)
+        save_project(proj)
+        version = _record_code_version(
+            proj, proj.stage.value, source="reference", reference_project_id=ref.project_id
+        )
+    _log_tool_event(
+        "copy_reference_files",
+        {"project_id": project_id, "reference": source, "copied": sorted(copied)},
+    )
+    return {
+        "ok": ref is not None,
+        "project_id": project_id,
+        "copied": sorted(copied),
+        "missing": [p for p in paths if p not in files],
+        "version": version.number if version else None,
+    }
+
+
+SEARCH_MAX_RESULTS = 50
+
+
+def _file_size(files: Any, path: str) -> int:
+    return files.blob(path).size if isinstance(files, BlobMap) else len(files[path].encode("utf-8"))
+
+
+def list_code_files(project_id: str, prefix: str = "") -> dict[str, Any]:
+    """
+    List generated code file paths (optionally under a path prefix) with their sizes in bytes.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    files = proj.generated_code_files or {}
+    listed = [{"path": path, "bytes": _file_size(files, path)} for path in sorted(files) if path.startswith(prefix)]
+    _log_tool_event("list_code_files", {"project_id": project_id, "prefix": prefix, "files": len(listed)})
+    return {"project_id": project_id, "files": listed}
+
+
+def read_code_file(project_id: str, path: str, start_line: int = 1, end_line: int = 0) -> dict[str, Any]:
+    """
+    Read one generated code file, or only lines start_line..end_line (1-based, inclusive;
+    end_line 0 means to the end of the file).
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    files = proj.generated_code_files or {}
+    if path not in files:
+        return {"ok": False, "project_id": project_id, "path": path, "error": "No such file."}
+    lines = files[path].splitlines(keepends=True)
+    start = max(1, start_line)
+    end = len(lines) if end_line <= 0 else min(end_line, len(lines))
+    _log_tool_event("read_code_file", {"project_id": project_id, "path": path, "start_line": start, "end_line": end})
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "path": path,
+        "start_line": start,
+        "end_line": end,
+        "total_lines": len(lines),
+        "content": "".join(lines[start - 1 : end]),
+    }
+
+
+@heavy
+def search_code(project_id: str, query: str, path_prefix: str = "") -> dict[str, Any]:
+    """
+    Find a symbol or text across generated code files. Identifiers match as whole words.
+    Returns path, 1-based line number and the line for each match.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    word = re.fullmatch(r"[A-Za-z_$][\w$]*", query) is not None
+    pattern = re.compile(rf"(?<![\w$]){re.escape(query)}(?![\w$])" if word else re.escape(query))
+    matches: list[dict[str, Any]] = []
+    truncated = False
+    # unpack() decodes without filling the read cache with every file.
+    for path, body in sorted((unpack(proj.generated_code_files) or {}).items()):
+        if not path.startswith(path_prefix) or query not in body:
+            continue
+        for number, line in enumerate(body.splitlines(), start=1):
+            if pattern.search(line):
+                if len(matches) == SEARCH_MAX_RESULTS:
+                    truncated = True
+                    break
+                matches.append({"path": path, "line": number, "text": line.strip()[:200]})
+        if truncated:
+            break
+    _log_tool_event("search_code", {"project_id": project_id, "query": query, "matches": len(matches)})
+    return {"project_id": project_id, "query": query, "matches": matches, "truncated": truncated}
+
+
+@heavy
+@_locked
+def apply_code_patch(project_id: str, path: str, diff: str) -> dict[str, Any]:
+    """
+    Apply a unified diff to one generated code file. Use "--- /dev/null" to create a new
+    file and "+++ /dev/null" to delete one. Hunks are matched on their context lines; if any
+    hunk does not match, nothing is changed and the error says which one. The patched file
+    gets the same checks as save_generated_file (safe path, complete content).
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    files = proj.generated_code_files or {}
+    try:
+        patch = parse_unified_diff(diff)
+        if patch.deletes:
+            if path not in files:
+                raise PatchError(f"{path} does not exist")
+            updated = merge(files, None, removed=[path])
+        else:
+            if path not in files and patch.old_path not in (None, "/dev/null"):
+                raise PatchError(f"{path} does not exist; use --- /dev/null to create it")
+            if path in files and patch.old_path == "/dev/null":
+                raise PatchError(f"{path} already exists")
+            content = apply_patch(files.get(path, ""), patch)
+            error = validate_code_file(path, content)
+            if error is not None:
+                raise PatchError(f"patched file rejected: {error}")
+            updated = merge(files, {path: content})
+    except PatchError as e:
+        _log_tool_event("apply_code_patch", {"project_id": project_id, "path": path, "error": str(e)})
+        return {"ok": False, "project_id": project_id, "path": path, "error": str(e)}
+
+    proj.generated_code_files = updated
+    bump_field_version(proj, "generated_code_files")
+    save_project(proj)
+    version = _record_code_version(proj, proj.stage.value, source="patch")
+    _log_tool_event(
+        "apply_code_patch",
+        {"project_id": project_id, "path": path, "added": patch.added, "removed": patch.removed, "version": version.label},
+    )
+    return {
+        "ok": True,
+        "project_id": project_id,
+        "path": path,
+        "deleted": patch.deletes,
+        "lines_added": patch.added,
+        "lines_removed": patch.removed,
+        "version": version.number,
+    }
+
+
+@_locked
+def set_reuse_enabled(project_id: str, enabled: bool) -> dict[str, Any]:
+    """
+    Per-project opt-out of prior-project reuse. Not exposed to agents.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    if proj.reuse_enabled == enabled:
+        return {"ok": True, "project_id": project_id, "reuse_enabled": enabled, "changed": False}
+    proj.reuse_enabled = enabled
+    if not enabled:
+        proj.reuse_source = None
+    save_project(proj)
+    return {"ok": True, "project_id": project_id, "reuse_enabled": enabled, "changed": True}
+
+
+# Fields a step may declare in Step.rollback, with the history they are versioned in.
+_ROLLBACK_FIELDS: dict[str, VersionKind | None] = {
+    "spec": VersionKind.SPEC,
+    "reuse_source": None,
+    "nontech_artifacts_md": VersionKind.NONTECH_ARTIFACTS,
+    "technical_artifacts_md": VersionKind.TECHNICAL_ARTIFACTS,
+    "generated_code_files": VersionKind.GENERATED_CODE,
+}
+
+
+@_locked
+def stage_checkpoint(project_id: str, fields: tuple[str, ...]) -> dict[str, Any]:
+    """
+    Capture the stage and `fields` before a step runs. Not exposed to agents.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    checkpoint: dict[str, Any] = {"stage": proj.stage}
+    for name in fields:
+        if name not in _ROLLBACK_FIELDS:
+            raise ValueError(f"{name!r} cannot be rolled back")
+        value = getattr(proj, name)
+        # BlobMaps are immutable and kept by reference; dicts are copied.
+        checkpoint[name] = value if isinstance(value, BlobMap) else copy.deepcopy(value)
+    return checkpoint
+
+
+@_locked
+def rollback_stage(project_id: str, checkpoint: dict[str, Any], reason: str) -> list[str]:
+    """
+    Undo what an interrupted step committed: the checkpointed fields and the
+    stage go back to their values at step start, even if the step's save tool
+    already ran. Restored documents are recorded as a new version. Not exposed
+    to agents.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    restored = [name for name in checkpoint if name != "stage" and getattr(proj, name) != checkpoint[name]]
+    stage_before = proj.stage
+    for name in restored:
+        setattr(proj, name, checkpoint[name])
+        if _ROLLBACK_FIELDS[name] is not None:
+            bump_field_version(proj, name)
+    proj.stage = checkpoint["stage"]
+    if restored or proj.stage != stage_before:
+        save_project(proj)
+        for name in restored:
+            kind = _ROLLBACK_FIELDS[name]
+            if kind is not None:
+                record_version(project_id, kind, spec_documents(proj.spec) if name == "spec" else getattr(proj, name))
+    event_bus.publish(
+        project_id,
+        "stage_rolled_back",
+        {"stage_before": stage_before.value, "stage": proj.stage.value, "reason": reason, "restored": restored},
+    )
+    _log_tool_event(
+        "rollback_stage",
+        {
+            "project_id": project_id,
+            "stage_before": stage_before.value,
+            "stage_after": proj.stage.value,
+            "reason": reason,
+            "restored": restored,
+        },
+    )
+    return restored
+
+
+@_locked
+def record_step_inputs(project_id: str, step: str, versions: dict[str, int]) -> None:
+    """
+    Mark a pipeline step as completed from the given input field versions.
+    Not exposed to agents.
+    """
+    proj = get_or_create_project(project_id, req_session_id=project_id)
+    proj.step_inputs[step] = dict(versions)
+    save_project(proj)
@@ -0,0 +1,282 @@
+"""
+Immutable version history for project documents.
+
+Every save records a version. Document bodies are stored once in a
+content-addressed blob table keyed by sha256, so unchanged files are shared by
+every version (and every project) that references them. In memory mode the
+table holds the same compressed, interned Blobs as the live project fields
+(orchestration/blobs.py), so history adds no second copy of a current file. A version only stores
+its delta against the parent; a full manifest keyframe is written every
+KEYFRAME_INTERVAL versions so checkout never replays a long chain.
+"""
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import Any, Optional
+
+from core.coordination import get_coordinator, shared_state_enabled
+from orchestration.blobs import Blob, BlobMap, as_text, intern_text
+
+KEYFRAME_INTERVAL = 16
+SPEC_DOCUMENT = "spec.json"
+
+
+class VersionKind(str, Enum):
+    SPEC = "spec"
+    NONTECH_ARTIFACTS = "nontech_artifacts"
+    TECHNICAL_ARTIFACTS = "technical_artifacts"
+    GENERATED_CODE = "generated_code"
+
+
+@dataclass(frozen=True)
+class Version:
+    number: int
+    kind: VersionKind
+    created_at: float
+    parent: Optional[int]
+    # name -> hash for added/modified documents, name -> None for removed ones.
+    delta: dict[str, Optional[str]]
+    # Full name -> hash manifest; only populated on keyframes.
+    keyframe: Optional[dict[str, str]] = None
+
+    @property
+    def label(self) -> str:
+        return f"v{self.number}"
+
+    @property
+    def changed(self) -> list[str]:
+        return sorted(name for name, digest in self.delta.items() if digest is not None)
+
+    @property
+    def removed(self) -> list[str]:
+        return sorted(name for name, digest in self.delta.items() if digest is None)
+
+
+_BLOBS: dict[str, Blob] = {}
+_HISTORY: dict[tuple[str, VersionKind], list[Version]] = {}
+
+# Shared-state namespaces (STATE_BACKEND=sqlite). Bodies by sha256; the
+# project store keeps its document bodies here too.
+BLOBS_NAMESPACE = "blobs"
+_VERSIONS_NAMESPACE = "versions"
+# Latest number and full manifest per (project, kind), so recording a
+# version reads one row instead of the whole history.
+_HEADS_NAMESPACE = "version_heads"
+
+
+def _put_blob(content: str | Blob) -> str:
+    if shared_state_enabled():
+        if isinstance(content, Blob):
+            digest, content = content.digest, content.decode()
+        else:
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        get_coordinator().put_if_absent(BLOBS_NAMESPACE, digest, content)
+        return digest
+    blob = content if isinstance(content, Blob) else intern_text(content)
+    _BLOBS.setdefault(blob.digest, blob)
+    return blob.digest
+
+
+def _get_blob(digest: str) -> str:
+    if shared_state_enabled():
+        return get_coordinator().get(BLOBS_NAMESPACE, digest)
+    return _BLOBS[digest].decode()
+
+
+def _history_prefix(project_id: str, kind: VersionKind) -> str:
+    return f"{project_id}:{kind.value}:"
+
+
+def _load_history(project_id: str, kind: VersionKind) -> list[Version]:
+    if not shared_state_enabled():
+        return _HISTORY.get((project_id, kind), [])
+    history: list[Version] = []
+    for _key, raw in get_coordinator().items(_VERSIONS_NAMESPACE, _history_prefix(project_id, kind)):
+        data = json.loads(raw)
+        data["kind"] = VersionKind(data["kind"])
+        history.append(Version(**data))
+    return history
+
+
+def _append_version(project_id: str, kind: VersionKind, version: Version, manifest: dict[str, str]) -> None:
+    if not shared_state_enabled():
+        _HISTORY.setdefault((project_id, kind), []).append(version)
+        return
+    data = asdict(version)
+    data["kind"] = kind.value
+    coordinator = get_coordinator()
+    coordinator.put(
+        _VERSIONS_NAMESPACE,
+        f"{_history_prefix(project_id, kind)}{version.number:08d}",
+        json.dumps(data, ensure_ascii=False),
+    )
+    coordinator.put(
+        _HEADS_NAMESPACE,
+        _history_prefix(project_id, kind),
+        json.dumps({"number": version.number, "manifest": manifest}, ensure_ascii=False),
+    )
+
+
+def spec_documents(spec: dict[str, Any] | None) -> dict[str, str]:
+    """Represent a spec dict as a single canonical JSON document."""
+    if spec is None:
+        return {}
+    return {SPEC_DOCUMENT: json.dumps(spec, ensure_ascii=False, indent=2, sort_keys=True)}
+
+
+def _manifest(history: list[Version], number: int) -> dict[str, str]:
+    if number < 1 or number > len(history):
+        raise KeyError(f"Unknown version v{number}")
+
+    # Walk back to the closest keyframe, then replay deltas forward.
+    start = number
+    while history[start - 1].keyframe is None:
+        start -= 1
+    manifest = dict(history[start - 1].keyframe)
+    for version in history[start:number]:
+        for name, digest in version.delta.items():
+            if digest is None:
+                manifest.pop(name, None)
+            else:
+                manifest[name] = digest
+    return manifest
+
+
+def _head(project_id: str, kind: VersionKind) -> tuple[int, dict[str, str]]:
+    """Number and full manifest of the latest version (0 and {} if there is none)."""
+    if shared_state_enabled():
+        raw = get_coordinator().get(_HEADS_NAMESPACE, _history_prefix(project_id, kind))
+        if raw is not None:
+            data = json.loads(raw)
+            return data["number"], data["manifest"]
+    # Memory mode, or a shared database written before heads were kept.
+    history = _load_history(project_id, kind)
+    return len(history), (_manifest(history, len(history)) if history else {})
+
+
+def record_version(project_id: str, kind: VersionKind, documents: dict[str, Any] | None) -> Version:
+    """
+    Record the full document set as a new immutable version and return it.
+    """
+    latest, previous = _head(project_id, kind)
+    # BlobMap entries are already hashed and compressed; reuse them as they are.
+    bodies = documents.blobs() if isinstance(documents, BlobMap) else (documents or {})
+    current = {name: _put_blob(body if isinstance(body, Blob) else as_text(body)) for name, body in bodies.items()}
+
+    delta: dict[str, Optional[str]] = {
+        name: digest for name, digest in current.items() if previous.get(name) != digest
+    }
+    delta.update({name: None for name in previous if name not in current})
+
+    number = latest + 1
+    version = Version(
+        number=number,
+        kind=kind,
+        created_at=time.time(),
+        parent=latest or None,
+        delta=delta,
+        keyframe=current if (number - 1) % KEYFRAME_INTERVAL == 0 else None,
+    )
+    _append_version(project_id, kind, version, current)
+    return version
+
+
+def list_versions(project_id: str, kind: VersionKind) -> list[dict[str, Any]]:
+    """
+    Return version metadata only; no document bodies are touched.
+    """
+    out: list[dict[str, Any]] = []
+    for version in _load_history(project_id, kind):
+        out.append(
+            {
+                "version": version.number,
+                "label": version.label,
+                "created_at": version.created_at,
+                "parent": version.parent,
+                "changed": version.changed,
+                "removed": version.removed,
+            }
+        )
+    return out
+
+
+def checkout_version(project_id: str, kind: VersionKind, number: int) -> dict[str, str]:
+    """
+    Materialize the documents of one version.
+    """
+    manifest = _manifest(_load_history(project_id, kind), number)
+    return {name: _get_blob(digest) for name, digest in manifest.items()}
+
+
+def diff_versions(project_id: str, kind: VersionKind, base: int, head: int) -> dict[str, Any]:
+    """
+    Compare two versions. Documents with equal hashes are skipped without
+    reading their bodies; modified documents get a unified diff.
+    """
+    history = _load_history(project_id, kind)
+    old = _manifest(history, base)
+    new = _manifest(history, head)
+
+    added = sorted(name for name in new if name not in old)
+    removed = sorted(name for name in old if name not in new)
+    modified: dict[str, str] = {}
+    for name in sorted(new.keys() & old.keys()):
+        if new[name] == old[name]:
+            continue
+        modified[name] = "".join(
+            difflib.unified_diff(
+                _get_blob(old[name]).splitlines(keepends=True),
+                _get_blob(new[name]).splitlines(keepends=True),
+                fromfile=f"v{base}/{name}",
+                tofile=f"v{head}/{name}",
+            )
+        )
+    return {
+        "base": base,
+        "head": head,
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+    }
+
+
+def history_bytes(project_id: str) -> int:
+    """Approximate bytes of manifest metadata held for a project (memory mode)."""
+    total = 0
+    for (owner, _kind), history in _HISTORY.items():
+        if owner != project_id:
+            continue
+        for version in history:
+            total += sum(len(name) + 64 for name in version.delta)
+            total += sum(len(name) + 64 for name in (version.keyframe or {}))
+    return total
+
+
+def drop_history(project_id: str) -> None:
+    """
+    Forget a project's versions and free blobs no other project references.
+    """
+    for key in [key for key in _HISTORY if key[0] == project_id]:
+        del _HISTORY[key]
+    referenced: set[str] = set()
+    for history in _HISTORY.values():
+        for version in history:
+            referenced.update(digest for digest in version.delta.values() if digest)
+            referenced.update((version.keyframe or {}).values())
+    for digest in [digest for digest in _BLOBS if digest not in referenced]:
+        del _BLOBS[digest]
+
+
+def storage_stats() -> dict[str, int]:
+    """Process-local counters; shared-mode storage lives in the coordinator DB."""
+    return {
+        "blobs": len(_BLOBS),
+        "blob_bytes": sum(blob.stored_size for blob in _BLOBS.values()),
+        "blob_raw_bytes": sum(blob.size for blob in _BLOBS.values()),
+        "versions": sum(len(history) for history in _HISTORY.values()),
+    }